@@ -0,0 +1,34 @@
+"""
+Process-global state isolation for the in-process endpoint tests
+
+main.py keeps its registry, prediction cache and model specs in module
+globals. Tests that load models or send requests through `main.app` run
+inside `isolated_api()`, which swaps in fresh objects and restores the
+originals afterwards, so test order does not matter. Metrics stay
+process-wide: the metrics middleware keeps the ApiMetrics it was created
+with, so tests of /metrics assert on deltas between two scrapes.
+"""
+
+import contextlib
+
+import main
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+
+STATE = ("registry", "metrics", "prediction_cache", "micro_batchers", "inference_executor", "EXECUTOR_KIND",
+         "MODEL_SPECS", "STREAM_CHUNK_ROWS")
+
+
+@contextlib.contextmanager
+def isolated_api():
+    """Run with an empty registry and a fresh cache; restores main's globals on exit"""
+    saved = {name: getattr(main, name) for name in STATE}
+    main.registry = ModelRegistry(main.COMPILED_MAX_ROWS, on_publish=main._on_model_published,
+                                  n_jobs=main.SKLEARN_JOBS)
+    main.prediction_cache = PredictionCache(main.CACHE_SIZE) if main.CACHE_SIZE > 0 else None
+    main.micro_batchers = {}
+    try:
+        yield main
+    finally:
+        for name, value in saved.items():
+            setattr(main, name, value)
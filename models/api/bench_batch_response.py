@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark /predict/batch post-processing: per-row dicts + FastAPI encoding vs vectorized JSON
+
+Only the work done after predict_proba is timed, on random probabilities,
+so no model is needed.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from batch_response import encode_batch_response
+from main import BatchPredictionResponse, get_confidence_level
+
+
+def legacy_batch_response(probabilities, threshold):
+    """The previous post-processing: one dict per row, then FastAPI's response_model encoding"""
+    predictions = (probabilities >= threshold).astype(int)
+    results = []
+    for i, (prob, pred) in enumerate(zip(probabilities, predictions)):
+        results.append({
+            "candidate_id": i,
+            "prediction": int(pred),
+            "probability": round(float(prob), 4),
+            "confidence": get_confidence_level(prob)
+        })
+    summary = {
+        "total_candidates": len(probabilities),
+        "predicted_planets": int(predictions.sum()),
+        "predicted_false_positives": int((predictions == 0).sum()),
+        "mean_probability": round(float(probabilities.mean()), 4),
+        "high_confidence": sum(1 for p in probabilities if p >= 0.8 or p <= 0.2),
+        "threshold_used": round(threshold, 4)
+    }
+    response = BatchPredictionResponse(predictions=results, summary=summary)
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batch response post-processing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Batch sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        probabilities = rng.random(n)
+        print(f"\n🔍 {n} rows")
+        old = best_of(lambda: legacy_batch_response(probabilities, 0.5), args.repeats)
+        rows = best_of(lambda: encode_batch_response(probabilities, 0.5), args.repeats)
+        columnar = best_of(lambda: encode_batch_response(probabilities, 0.5, "columnar"), args.repeats)
+        print(f"  {'per-row dicts + encoder':<28s} {old:9.1f} ms")
+        print(f"  {'vectorized, rows':<28s} {rows:9.1f} ms   ({old / rows:.1f}x)")
+        print(f"  {'vectorized, columnar':<28s} {columnar:9.1f} ms   ({old / columnar:.1f}x)")
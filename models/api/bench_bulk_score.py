@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk catalog scoring throughput against the number of worker processes
+
+Writes a synthetic KOI-shaped CSV (synthetic_koi.py features plus
+identifier and comment columns) and scores it with bulk_score.py at each
+worker count. Without --bundle, a 400-tree calibrated forest is trained on
+synthetic data, as bench_serving.py does.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+import joblib
+import pandas as pd
+
+from bulk_score import score_catalog
+from synthetic_koi import FEATURES, make_matrix
+
+
+def write_catalog(path, rows, chunk=500_000):
+    with open(path, "w") as f:
+        f.write("# Synthetic KOI catalog\n")
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            frame = pd.DataFrame(make_matrix(n, seed=start), columns=FEATURES)
+            frame.insert(0, "kepoi_name", [f"K{i:08d}.01" for i in range(start, start + n)])
+            frame["koi_comment"] = "synthetic"
+            frame.to_csv(f, index=False, header=start == 0, float_format="%.6g")
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark bulk catalog scoring")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Catalog rows")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))), help="Worker counts")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="Rows per chunk")
+    parser.add_argument("--bundle", help="Model bundle (default: a synthetic 400-tree forest)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = args.bundle
+        if not bundle_path:
+            from synthetic_bundle import make_bundle_model
+            bundle_path = os.path.join(directory, "best_koi_reduced_rf.joblib")
+            joblib.dump({"model": make_bundle_model(), "threshold": 0.5, "features": FEATURES}, bundle_path)
+        csv_path = os.path.join(directory, "catalog.csv")
+        write_catalog(csv_path, args.rows)
+        print(f"🔍 {args.rows} rows ({os.path.getsize(csv_path) / 1e6:.0f} MB CSV), {cores} cores")
+
+        baseline = None
+        for workers in args.workers:
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = score_catalog(csv_path, os.path.join(directory, "scores.parquet"), bundle_path,
+                                      workers=workers, chunk_rows=args.chunk_rows)
+            baseline = baseline or stats["rows_per_second"] / workers
+            print(f"  {workers:3d} workers  {stats['seconds']:8.1f} s  {stats['rows_per_second']:12,.0f} rows/s  "
+                  f"{stats['rows_per_second'] / baseline:5.1f}× of one worker "
+                  f"({stats['rows_per_second'] / baseline / workers:.0%} efficiency)")
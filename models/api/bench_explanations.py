@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark /predict/explain work against plain scoring
+
+For each batch size it times the snapshot's predict_proba, its explain()
+(compiled traversal up to EXO_API_COMPILED_MAX_ROWS, sklearn leaves above)
+and encoding the explanation body. Uses a synthetic 400-tree bundle.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from batch_response import encode_explanations
+from model_registry import build_snapshot
+from synthetic_bundle import FEATURES, make_bundle_model, make_labelled_candidates
+
+
+def best_of(fn, repeats):
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark explanations against scoring")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000], help="Rows per batch")
+    parser.add_argument("--trees", type=int, default=400, help="Trees in the synthetic forest")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    snapshot = build_snapshot({"model": make_bundle_model(n_estimators=args.trees), "threshold": 0.5,
+                               "features": FEATURES}, "rf")
+    for n in args.sizes:
+        X = make_labelled_candidates(n, seed=1)[0].to_numpy(dtype=np.float64)
+        score_ms, proba = best_of(lambda: snapshot.predict_proba(X), args.repeats)
+        explain_ms, explanation = best_of(lambda: snapshot.explain(X), args.repeats)
+        encode_ms, _ = best_of(lambda: encode_explanations(explanation, FEATURES, 0.5), args.repeats)
+        gap = np.abs(explanation.base_value + explanation.contributions.sum(axis=1) - explanation.vote).max()
+        assert np.abs(explanation.probability - proba[:, 1]).max() < 1e-12
+        print(f"\n🔍 {n} rows")
+        print(f"  {'predict_proba':<22s} {score_ms:9.2f} ms")
+        print(f"  {'explain':<22s} {explain_ms:9.2f} ms   ({explain_ms / score_ms:.2f}x, max |base+Σ-vote| {gap:.1e})")
+        print(f"  {'encode (rows)':<22s} {encode_ms:9.2f} ms")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of Prometheus instrumentation
+
+1. Cost of each recording primitive (stage timer, histogram observe, request record)
+2. /predict and /predict/batch latency in-process, with EXO_API_METRICS=1 vs 0
+
+The app runs in a fresh process per setting (the middleware is installed at
+import), with the prediction cache disabled so every request is scored. Uses
+the model found by load_model(), or a synthetic bundle when there is none.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+MARKER = "BENCH "
+CANDIDATE = {"koi_period": 365.25, "koi_duration": 2.5, "koi_depth": 1000, "koi_impact": 0.3}
+
+
+def primitive_costs(iterations):
+    """Nanoseconds per call of each recording primitive"""
+    from metrics import ApiMetrics
+    metrics = ApiMetrics()
+    costs = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        costs[name] = (time.perf_counter() - start) / iterations * 1e9
+
+    def stage():
+        with metrics.stage("/predict", "frame"):
+            pass
+    timed("stage timer (with block)", stage)
+    timed("observe_stage", lambda: metrics.observe_stage("/predict", "predict_proba", 0.001))
+    timed("observe_request", lambda: metrics.observe_request("/predict", 200, 0.002))
+    timed("observe_batch", lambda: metrics.observe_batch("/predict/batch", 1000))
+    return costs
+
+
+async def request_latencies(requests, batch_rows):
+    import httpx
+
+    import main
+    try:
+        main.load_model()
+    except Exception:
+        from synthetic_bundle import FEATURES, make_bundle_model
+        main.activate_model({"model": make_bundle_model(), "threshold": 0.5, "features": FEATURES})
+    await main.startup_event()
+    batch = {"candidates": [{**CANDIDATE, "koi_period": 1.0 + i} for i in range(batch_rows)]}
+    latencies = {"/predict": [], "/predict/batch": []}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(requests + 50):
+            for path, body in (("/predict", {**CANDIDATE, "koi_period": 1.0 + i}), ("/predict/batch", batch)):
+                start = time.perf_counter()
+                response = await client.post(path, json=body)
+                elapsed = time.perf_counter() - start
+                assert response.status_code == 200, response.text
+                if i >= 50:  # warm-up
+                    latencies[path].append(elapsed * 1e6)
+    await main.shutdown_event()
+    return latencies
+
+
+def worker(requests, batch_rows):
+    latencies = asyncio.run(request_latencies(requests, batch_rows))
+    print(MARKER + json.dumps(latencies), flush=True)
+
+
+def run_worker(enabled, requests, batch_rows):
+    env = {**os.environ, "EXO_API_METRICS": "1" if enabled else "0", "EXO_API_CACHE_SIZE": "0"}
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--requests", str(requests),
+                             "--batch-rows", str(batch_rows)], env=env, capture_output=True, text=True, check=True)
+    for line in output.stdout.splitlines():
+        if line.startswith(MARKER):
+            return json.loads(line[len(MARKER):])
+    raise RuntimeError(output.stderr)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Prometheus instrumentation overhead")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per endpoint and setting")
+    parser.add_argument("--batch-rows", type=int, default=100, help="Candidates per /predict/batch request")
+    parser.add_argument("--rounds", type=int, default=3, help="Alternating off/on runs (medians are pooled)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.worker:
+        worker(args.requests, args.batch_rows)
+        sys.exit(0)
+
+    print("🔍 Recording primitives")
+    for name, ns in primitive_costs(200_000).items():
+        print(f"  {name:<28s} {ns:7.0f} ns")
+
+    results = {False: {}, True: {}}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            for path, values in run_worker(enabled, args.requests, args.batch_rows).items():
+                results[enabled].setdefault(path, []).extend(values)
+
+    print(f"\n🔍 In-process request latency ({args.rounds} x {args.requests} requests, cache disabled)")
+    for path in results[False]:
+        off, on = median(results[False][path]), median(results[True][path])
+        print(f"  {path:<16s} metrics off p50={off:8.1f} µs   on p50={on:8.1f} µs   "
+              f"overhead={on - off:+7.1f} µs ({(on - off) / off * 100:+.1f}%)")
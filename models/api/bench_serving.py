@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Serving benchmark: throughput and latency percentiles for /predict and /predict/batch
+
+Runs every scenario (endpoint x batch size x concurrency) for a fixed time
+against one of:
+
+- the app in-process (default), through an ASGI transport, no network
+- a server started locally for the run (`--start-server`, optionally
+  `--server-workers N` for production mode)
+- an already running server (`--url http://host:port`)
+
+Candidates come from synthetic_koi.py and request bodies are encoded up
+front, so client-side JSON encoding is not measured. The prediction cache is
+disabled for in-process and started servers, so every row is scored.
+
+Results are written as JSON (`--output`). With `--baseline`, each scenario is
+compared with the stored run and the script exits with status 1 if p50/p95
+latency grew or throughput fell by more than `--threshold`.
+`--update-baseline` stores the current run as the new baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, API_DIR)
+
+from synthetic_koi import make_candidates  # noqa: E402
+
+CONCURRENCY = [1, 8, 32]
+BATCH_SIZES = [1, 10, 100, 1000, 10_000, 100_000]
+BATCH_CONCURRENCY = [1, 4]
+QUICK = {"concurrency": [1, 8], "batch_sizes": [1, 100, 10_000], "batch_concurrency": [1]}
+
+# Compared against the baseline: (metric path, True if larger is worse)
+COMPARED = [(("latency_ms", "p50"), True), (("latency_ms", "p95"), True), (("throughput_rps",), False)]
+
+SINGLE_POOL = 20_000  # distinct /predict bodies cycled through
+
+
+def scenario_key(endpoint: str, batch_size: int, concurrency: int) -> str:
+    if endpoint == "/predict":
+        return f"/predict c={concurrency}"
+    return f"/predict/batch n={batch_size} c={concurrency}"
+
+
+def summarize(latencies: List[float], errors: int, seconds: float, batch_size: int) -> Dict[str, Any]:
+    latencies_ms = np.array(latencies) * 1000.0
+    done = len(latencies)
+    return {
+        "requests": done,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(done / seconds, 2) if seconds else 0.0,
+        "rows_per_second": round(done * batch_size / seconds, 1) if seconds else 0.0,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "mean": round(float(latencies_ms.mean()), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        } if done else None,
+    }
+
+
+async def run_scenario(client, path: str, bodies: List[bytes], concurrency: int, seconds: float,
+                       min_requests: int):
+    """`concurrency` workers send requests until `seconds` have passed and `min_requests` are done"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    headers = {"Content-Type": "application/json"}
+
+    async def worker(offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline or len(latencies) + errors < min_requests:
+            body = bodies[i % len(bodies)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, content=body, headers=headers)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    # Warm-up (model load paths, connection setup) is not measured
+    await client.post(path, content=bodies[0], headers=headers)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def batch_bodies(size: int, count: int) -> List[bytes]:
+    return [json.dumps({"candidates": make_candidates(size, seed=1000 + i)}).encode() for i in range(count)]
+
+
+async def run_suite(client, args) -> Dict[str, Any]:
+    results = {}
+    singles = [json.dumps(c).encode() for c in make_candidates(SINGLE_POOL, seed=1)]
+    for concurrency in args.concurrency:
+        key = scenario_key("/predict", 1, concurrency)
+        latencies, errors, seconds = await run_scenario(client, "/predict", singles, concurrency, args.seconds,
+                                                        args.min_requests)
+        results[key] = {"endpoint": "/predict", "batch_size": 1, "concurrency": concurrency,
+                        **summarize(latencies, errors, seconds, 1)}
+        report(key, results[key])
+
+    for size in args.batch_sizes:
+        bodies = batch_bodies(size, 2 if size >= 10_000 else 8)
+        for concurrency in args.batch_concurrency:
+            key = scenario_key("/predict/batch", size, concurrency)
+            latencies, errors, seconds = await run_scenario(client, "/predict/batch", bodies, concurrency,
+                                                            args.seconds, args.min_requests)
+            results[key] = {"endpoint": "/predict/batch", "batch_size": size, "concurrency": concurrency,
+                            **summarize(latencies, errors, seconds, size)}
+            report(key, results[key])
+    return results
+
+
+def report(key: str, result: Dict[str, Any]):
+    latency = result["latency_ms"] or {"p50": float("nan"), "p95": float("nan"), "p99": float("nan")}
+    errors = f"   ❌ {result['errors']} errors" if result["errors"] else ""
+    print(f"  {key:<30s} {result['throughput_rps']:9.1f} req/s {result['rows_per_second']:11.0f} rows/s   "
+          f"p50={latency['p50']:9.2f}  p95={latency['p95']:9.2f}  p99={latency['p99']:9.2f} ms{errors}")
+
+
+# ---------- targets ----------
+
+async def bench_in_process(args) -> Dict[str, Any]:
+    import httpx
+
+    import main
+    try:
+        if not main.registry.loaded:
+            main.load_model()
+    except Exception:
+        from synthetic_bundle import FEATURES, make_bundle_model
+        print("⚠️  No model file found, using a synthetic model bundle")
+        main.activate_model({"model": make_bundle_model(), "threshold": 0.5, "features": FEATURES})
+    await main.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            model = (await client.get("/health")).json()["model_info"]
+            return {"model": model, "results": await run_suite(client, args)}
+    finally:
+        await main.shutdown_event()
+
+
+async def bench_url(url: str, args) -> Dict[str, Any]:
+    import httpx
+    limits = httpx.Limits(max_connections=max(args.concurrency + args.batch_concurrency) + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        health = (await client.get("/health")).json()
+        if not health.get("model_loaded"):
+            raise RuntimeError(f"{url} has no model loaded")
+        return {"model": health["model_info"], "results": await run_suite(client, args)}
+
+
+def start_server(workers: Optional[int]) -> Tuple[subprocess.Popen, str]:
+    """uvicorn (or production mode with `workers`) on a free local port, once /health answers"""
+    import httpx
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {**os.environ, "EXO_API_CACHE_SIZE": "0"}
+    if workers:
+        command = [sys.executable, "start_api.py", "--production", "--workers", str(workers),
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--log-level", "warning", "--no-access-log"]
+    process = subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if httpx.get(url + "/health", timeout=1).json().get("model_loaded"):
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy")
+
+
+# ---------- baselines ----------
+
+def metric(result: Dict[str, Any], path) -> Optional[float]:
+    for part in path:
+        if result is None:
+            return None
+        result = result.get(part)
+    return result
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of current vs baseline beyond `threshold` (0.2 = 20%), one line per metric"""
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        for path, larger_is_worse in COMPARED:
+            old, new = metric(base, path), metric(result, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > threshold) if larger_is_worse else (change < -threshold):
+                regressions.append(f"{key}: {'.'.join(path)} {old:g} -> {new:g} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def environment(target: str) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"target": target, "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /predict and /predict/batch with regression baselines")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Benchmark a running server instead of the app in-process")
+    target.add_argument("--start-server", action="store_true", help="Start a local server for the run")
+    parser.add_argument("--server-workers", type=int, help="With --start-server: production mode with N workers")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY, help="/predict concurrency levels")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES, help="/predict/batch sizes")
+    parser.add_argument("--batch-concurrency", type=int, nargs="+", default=BATCH_CONCURRENCY,
+                        help="/predict/batch concurrency levels")
+    parser.add_argument("--quick", action="store_true", help="Fewer scenarios, for a fast check")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Measured time per scenario")
+    parser.add_argument("--min-requests", type=int, default=3, help="Minimum requests per scenario")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write this run")
+    parser.add_argument("--baseline", help="Baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.concurrency, args.batch_sizes = QUICK["concurrency"], QUICK["batch_sizes"]
+        args.batch_concurrency = QUICK["batch_concurrency"]
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline needs --baseline")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("EXO_API_CACHE_SIZE", "0")
+    server = None
+    if args.url:
+        target = args.url
+    elif args.start_server:
+        server, target = start_server(args.server_workers)
+    else:
+        target = "in-process"
+    print(f"🔍 Benchmarking {target}: {args.seconds:g} s per scenario")
+
+    try:
+        if args.url or server is not None:
+            run = asyncio.run(bench_url(target, args))
+        else:
+            run = asyncio.run(bench_in_process(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    run = {"environment": environment("server" if server is not None else target), **run}
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"✅ Baseline updated: {args.baseline}")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for field in ("target", "cpu_count", "python"):
+        if baseline["environment"].get(field) != run["environment"][field]:
+            print(f"⚠️  Baseline {field} differs: {baseline['environment'].get(field)} vs {run['environment'][field]}")
+    regressions = compare(baseline, run, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold * 100:.0f}% vs {args.baseline}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print(f"✅ No regression beyond {args.threshold * 100:.0f}% vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
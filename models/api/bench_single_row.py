@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /predict input path: pandas DataFrame vs a plain float64 row
+
+The row is built fresh per call by main.features_to_row. An earlier version
+filled one preallocated row. That row had to be copied anyway once scoring
+moved to executor threads, and it cannot serve snapshots with different
+feature lists.
+
+Uses the model found by load_model(), or a synthetic bundle trained like the
+notebook's RF pipeline when no model file is present.
+"""
+
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import main
+from main import ExoplanetFeatures
+
+CANDIDATES = [
+    {"koi_period": 365.25, "koi_duration": 2.5, "koi_depth": 1000, "koi_impact": 0.3, "koi_srho": 1.4, "koi_incl": 89.5},
+    {"koi_period": 10.5, "koi_duration": 1.2, "koi_depth": 500},
+    {"koi_period": 1.0, "koi_duration": 0.5, "koi_depth": 100, "koi_impact": 0.8},
+]
+
+
+def ensure_model():
+    """Load the real bundle, or fall back to a synthetic one"""
+    try:
+        main.load_model()
+    except Exception:
+        from synthetic_bundle import FEATURES, make_bundle_model
+        print("⚠️  Using a synthetic model bundle")
+        main.activate_model({"model": make_bundle_model(), "threshold": 0.5, "features": FEATURES})
+
+
+def dataframe_path(features):
+    """The previous /predict input path"""
+    df = pd.DataFrame([features.dict()])
+    df = df.reindex(columns=list(main.registry.get().features))
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.to_numpy(dtype=np.float64)
+
+
+def row_path(features):
+    return main.features_to_row(features)
+
+
+def time_calls(fn, inputs, iterations, score):
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        features = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        X = fn(features)
+        if score:
+            main.registry.get().compiled.predict_proba(X)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def report(label, timings):
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+    print(f"  {label:<28s} p50={p50:9.1f} µs   p99={p99:9.1f} µs")
+    return p50, p99
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the single-row prediction input path")
+    parser.add_argument("--iterations", type=int, default=5000, help="Timed calls per path")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)  # features.dict() on pydantic v2
+    ensure_model()
+    inputs = [ExoplanetFeatures(**c) for c in CANDIDATES]
+
+    # Both paths must produce the same row, NaN for missing optional fields included
+    for features in inputs:
+        np.testing.assert_array_equal(dataframe_path(features), row_path(features))
+
+    for score in (False, True):
+        print("\n🔍 Input construction + compiled scoring" if score else "\n🔍 Input construction only")
+        for fn in (dataframe_path, row_path):
+            time_calls(fn, inputs, 200, score)  # warm-up
+        old = report("DataFrame + reindex", time_calls(dataframe_path, inputs, args.iterations, score))
+        new = report("float64 row", time_calls(row_path, inputs, args.iterations, score))
+        print(f"  speedup: p50 {old[0] / new[0]:.1f}x, p99 {old[1] / new[1]:.1f}x")
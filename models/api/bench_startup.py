@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-worker startup: full joblib load vs memory-mapped artifact
+
+Starts N worker processes at once, each importing the app and loading the
+model like a uvicorn worker, and reports time-to-ready plus per-worker RSS,
+PSS (RSS with shared pages divided between the processes sharing them) and
+private anonymous memory. Linux only for PSS (/proc/self/smaps_rollup).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MARKER = "BENCH "
+
+
+def memory_mb():
+    """Rss, Pss and Anonymous of this process in MB"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line[0].isdigit())
+        return {key.lower(): int(fields[key].split()[0]) / 1024.0 for key in ("Rss", "Pss", "Anonymous")}
+    except OSError:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": maxrss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)}
+
+
+def worker():
+    """One simulated API worker: import, load, score one row, then report memory when asked"""
+    import numpy as np
+
+    import main
+    main.load_model()
+    main.registry.get().predict_proba(np.full((1, len(main.registry.get().features)), np.nan))
+    print(MARKER + json.dumps({"ready": time.time()}), flush=True)
+    sys.stdin.readline()  # wait until every worker is up so shared pages are counted once per sharer
+    print(MARKER + json.dumps(memory_mb()), flush=True)
+
+
+def read_marker(process):
+    for line in process.stdout:
+        if line.startswith(MARKER):
+            return json.loads(line[len(MARKER):])
+    raise RuntimeError(f"Worker exited early with code {process.wait()}")
+
+
+def run_workers(n_workers, env):
+    processes, spawned = [], []
+    for _ in range(n_workers):
+        spawned.append(time.time())
+        processes.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker"], env=env,
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+    ready = [read_marker(p)["ready"] - start for p, start in zip(processes, spawned)]
+    memory = []
+    for process in processes:
+        process.stdin.write("\n")
+        process.stdin.flush()
+        memory.append(read_marker(process))
+        process.wait()
+    return ready, memory
+
+
+def report(label, ready, memory):
+    mean = lambda key: sum(m[key] for m in memory) / len(memory)
+    print(f"\n🔍 {label}")
+    print(f"  time-to-ready  mean={sum(ready) / len(ready):6.2f} s   max={max(ready):6.2f} s")
+    line = f"  per worker     RSS={mean('rss'):7.1f} MB"
+    if "pss" in memory[0]:
+        line += f"   PSS={mean('pss'):7.1f} MB   anonymous={mean('anonymous'):7.1f} MB"
+        line += f"   (total PSS {sum(m['pss'] for m in memory):.1f} MB)"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark multi-worker startup with and without memory mapping")
+    parser.add_argument("--workers", type=int, default=4, help="Workers started at once")
+    parser.add_argument("--bundle", help="Model bundle (default: EXO_API_MODELS or the first bundle found)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.worker:
+        worker()
+        sys.exit(0)
+
+    from model_artifact import fresh_artifact_for
+    bundle = args.bundle
+    if bundle is None:
+        from main import model_sources
+        bundle = next(iter(model_sources().values()))
+    artifact = fresh_artifact_for(bundle)
+    if artifact is None:
+        from export_model import export_bundle
+        artifact = export_bundle(bundle, os.path.join(tempfile.mkdtemp(), "model.mmap"))
+
+    base = {k: v for k, v in os.environ.items() if k not in ("EXO_API_MODELS", "EXO_API_TRAFFIC_SPLIT")}
+    base["EXO_API_DEFAULT_MODEL"] = "bench"
+    before = run_workers(args.workers, {**base, "EXO_API_MMAP": "0", "EXO_API_MODELS": f"bench={bundle}"})
+    after = run_workers(args.workers, {**base, "EXO_API_MODELS": f"bench={artifact}"})
+    report(f"joblib.load of {bundle} ({args.workers} workers)", *before)
+    report(f"memory-mapped {artifact} ({args.workers} workers)", *after)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of whole KOI / TOI catalogs
+
+Scores a catalog file with the bundle `load_model()` serves, without HTTP
+and without loading the catalog into memory:
+
+- The parent process reads the file in chunks: raw CSV byte blocks cut at
+  line ends, or Parquet record batches. It hands the chunks to a process
+  pool and writes results in input order. At most two chunks per worker
+  are in flight.
+- Each worker parses its chunk with Arrow and maps TOI columns to the KOI features
+  the way new.ipynb does (`pl_orbper`, `pl_trandurh`, `pl_trandep`; the
+  rest missing and imputed). It then scores the chunk single-threaded
+  through the same ModelSnapshot as the API. Parsing and scoring both
+  scale with the number of workers.
+- `prediction` is `probability >= threshold` and `confidence` follows
+  get_confidence_level, as in /predict/batch.
+- CSV lines with the wrong number of fields are skipped and counted (or
+  fail the run with `--on-bad-lines error`); feature values that are not
+  numbers are scored as missing and counted. Both totals are reported.
+
+    python bulk_score.py cumulative.csv koi_scores.parquet
+    python bulk_score.py TOI.csv toi_scores.csv --bundle ../exo_classification/models/best_koi_reduced_rf.joblib
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from batch_response import confidence_levels
+from model_registry import ModelSnapshot, build_snapshot, model_name_from_path
+
+# TOI columns used for KOI features, as in the notebook's TOI evaluation
+TOI_FEATURES = {"koi_period": "pl_orbper", "koi_duration": "pl_trandurh", "koi_depth": "pl_trandep"}
+# Identifier columns copied to the output when present
+ID_COLUMNS = ["kepoi_name", "kepid", "toi", "tid"]
+OUTPUT_COLUMNS = ["probability", "prediction", "confidence"]
+OUTPUT_FORMATS = ("parquet", "csv")
+BAD_LINE_MODES = ("report", "error")
+
+_snapshot: Optional[ModelSnapshot] = None  # per process; inherited by forked workers
+
+
+def load_snapshot(bundle_path: str) -> ModelSnapshot:
+    """The bundle (or its memory-mapped artifact) as the API opens it, with sklearn limited to one thread"""
+    from main import open_bundle
+    return build_snapshot(open_bundle(bundle_path), model_name_from_path(bundle_path), source=bundle_path,
+                          warm_up=False, n_jobs=1)
+
+
+def _init_worker(bundle_path: str):
+    global _snapshot
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)  # one core per worker; the pool provides the parallelism
+    if _snapshot is None or _snapshot.source != bundle_path:
+        _snapshot = load_snapshot(bundle_path)
+
+
+class ScoredChunk(NamedTuple):
+    predictions: pd.DataFrame
+    malformed_rows: int  # CSV lines skipped for having the wrong number of fields
+    unparsed_values: int  # non-empty feature values that are not numbers, scored as missing
+
+
+def feature_sources(columns: List[str], features) -> Dict[str, Optional[str]]:
+    """Input column for each model feature (KOI name, else its TOI equivalent), None when absent"""
+    sources = {}
+    for name in features:
+        if name in columns:
+            sources[name] = name
+        elif TOI_FEATURES.get(name) in columns:
+            sources[name] = TOI_FEATURES[name]
+        else:
+            sources[name] = None
+    if not any(sources.values()):
+        raise ValueError(f"None of the model features {list(features)} (or their TOI columns) are in the catalog")
+    return sources
+
+
+def score_frame(frame: pd.DataFrame, sources: Dict[str, Optional[str]], id_columns: List[str],
+                snapshot: Optional[ModelSnapshot] = None, malformed_rows: int = 0) -> ScoredChunk:
+    """Identifier columns plus probability, prediction and confidence for every row"""
+    snapshot = snapshot or _snapshot
+    X = np.full((len(frame), len(sources)), np.nan)
+    unparsed = 0
+    for j, column in enumerate(sources.values()):
+        if column is not None:
+            values = pd.to_numeric(frame[column], errors="coerce")
+            unparsed += int((values.isna() & frame[column].notna()).sum())
+            X[:, j] = values.to_numpy(dtype=np.float64)
+    probabilities = snapshot.predict_proba(X)[:, 1] if len(X) else np.empty(0)
+    output = frame[id_columns].reset_index(drop=True)
+    output["probability"] = probabilities
+    output["prediction"] = (probabilities >= snapshot.threshold).astype(np.int8)
+    output["confidence"] = confidence_levels(probabilities)
+    return ScoredChunk(output, malformed_rows, unparsed)
+
+
+def score_csv_block(header: bytes, block: bytes, delimiter: str, sources: Dict[str, Optional[str]],
+                    id_columns: List[str], on_bad_lines: str = "report") -> ScoredChunk:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    malformed = [0]
+
+    def invalid_row(row):
+        if on_bad_lines == "error":
+            return "error"
+        malformed[0] += 1
+        return "skip"
+
+    def read(feature_type):
+        types = {c: pa.string() for c in id_columns}
+        types.update({c: feature_type for c in sources.values() if c})
+        return pacsv.read_csv(
+            pa.py_buffer(data), read_options=pacsv.ReadOptions(use_threads=False),
+            parse_options=pacsv.ParseOptions(delimiter=delimiter, invalid_row_handler=invalid_row),
+            convert_options=pacsv.ConvertOptions(include_columns=list(types), column_types=types,
+                                                 strings_can_be_null=True))
+
+    data = (header + block).decode("utf-8", errors="replace").encode("utf-8")
+    try:
+        table = read(pa.float64())
+    except pa.ArrowInvalid as e:
+        if "conversion error" not in str(e):
+            raise ValueError(f"Malformed CSV block: {e}") from e
+        # Some feature value is not a number: read the features as text, score them as missing and count them
+        malformed[0] = 0
+        table = read(pa.string())
+    return score_frame(table.to_pandas(), sources, id_columns, malformed_rows=malformed[0])
+
+
+def score_batch(batch, sources: Dict[str, Optional[str]], id_columns: List[str]) -> ScoredChunk:
+    return score_frame(batch.to_pandas(), sources, id_columns)
+
+
+# ---------- reading ----------
+
+def read_csv_header(path: str) -> Tuple[bytes, int, str]:
+    """(header line, byte offset after it, delimiter), skipping `#` comments and blank lines"""
+    with open(path, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path} has no header line")
+            if line.strip() and not line.startswith(b"#"):
+                break
+        delimiter = "\t" if line.count(b"\t") > line.count(b",") else ","
+        return line, f.tell(), delimiter
+
+
+def csv_blocks(path: str, offset: int, block_bytes: int) -> Iterator[bytes]:
+    """Byte blocks of whole lines from `offset` on"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                return
+            if not block.endswith(b"\n"):
+                block += f.readline()
+            yield block
+
+
+def csv_block_bytes(path: str, offset: int, chunk_rows: int) -> int:
+    """Block size holding about `chunk_rows` lines, from the line length of the first 1 MB"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        sample = f.read(1 << 20)
+    lines = max(1, sample.count(b"\n"))
+    return max(1 << 16, int(len(sample) / lines * chunk_rows))
+
+
+def catalog_chunks(path: str, chunk_rows: int, features,
+                   on_bad_lines: str = "report") -> Tuple[Dict[str, Optional[str]], List[str], Iterator]:
+    """Feature sources, identifier columns and `(function, args)` scoring tasks for each chunk"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        columns = parquet.schema_arrow.names
+        sources = feature_sources(columns, features)
+        id_columns = [c for c in ID_COLUMNS if c in columns]
+        needed = id_columns + sorted(set(c for c in sources.values() if c))
+        tasks = ((score_batch, (batch, sources, id_columns))
+                 for batch in parquet.iter_batches(batch_size=chunk_rows, columns=needed))
+        return sources, id_columns, tasks
+
+    header, offset, delimiter = read_csv_header(path)
+    columns = pd.read_csv(io.BytesIO(header), sep=delimiter, nrows=0).columns.tolist()
+    sources = feature_sources(columns, features)
+    id_columns = [c for c in ID_COLUMNS if c in columns]
+    block_bytes = csv_block_bytes(path, offset, chunk_rows)
+    tasks = ((score_csv_block, (header, block, delimiter, sources, id_columns, on_bad_lines))
+             for block in csv_blocks(path, offset, block_bytes))
+    return sources, id_columns, tasks
+
+
+# ---------- writing ----------
+
+class PredictionWriter:
+    """Appends scored chunks to a Parquet or CSV file"""
+
+    def __init__(self, path: str, fmt: str, columns: List[str]):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format {fmt!r}, expected one of {OUTPUT_FORMATS}")
+        self.path = path
+        self.fmt = fmt
+        self.columns = columns
+        self.rows = 0
+        self.planets = 0
+        self.malformed_rows = 0
+        self.unparsed_values = 0
+        self._parquet = None
+
+    def write(self, scored: ScoredChunk):
+        chunk = scored.predictions
+        self.malformed_rows += scored.malformed_rows
+        self.unparsed_values += scored.unparsed_values
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            chunk.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(chunk)
+        self.planets += int(chunk["prediction"].sum())
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self.rows == 0:  # empty catalog: still leave a file with the columns
+            empty = pd.DataFrame(columns=self.columns)
+            if self.fmt == "parquet":
+                empty.to_parquet(self.path, index=False)
+            else:
+                empty.to_csv(self.path, index=False)
+
+
+def output_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.endswith((".csv", ".csv.gz")) else "parquet"
+
+
+# ---------- driver ----------
+
+def score_catalog(input_path: str, output_path: str, bundle_path: str, workers: Optional[int] = None,
+                  chunk_rows: int = 50_000, fmt: Optional[str] = None,
+                  on_bad_lines: str = "report") -> Dict[str, Any]:
+    """Score `input_path` into `output_path`; returns row counts, data problems and throughput"""
+    global _snapshot
+    if on_bad_lines not in BAD_LINE_MODES:
+        raise ValueError(f"on_bad_lines must be one of {BAD_LINE_MODES}, got {on_bad_lines!r}")
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    _snapshot = load_snapshot(bundle_path)
+    sources, id_columns, tasks = catalog_chunks(input_path, chunk_rows, _snapshot.features, on_bad_lines)
+    missing = [name for name, column in sources.items() if column is None]
+    if missing:
+        print(f"⚠️  Not in the catalog, scored as missing (imputed): {', '.join(missing)}")
+
+    writer = PredictionWriter(output_path, output_format(output_path, fmt), id_columns + OUTPUT_COLUMNS)
+    try:
+        if workers == 1:
+            _init_worker(bundle_path)
+            for fn, args in tasks:
+                writer.write(fn(*args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(bundle_path,)) as pool:
+                in_flight = deque()
+                for fn, args in tasks:
+                    in_flight.append(pool.submit(fn, *args))
+                    if len(in_flight) >= 2 * workers:
+                        writer.write(in_flight.popleft().result())
+                while in_flight:
+                    writer.write(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {"rows": writer.rows, "predicted_planets": writer.planets, "malformed_rows": writer.malformed_rows,
+            "unparsed_values": writer.unparsed_values, "seconds": seconds,
+            "rows_per_second": writer.rows / seconds if seconds > 0 else 0.0, "workers": workers,
+            "threshold": _snapshot.threshold, "model": _snapshot.label, "output": output_path}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a whole KOI / TOI catalog with the API's model bundle")
+    parser.add_argument("input", help="Catalog (.csv with optional # comments, .tsv or .parquet)")
+    parser.add_argument("output", help="Predictions (.parquet or .csv)")
+    parser.add_argument("--bundle", help="Model bundle (default: EXO_API_MODELS or the first bundle found)")
+    parser.add_argument("--model", help="Name of a bundle configured in EXO_API_MODELS")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per core)")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="Rows per chunk")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the extension)")
+    parser.add_argument("--on-bad-lines", choices=BAD_LINE_MODES, default="report",
+                        help="CSV lines with the wrong number of fields: skip and count them, or fail")
+    args = parser.parse_args(argv)
+
+    bundle_path = args.bundle
+    if not bundle_path:
+        from main import model_sources
+        sources = model_sources()
+        if args.model and args.model not in sources:
+            print(f"❌ No bundle configured for model {args.model!r}, configured: {list(sources)}")
+            return 2
+        bundle_path = sources[args.model] if args.model else next(iter(sources.values()))
+    try:
+        stats = score_catalog(args.input, args.output, bundle_path, workers=args.workers or None,
+                              chunk_rows=args.chunk_rows, fmt=args.format, on_bad_lines=args.on_bad_lines)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Scored {stats['rows']} rows with {stats['model']} (threshold {stats['threshold']:.3f}) in "
+          f"{stats['seconds']:.1f} s on {stats['workers']} workers ({stats['rows_per_second']:,.0f} rows/s)")
+    print(f"   {stats['predicted_planets']} predicted planets -> {stats['output']}")
+    if stats["malformed_rows"]:
+        print(f"⚠️  Skipped {stats['malformed_rows']} malformed lines (wrong number of fields)")
+    if stats["unparsed_values"]:
+        print(f"⚠️  {stats['unparsed_values']} feature values were not numbers and were scored as missing")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
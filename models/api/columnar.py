@@ -0,0 +1,100 @@
+"""
+Columnar and binary batch payloads with vectorized validation
+
+Per-row pydantic parsing dominates the cost of large /predict/batch calls.
+Bulk clients can instead send one array per feature, or a raw float matrix,
+which is validated with NumPy masks that reproduce the ExoplanetFeatures rules.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Mirrors the Field constraints and validators of ExoplanetFeatures:
+# (required, lower bound, lower bound inclusive, upper bound)
+FEATURE_RULES = {
+    "koi_period": (True, 0.0, False, 10000.0),
+    "koi_duration": (True, 0.0, False, 24.0),
+    "koi_depth": (True, 0.0, False, 100000.0),
+    "koi_impact": (False, 0.0, True, None),
+    "koi_srho": (False, 0.0, False, None),
+    "koi_incl": (False, 0.0, True, 180.0),
+}
+
+MATRIX_DTYPES = {"float64": "<f8", "float32": "<f4"}
+
+# Row indices reported per failing rule before truncating
+MAX_REPORTED_ROWS = 1000
+
+
+def columns_to_matrix(columns: Dict[str, Any], feature_order: List[str]) -> np.ndarray:
+    """Stack `{feature: [values...]}` into a float64 matrix; absent columns and nulls become NaN"""
+    if not isinstance(columns, dict):
+        raise ValueError("`columns` must be an object mapping feature names to arrays")
+    for name, values in columns.items():
+        if name in feature_order and not isinstance(values, (list, tuple)):
+            raise ValueError(f"Column {name!r} must be an array of numbers or null")
+    lengths = {name: len(values) for name, values in columns.items() if name in feature_order}
+    if not lengths:
+        raise ValueError(f"`columns` contains none of the features {feature_order}")
+    if len(set(lengths.values())) != 1:
+        raise ValueError(f"All columns must have the same length, got {lengths}")
+    n_rows = next(iter(lengths.values()))
+
+    X = np.full((n_rows, len(feature_order)), np.nan, dtype=np.float64)
+    for j, name in enumerate(feature_order):
+        if name in columns:
+            try:
+                X[:, j] = np.array(columns[name], dtype=np.float64)  # None -> NaN
+            except (TypeError, ValueError):
+                raise ValueError(f"Column {name!r} must contain only numbers or null")
+    return X
+
+
+def binary_to_matrix(body: bytes, n_features: int, dtype: str = "float64") -> np.ndarray:
+    """Decode a little-endian row-major float matrix with `n_features` columns"""
+    if dtype not in MATRIX_DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {list(MATRIX_DTYPES)}")
+    itemsize = np.dtype(MATRIX_DTYPES[dtype]).itemsize
+    if len(body) % (itemsize * n_features) != 0:
+        raise ValueError(f"Body length {len(body)} is not a multiple of {n_features} {dtype} values")
+    return np.frombuffer(body, dtype=MATRIX_DTYPES[dtype]).astype(np.float64).reshape(-1, n_features)
+
+
+def _failure(name: str, rule: str, mask: np.ndarray) -> Optional[Dict[str, Any]]:
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        return None
+    return {"field": name, "rule": rule, "count": int(len(rows)), "rows": rows[:MAX_REPORTED_ROWS].tolist()}
+
+
+def validate_matrix(X: np.ndarray, feature_order: List[str]) -> List[Dict[str, Any]]:
+    """
+    Check every row against FEATURE_RULES with NumPy masks
+
+    Returns one `{"field", "rule", "count", "rows"}` record per violated rule;
+    an empty list means the matrix is valid. Missing required values and
+    non-finite values are reported as well.
+    """
+    failures = []
+    for j, name in enumerate(feature_order):
+        column = X[:, j]
+        missing = np.isnan(column)
+        checks = [("finite", np.isinf(column))]
+        if name in FEATURE_RULES:
+            required, lower, inclusive, upper = FEATURE_RULES[name]
+            present = column[~missing]
+            if required:
+                checks.append(("required", missing))
+            low = np.zeros_like(missing)
+            low[~missing] = present < lower if inclusive else present <= lower
+            checks.append((f">= {lower:g}" if inclusive else f"> {lower:g}", low))
+            if upper is not None:
+                high = np.zeros_like(missing)
+                high[~missing] = present > upper
+                checks.append((f"<= {upper:g}", high))
+        for rule, mask in checks:
+            failure = _failure(name, rule, mask)
+            if failure is not None:
+                failures.append(failure)
+    return failures
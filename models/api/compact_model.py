@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Smaller serving variants of a Random Forest bundle, with a trade-off report
+
+The production forest has 400 trees, and its size and per-row cost grow
+with the tree count. Starting from a trained bundle, this tool builds
+variants along three axes:
+
+- `--trees`: keep the best k trees of each forest. Trees are picked by
+  greedy forward selection on the validation rows: each step adds the tree
+  that brings the subset's mean probability closest to the full forest's.
+  The pruned forest therefore tracks the full one, and the fitted
+  calibrator and the tuned threshold stay valid.
+- `--max-depth`: cut every tree at that depth. Nodes at the cap become
+  leaves that predict their training class mix.
+- `--storage`: how the compiled engine stores its arrays (see
+  forest_engine.with_storage). float32 thresholds split inputs exactly as
+  before. float32, uint16 or uint8 leaf values change probabilities
+  slightly.
+
+Each variant is written as a bundle that `load_model()`, `bulk_score.py`
+and `export_model.py` can open. float64 variants are regular bundles,
+`{"model", "threshold", "features", "version"}`: tree pruning and the depth
+cap apply to the sklearn model, which batches above
+EXO_API_COMPILED_MAX_ROWS use. The other storages are engine-only bundles,
+`{"compiled", "threshold", "features", "version", "model_type"}`: they
+leave the sklearn model out, so the file shrinks with the engine, and they
+score batches of every size with the compact engine.
+
+For every variant the report lists the file size, engine size, load time,
+single-row and batch latency, and validation F1 at the bundle threshold
+next to the full model.
+
+    python compact_model.py models/best_koi_reduced_rf.joblib --csv validation.csv --output-dir compact/
+    python compact_model.py models/best_koi_reduced_rf.joblib --csv validation.csv --output-dir compact/ \\
+        --trees 100,50 --max-depth none,10 --storage float32,uint16
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+
+from forest_engine import (STORAGE_TYPES, compile_model, compile_pipeline, model_pipelines, pipeline_parts,
+                           with_storage)
+from labelled_data import f1, labelled_rows
+from model_registry import DEFAULT_FEATURES, build_snapshot, describe_model, model_name_from_path
+
+RANKING_ROWS = 5000  # validation rows used to rank trees
+
+
+# ---------- pruning ----------
+
+def truncate_tree(estimator, max_depth: int):
+    """Copy of a fitted decision tree cut at `max_depth`; cut nodes become leaves"""
+    from sklearn.tree._tree import Tree
+
+    tree = estimator.tree_
+    if tree.max_depth <= max_depth:
+        return estimator
+    state = tree.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+    left, right = nodes["left_child"], nodes["right_child"]
+
+    depth = np.zeros(len(nodes), dtype=np.intp)
+    level = np.zeros(1, dtype=np.intp)
+    for d in range(1, max_depth + 1):
+        level = level[left[level] != -1]
+        level = np.concatenate([left[level], right[level]])
+        depth[level] = d
+    # Depth-first preorder: dropping the subtrees below the cap keeps parents before children
+    keep = depth > 0
+    keep[0] = True
+    new_id = np.cumsum(keep) - 1
+
+    nodes = nodes[keep].copy()
+    cut = depth[keep] == max_depth
+    internal = (nodes["left_child"] != -1) & ~cut
+    nodes["left_child"] = np.where(internal, new_id[nodes["left_child"]], -1)
+    nodes["right_child"] = np.where(internal, new_id[nodes["right_child"]], -1)
+    nodes["feature"][~internal] = -2
+    nodes["threshold"][~internal] = -2.0
+    nodes["missing_go_to_left"][~internal] = 0
+
+    truncated = Tree(tree.n_features, np.atleast_1d(tree.n_classes), tree.n_outputs)
+    truncated.__setstate__({"max_depth": max_depth, "node_count": len(nodes), "nodes": nodes,
+                            "values": np.ascontiguousarray(values[keep])})
+    pruned = copy.copy(estimator)
+    pruned.tree_ = truncated
+    pruned.max_depth = max_depth
+    return pruned
+
+
+def tree_probabilities(pipeline, X: np.ndarray) -> np.ndarray:
+    """(rows, trees) positive-class probability of every tree in the pipeline's forest"""
+    forest = compile_pipeline(pipeline)
+    return forest.leaf_value[forest.leaf_indices(forest.transform(X))]
+
+
+def rank_trees(per_tree: np.ndarray, target: np.ndarray, k: int) -> np.ndarray:
+    """
+    First `k` columns of `per_tree` in greedy forward-selection order
+
+    Each step adds the column that minimizes the squared distance between the
+    mean of the chosen columns and `target`.
+    """
+    n_trees = per_tree.shape[1]
+    norms = np.einsum("ij,ij->j", per_tree, per_tree)
+    total = np.zeros(len(target))
+    chosen = np.zeros(n_trees, dtype=bool)
+    order = []
+    for step in range(1, min(k, n_trees) + 1):
+        # |total/step + p/step - target|² up to a constant, for every candidate column p
+        residual = total / step - target
+        cost = 2.0 * (residual @ per_tree) / step + norms / step ** 2
+        cost[chosen] = np.inf
+        best = int(np.argmin(cost))
+        chosen[best] = True
+        order.append(best)
+        total += per_tree[:, best]
+    return np.array(order, dtype=np.intp)
+
+
+def capped_model(model, max_depth: Optional[int]):
+    """Deep copy of `model` with every tree cut at `max_depth` (None: unchanged)"""
+    model = copy.deepcopy(model)
+    if max_depth is not None:
+        for pipeline in model_pipelines(model):
+            _, forest = pipeline_parts(pipeline)
+            forest.estimators_ = [truncate_tree(tree, max_depth) for tree in forest.estimators_]
+    return model
+
+
+def tree_orders(model, reference, X: np.ndarray, k: int) -> List[np.ndarray]:
+    """Best-first tree order of each forest in `model`, matched to the same forest in `reference`"""
+    orders = []
+    for pipeline, full in zip(model_pipelines(model), model_pipelines(reference)):
+        target = tree_probabilities(full, X).mean(axis=1)
+        orders.append(rank_trees(tree_probabilities(pipeline, X), target, k))
+    return orders
+
+
+def select_trees(model, orders: Sequence[np.ndarray], n_trees: int):
+    """Copy of `model` keeping the first `n_trees` trees of each forest's order"""
+    selected = copy.copy(model)
+    if hasattr(model, "calibrated_classifiers_"):
+        selected.calibrated_classifiers_ = [copy.copy(member) for member in model.calibrated_classifiers_]
+    for i, pipeline in enumerate(model_pipelines(model)):
+        _, forest = pipeline_parts(pipeline)
+        forest = copy.copy(forest)
+        forest.estimators_ = [forest.estimators_[j] for j in orders[i][:n_trees]]
+        forest.n_estimators = len(forest.estimators_)
+        if hasattr(pipeline, "steps"):
+            pruned = copy.copy(pipeline)
+            pruned.steps = pipeline.steps[:-1] + [(pipeline.steps[-1][0], forest)]
+        else:
+            pruned = forest
+        if hasattr(selected, "calibrated_classifiers_"):
+            member = selected.calibrated_classifiers_[i]
+            original = member.estimator
+            # Prefit calibration wraps the pipeline in FrozenEstimator; keep the wrapper
+            if type(original).__name__ == "FrozenEstimator":
+                member.estimator = copy.copy(original)
+                member.estimator.estimator = pruned
+            else:
+                member.estimator = pruned
+            if getattr(model, "estimator", None) is original:
+                selected.estimator = member.estimator  # prefit: the parameter is the fitted model too
+        else:
+            selected = pruned
+    return selected
+
+
+# ---------- measuring ----------
+
+def measure(path: str, X: np.ndarray, y: np.ndarray, batch_rows: int, repeats: int) -> Dict[str, Any]:
+    """Load time, latencies and validation probabilities of a bundle file, opened as load_model() does"""
+    from main import open_bundle
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        snapshot = build_snapshot(open_bundle(path), model_name_from_path(path), source=path)
+    load_ms = (time.perf_counter() - start) * 1000.0
+
+    timings = []
+    for i in range(repeats):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        snapshot.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    batch = X[np.arange(batch_rows) % len(X)]
+    batch_timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        snapshot.predict_proba(batch)
+        batch_timings.append(time.perf_counter() - start)
+
+    # The compiled engine scores /predict and small batches; fall back to sklearn without one
+    engine = snapshot.compiled
+    proba = engine.predict_proba(X)[:, 1] if engine is not None else snapshot.predict_proba(X)[:, 1]
+    return {
+        "file_mb": os.path.getsize(path) / 1e6,
+        "engine_mb": engine.nbytes / 1e6 if engine is not None else None,
+        "load_ms": load_ms,
+        "row_p50_us": float(np.median(timings)) * 1e6,
+        "batch_ms": min(batch_timings) * 1000.0,
+        "f1": f1(y, proba, snapshot.threshold),
+        "proba": proba,
+    }
+
+
+# ---------- driver ----------
+
+def parse_list(value: str, kind) -> List[Any]:
+    """`"all,100"` -> [None, 100]; `all` and `none` mean no limit"""
+    items = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if item in ("all", "none"):
+            items.append(None)
+        elif kind is int:
+            number = int(item)
+            if number < 1:
+                raise ValueError(f"Expected a positive number, got {number}")
+            items.append(number)
+        else:
+            items.append(kind(item))
+    return items
+
+
+def variant_name(n_trees: Optional[int], max_depth: Optional[int], storage: str) -> str:
+    return f"t{n_trees or 'all'}.d{max_depth or 'full'}.{storage}"
+
+
+def build_variants(bundle_path: str, X: np.ndarray, y: np.ndarray, output_dir: str,
+                   trees: Sequence[Optional[int]], depths: Sequence[Optional[int]], storages: Sequence[str],
+                   batch_rows: int = 256, repeats: int = 200, compress: int = 0,
+                   seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Write every variant to `output_dir`; returns one report entry per variant, the input bundle first
+
+    `flipped` is the share of validation rows whose prediction changes, and
+    `mean_abs_diff` / `max_abs_diff` compare probabilities with the full model.
+    """
+    bundle = joblib.load(bundle_path)
+    if not isinstance(bundle, dict):
+        bundle = {"model": bundle}
+    model = bundle["model"]
+    compile_model(model)  # TypeError for models that are not (calibrated) forest pipelines
+    for storage in storages:
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unsupported storage {storage!r}, expected one of {STORAGE_TYPES}")
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(bundle_path))[0]
+    version = str(bundle.get("version", "1.0.0"))
+
+    rng = np.random.default_rng(seed)
+    ranking = X[rng.choice(len(X), min(len(X), RANKING_ROWS), replace=False)]
+    full = measure(bundle_path, X, y, batch_rows, repeats)
+    threshold = float(bundle.get("threshold", 0.5))
+    report = [dict(variant="full", trees=None, max_depth=None, storage="float64", path=bundle_path,
+                   f1_delta=0.0, flipped=0.0, mean_abs_diff=0.0, max_abs_diff=0.0,
+                   **{k: v for k, v in full.items() if k != "proba"})]
+
+    n_full = max(len(pipeline_parts(pipeline)[1].estimators_) for pipeline in model_pipelines(model))
+    counts = sorted({min(k or n_full, n_full) for k in trees}, reverse=True)
+    for max_depth in depths:
+        capped = capped_model(model, max_depth)
+        orders = tree_orders(capped, model, ranking, max(counts))
+        for n_trees, storage in itertools.product(counts, storages):
+            name = variant_name(n_trees if n_trees < n_full else None, max_depth, storage)
+            if name == variant_name(None, None, "float64"):
+                continue  # the input bundle itself
+            variant = select_trees(capped, orders, n_trees)
+            path = os.path.join(output_dir, f"{stem}.{name}.joblib")
+            out = {k: v for k, v in bundle.items() if k not in ("model", "compiled")}
+            out["version"] = f"{version}+{name}"
+            if storage == "float64":
+                out["model"] = variant
+            else:
+                # Pickling the sklearn model next to the compact arrays would make the file larger than the input
+                out.update(compiled=with_storage(compile_model(variant), storage), model_type=describe_model(variant))
+            joblib.dump(out, path, compress=compress)
+            result = measure(path, X, y, batch_rows, repeats)
+            proba = result.pop("proba")
+            diff = np.abs(proba - full["proba"])
+            report.append(dict(variant=name, trees=n_trees, max_depth=max_depth, storage=storage, path=path,
+                               f1_delta=result["f1"] - full["f1"],
+                               flipped=float(np.mean((proba >= threshold) != (full["proba"] >= threshold))),
+                               mean_abs_diff=float(diff.mean()), max_abs_diff=float(diff.max()), **result))
+    return report
+
+
+def markdown_report(report: List[Dict[str, Any]]) -> str:
+    lines = ["| Variant | File MB | Engine MB | Load ms | 1-row p50 µs | Batch ms | Val F1 | ΔF1 | Flipped | Mean |Δp| |",
+             "|---|---|---|---|---|---|---|---|---|---|"]
+    for r in report:
+        engine = "n/a" if r["engine_mb"] is None else f"{r['engine_mb']:.2f}"
+        lines.append(f"| {r['variant']} | {r['file_mb']:.2f} | {engine} | {r['load_ms']:.0f} | "
+                     f"{r['row_p50_us']:.0f} | {r['batch_ms']:.1f} | {r['f1']:.4f} | {r['f1_delta']:+.4f} | "
+                     f"{r['flipped']:.2%} | {r['mean_abs_diff']:.1e} |")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build smaller serving variants of a forest bundle")
+    parser.add_argument("bundle", help="Trained bundle (.joblib)")
+    parser.add_argument("--csv", required=True,
+                        help="Validation rows with a 0/1 `label`, KOI dispositions or TOI dispositions (CP/FP)")
+    parser.add_argument("--output-dir", required=True, help="Where the variants and report.json are written")
+    parser.add_argument("--trees", default="all,200,100,50", help="Trees kept per forest (all: every tree)")
+    parser.add_argument("--max-depth", default="none,12", help="Depth caps (none: uncapped)")
+    parser.add_argument("--storage", default="float64,float32,uint16",
+                        help=f"Compiled engine storage, from {', '.join(STORAGE_TYPES)}")
+    parser.add_argument("--batch-rows", type=int, default=256, help="Rows in the batch latency measurement")
+    parser.add_argument("--repeats", type=int, default=200, help="Single-row calls timed per variant")
+    parser.add_argument("--compress", type=int, default=0, help="joblib compression level of the variants (0-9)")
+    args = parser.parse_args(argv)
+
+    try:
+        trees = parse_list(args.trees, int)
+        depths = parse_list(args.max_depth, int)
+        storages = parse_list(args.storage, str)
+        bundle = joblib.load(args.bundle)
+        features = bundle.get("features") if isinstance(bundle, dict) else None
+        X, y = labelled_rows(args.csv, features or DEFAULT_FEATURES)
+        if len(X) == 0:
+            raise ValueError(f"{args.csv} has no labelled rows")
+        report = build_variants(args.bundle, X, y, args.output_dir, trees, depths, storages,
+                                batch_rows=args.batch_rows, repeats=args.repeats, compress=args.compress)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"\n📊 {len(report) - 1} variants of {args.bundle} on {len(y)} validation rows")
+    print(markdown_report(report))
+    path = os.path.join(args.output_dir, "report.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Saved {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
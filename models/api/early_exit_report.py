@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Speed and decision changes of early-exit scoring on labelled validation rows
+
+Early-exit scoring (`?early_exit=true` / `?budget_ms=` on /predict and
+/predict/batch, see forest_engine.CompiledModel.predict_early) stops
+evaluating trees once a row's class is settled. This tool scores the
+validation rows the way the API does, in single rows and in batches of
+`--batch-rows`, once with every tree and once per setting. For each
+setting it reports:
+
+- mean trees evaluated per row
+- p50 single-row latency and the mean batch latency, with the speedups
+  over full evaluation
+- how many rows get a different class than with every tree, the mean
+  |Δp| of the early probabilities, and validation F1 at the bundle
+  threshold
+- with a budget, the share of rows cut short before they were settled
+
+    python early_exit_report.py models/best_koi_reduced_rf.joblib --csv validation.csv
+    python early_exit_report.py models/best_koi_reduced_rf.joblib --csv validation.csv \\
+        --confidence 0.99,0.999 --min-trees 16,32 --budget-ms none,2 --output early_exit.json
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from compact_model import parse_list
+from labelled_data import f1, labelled_rows
+from model_registry import DEFAULT_FEATURES, build_snapshot, model_name_from_path
+
+
+def batches(X: np.ndarray, batch_rows: int) -> List[np.ndarray]:
+    return [X[start:start + batch_rows] for start in range(0, len(X), batch_rows)]
+
+
+def time_batches(score, X: np.ndarray, batch_rows: int, repeats: int):
+    """Best-of-`repeats` mean latency per batch and the outputs of the last run"""
+    best, outputs = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        outputs = [score(batch) for batch in batches(X, batch_rows)]
+        best = min(best, (time.perf_counter() - start) / len(outputs))
+    return best * 1000.0, outputs
+
+
+def row_p50(score, X: np.ndarray, repeats: int) -> float:
+    for i in range(min(20, repeats)):  # warm-up
+        score(X[i % len(X)][None, :])
+    timings = []
+    for i in range(repeats):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        score(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def evaluate(snapshot, X: np.ndarray, y: np.ndarray, confidences: List[float], min_trees: List[int],
+             budgets: List[Optional[float]], batch_rows: int, repeats: int) -> List[Dict[str, Any]]:
+    """One report row for full evaluation, then one per (confidence, min_trees, budget_ms) setting"""
+    threshold = snapshot.threshold
+    full_batch_ms, outputs = time_batches(snapshot.predict_proba, X, batch_rows, 3)
+    full = np.concatenate([proba[:, 1] for proba in outputs])
+    full_row_us = row_p50(snapshot.predict_proba, X, repeats)
+    report = [{"setting": "full", "confidence": None, "min_trees": None, "budget_ms": None,
+               "mean_trees": float(snapshot.compiled.n_trees), "row_p50_us": full_row_us, "row_speedup": 1.0,
+               "batch_ms": full_batch_ms, "batch_speedup": 1.0, "flipped": 0.0, "flipped_rows": 0,
+               "mean_abs_diff": 0.0, "f1": f1(y, full, threshold), "f1_delta": 0.0, "budget_exhausted": 0.0}]
+
+    for confidence, first, budget_ms in itertools.product(confidences, min_trees, budgets):
+        budget = None if budget_ms is None else budget_ms / 1000.0
+
+        def score(rows):
+            return snapshot.predict_early(rows, budget, confidence, first)
+        batch_ms, results = time_batches(score, X, batch_rows, 3)
+        proba = np.concatenate([r.probability for r in results])
+        trees = np.concatenate([r.trees for r in results])
+        flipped = (proba >= threshold) != (full >= threshold)
+        row_us = row_p50(score, X, repeats)
+        report.append({
+            "setting": f"c{confidence}.m{first}" + ("" if budget_ms is None else f".b{budget_ms:g}ms"),
+            "confidence": confidence,
+            "min_trees": first,
+            "budget_ms": budget_ms,
+            "mean_trees": float(trees.mean()),
+            "row_p50_us": row_us,
+            "row_speedup": full_row_us / row_us,
+            "batch_ms": batch_ms,
+            "batch_speedup": full_batch_ms / batch_ms,
+            "flipped": float(flipped.mean()),
+            "flipped_rows": int(flipped.sum()),
+            "mean_abs_diff": float(np.abs(proba - full).mean()),
+            "f1": f1(y, proba, threshold),
+            "f1_delta": f1(y, proba, threshold) - report[0]["f1"],
+            "budget_exhausted": sum(r.budget_exhausted for r in results) / len(X),
+        })
+    return report
+
+
+def markdown_report(report: List[Dict[str, Any]]) -> str:
+    lines = ["| Setting | Mean trees | 1-row p50 µs | Speedup | Batch ms | Speedup | Flipped | Mean |Δp| | Val F1 | ΔF1 | Budget hit |",
+             "|---|---|---|---|---|---|---|---|---|---|---|"]
+    for r in report:
+        lines.append(f"| {r['setting']} | {r['mean_trees']:.1f} | {r['row_p50_us']:.0f} | {r['row_speedup']:.2f}x | "
+                     f"{r['batch_ms']:.1f} | {r['batch_speedup']:.2f}x | {r['flipped']:.2%} ({r['flipped_rows']}) | "
+                     f"{r['mean_abs_diff']:.1e} | {r['f1']:.4f} | {r['f1_delta']:+.4f} | {r['budget_exhausted']:.1%} |")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report the speedup and decision changes of early-exit scoring")
+    parser.add_argument("bundle", help="Trained bundle (.joblib or an exported artifact)")
+    parser.add_argument("--csv", required=True,
+                        help="Validation rows with a 0/1 `label`, KOI dispositions or TOI dispositions (CP/FP)")
+    parser.add_argument("--confidence", default="0.99,0.999,0.9999", help="Early-exit confidence levels")
+    parser.add_argument("--min-trees", default="16,32", help="Trees evaluated before the first check")
+    parser.add_argument("--budget-ms", default="none", help="Latency budgets in ms (none: no budget)")
+    parser.add_argument("--batch-rows", type=int, default=256, help="Rows per batch in the batch measurement")
+    parser.add_argument("--repeats", type=int, default=300, help="Single-row calls timed per setting")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        confidences = parse_list(args.confidence, float)
+        if not all(c is not None and 0.5 < c < 1.0 for c in confidences):
+            raise ValueError(f"Confidence levels must be between 0.5 and 1, got {args.confidence!r}")
+        min_trees = parse_list(args.min_trees, int)
+        if None in min_trees:
+            raise ValueError("--min-trees needs numbers")
+        budgets = parse_list(args.budget_ms, float)
+        from main import open_bundle
+        with contextlib.redirect_stdout(io.StringIO()):
+            snapshot = build_snapshot(open_bundle(args.bundle), model_name_from_path(args.bundle), source=args.bundle)
+        if snapshot.compiled is None:
+            raise TypeError(f"{args.bundle} ({snapshot.model_type}) does not support early-exit scoring")
+        X, y = labelled_rows(args.csv, snapshot.features or DEFAULT_FEATURES)
+        if len(X) == 0:
+            raise ValueError(f"{args.csv} has no labelled rows")
+        report = evaluate(snapshot, X, y, confidences, min_trees, budgets, args.batch_rows, args.repeats)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"\n📊 Early-exit scoring of {snapshot.label} ({snapshot.compiled.n_trees} trees) "
+          f"on {len(y)} validation rows, threshold {snapshot.threshold:.3f}")
+    print(markdown_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
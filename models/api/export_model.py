@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Export model bundles as memory-mappable artifacts
+
+Writes `<bundle>.mmap/` next to each bundle (see model_artifact.py). The API
+picks the artifact up automatically while it is newer than the bundle, so all
+uvicorn workers share one copy of the compiled forest.
+
+    python export_model.py                      # configured / default bundle(s)
+    python export_model.py models/best_koi_reduced_rf.joblib
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+
+from model_artifact import artifact_path, export_artifact
+from model_registry import build_snapshot, model_name_from_path
+
+
+def export_bundle(bundle_path: str, output: str = None) -> str:
+    """Load a .joblib bundle, compile it and write its artifact directory"""
+    start = time.perf_counter()
+    bundle = joblib.load(bundle_path)
+    snapshot = build_snapshot(bundle, model_name_from_path(bundle_path), warm_up=False)
+    path = export_artifact(bundle, output or artifact_path(bundle_path), compiled=snapshot.compiled,
+                           model_type=snapshot.model_type)
+    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+    print(f"✅ Exported {bundle_path} -> {path} ({size:.1f} MB, {time.perf_counter() - start:.1f} s)")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export model bundles as memory-mappable artifacts")
+    parser.add_argument("bundles", nargs="*", help="Bundle paths (default: EXO_API_MODELS or the first bundle found)")
+    parser.add_argument("--output", help="Artifact directory (only with a single bundle)")
+    args = parser.parse_args()
+
+    if args.output and len(args.bundles) != 1:
+        parser.error("--output requires exactly one bundle")
+    bundles = args.bundles
+    if not bundles:
+        from main import model_sources
+        bundles = list(model_sources().values())
+    for bundle_path in bundles:
+        export_bundle(bundle_path, args.output)
@@ -0,0 +1,526 @@
+"""
+Array-backed inference engine for the calibrated Random Forest bundle
+
+The bundle saved by the training notebook is a ``CalibratedClassifierCV``
+wrapping ``Pipeline([("imputer", SimpleImputer), ("clf", RandomForestClassifier)])``.
+Scoring it through ``predict_proba`` pays for input validation, a joblib
+dispatch over every estimator and the calibration wrapper on each call, which
+dominates single-row latency. ``compile_model`` flattens the fitted pipeline
+into contiguous NumPy arrays once, and ``CompiledModel.predict_proba`` then
+evaluates all trees with a single vectorized traversal.
+
+``CompiledModel.explain`` splits each probability into per-feature
+contributions along the decision paths: every split adds the change in the
+node's positive fraction to its feature. These sums are tabulated per node
+once, so explaining reuses the scoring traversal plus one lookup per
+feature.
+
+``CompiledModel.predict_early`` evaluates the trees block by block and
+stops for each row once the running vote is settled on one side of the
+threshold, or once a time budget is spent.
+
+``with_storage`` stores the arrays in smaller types for compact serving
+variants (see compact_model.py): float32 thresholds rounded down, which
+split float32 inputs exactly like the float64 ones, and float32 or
+fixed-point leaf values.
+"""
+
+import copy
+import time
+from statistics import NormalDist
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Upper bound on rows * trees handled per traversal step (keeps memory flat)
+MAX_CELLS_PER_CHUNK = 1 << 20
+# Leaf value types for with_storage; unsigned integers are fixed-point fractions of 1
+STORAGE_TYPES = ("float64", "float32", "uint16", "uint8")
+
+
+class CompiledForest:
+    """Median imputer plus every tree of a forest, flattened into flat arrays"""
+
+    leaf_scale = 1.0  # leaf_value units; fixed-point storage sets 1 / (2**bits - 1)
+
+    def __init__(self, imputer, forest):
+        self.n_features_in = int(forest.n_features_in_) if imputer is None else int(imputer.n_features_in_)
+
+        # Imputation: fill values and the columns that survive the imputer
+        if imputer is None:
+            self.fill_values = np.full(self.n_features_in, np.nan)
+            self.keep_columns = None
+        else:
+            stats = np.asarray(imputer.statistics_, dtype=np.float64)
+            keep = ~np.isnan(stats)
+            if getattr(imputer, "keep_empty_features", False):
+                keep = np.ones_like(keep)
+                stats = np.where(np.isnan(stats), 0.0, stats)
+            self.fill_values = stats
+            self.keep_columns = None if keep.all() else np.flatnonzero(keep)
+
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves (and never go right) so extra steps are no-ops
+            child = np.empty(2 * n_nodes, dtype=np.intp)
+            child[0::2] = np.where(is_leaf, node_ids, tree.children_left) + offset
+            child[1::2] = np.where(is_leaf, node_ids, tree.children_right) + offset
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = np.asarray(tree.value[:, 0, :], dtype=np.float64)
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature.astype(np.intp))
+            thresholds.append(threshold.astype(np.float64))
+            children.append(child)
+            values.append(value[:, 1] / normalizer)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        self.feature = np.ascontiguousarray(np.concatenate(features))
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds))
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.ascontiguousarray(np.concatenate(children))
+        self.leaf_value = np.ascontiguousarray(np.concatenate(values))
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.n_trees = len(roots)
+        self.n_nodes = offset
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Apply the imputer and cast to the float32 inputs the trees expect"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the model is expecting {self.n_features_in} features as input."
+            )
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+        if self.keep_columns is not None:
+            X = X[:, self.keep_columns]
+        X32 = X.astype(np.float32)
+        if not np.isfinite(X32).all():
+            raise ValueError("Input contains infinity or a value too large for dtype('float32').")
+        return X32
+
+    def leaf_indices(self, X32: np.ndarray, roots: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return the global leaf node reached in every tree (or those of `roots`), shape (n_rows, n_trees)"""
+        roots = self.roots if roots is None else roots
+        n_rows, n_cols = X32.shape
+        flat = X32.ravel()
+        nodes = np.broadcast_to(roots, (n_rows, len(roots))).copy()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        for _ in range(self.max_depth):
+            # sklearn goes left when x <= threshold; leaves have an infinite threshold
+            go_right = flat[row_offset + self.feature[nodes]] > self.threshold[nodes]
+            next_nodes = self.children[(nodes << 1) + go_right]
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        return nodes
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        """Uncalibrated forest probability of the positive class"""
+        X32 = self.transform(X)
+        n_rows = X32.shape[0]
+        out = np.empty(n_rows, dtype=np.float64)
+        chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, self.n_trees))
+        for start in range(0, n_rows, chunk):
+            leaves = self.leaf_indices(X32[start:start + chunk])
+            # Sum tree by tree (axis 0) to accumulate in the same order as sklearn
+            total = self.leaf_value[leaves.T].sum(axis=0, dtype=np.float64)
+            if self.leaf_scale != 1.0:
+                total *= self.leaf_scale
+            out[start:start + chunk] = total / self.n_trees
+        return out
+
+    def tree_votes(self, X32: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Positive fraction of the leaf each row reaches in trees start..stop-1, shape (stop - start, n_rows)"""
+        votes = np.empty((stop - start, X32.shape[0]), dtype=np.float64)
+        chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, stop - start))
+        for first in range(0, X32.shape[0], chunk):
+            leaves = self.leaf_indices(X32[first:first + chunk], self.roots[start:stop])
+            votes[:, first:first + chunk] = self.leaf_value[leaves.T]
+        if self.leaf_scale != 1.0:
+            votes *= self.leaf_scale
+        return votes
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.leaf_value, self.roots,
+                                      self.fill_values))
+
+    def contribution_table(self) -> np.ndarray:
+        """
+        (n_features_in, n_nodes) sum of the split contributions from the root to each node
+
+        A split on feature f moves the prediction from the parent's positive
+        fraction to the child's; the difference is credited to f (the input
+        column, before the imputer drops empty ones). Built on first use.
+        """
+        table = getattr(self, "_contributions", None)
+        if table is not None:
+            return table
+        values = self.leaf_value.astype(np.float64) * self.leaf_scale
+        columns = self.feature if self.keep_columns is None else self.keep_columns[self.feature]
+        table = np.zeros((self.n_features_in, self.n_nodes))
+        level = self.roots
+        while len(level):
+            level = level[self.children[2 * level] != level]  # leaves point at themselves
+            for child in (self.children[2 * level], self.children[2 * level + 1]):
+                table[:, child] = table[:, level]
+                table[columns[level], child] += values[child] - values[level]
+            level = np.concatenate([self.children[2 * level], self.children[2 * level + 1]])
+        self._contributions = table
+        return table
+
+    def base_value(self) -> float:
+        """Mean positive fraction at the roots: the forest's vote before any split"""
+        return float((self.leaf_value[self.roots].astype(np.float64) * self.leaf_scale).mean())
+
+    def explain(self, X: np.ndarray, apply: Optional[Callable[[np.ndarray], np.ndarray]] = None
+                ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Uncalibrated vote and (n_rows, n_features_in) contributions; vote = base_value + contributions.sum(1)
+
+        `apply` (sklearn's `forest.apply` on raw rows) finds the leaves
+        instead of the vectorized traversal; its Cython loop is faster for
+        large batches.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        X32 = self.transform(X) if apply is None else None
+        table = self.contribution_table()
+        n_rows = X.shape[0]
+        vote = np.empty(n_rows, dtype=np.float64)
+        contributions = np.empty((n_rows, self.n_features_in), dtype=np.float64)
+        # sklearn's apply pays a per-tree overhead on every call, so it gets larger chunks
+        cells = MAX_CELLS_PER_CHUNK if apply is None else 4 * MAX_CELLS_PER_CHUNK
+        chunk = max(1, cells // max(1, self.n_trees))
+        for start in range(0, n_rows, chunk):
+            if apply is None:
+                leaves = self.leaf_indices(X32[start:start + chunk]).T
+            else:
+                leaves = (apply(X[start:start + chunk]) + self.roots).T  # per-tree node ids -> global
+            total = self.leaf_value[leaves].sum(axis=0, dtype=np.float64)
+            if self.leaf_scale != 1.0:
+                total *= self.leaf_scale
+            vote[start:start + chunk] = total / self.n_trees
+            for f in range(self.n_features_in):
+                contributions[start:start + chunk, f] = table[f][leaves].sum(axis=0) / self.n_trees
+        return vote, contributions
+
+
+class CompiledCalibrator:
+    """Isotonic or sigmoid calibrator reduced to its fitted parameters"""
+
+    def __init__(self, calibrator):
+        if hasattr(calibrator, "X_thresholds_"):
+            self.method = "isotonic"
+            self.x = np.asarray(calibrator.X_thresholds_, dtype=np.float64)
+            self.y = np.asarray(calibrator.y_thresholds_, dtype=np.float64)
+            self.x_min = float(calibrator.X_min_)
+            self.x_max = float(calibrator.X_max_)
+            if calibrator.out_of_bounds != "clip":
+                raise TypeError(f"Unsupported isotonic out_of_bounds={calibrator.out_of_bounds!r}")
+        elif hasattr(calibrator, "a_") and hasattr(calibrator, "b_"):
+            self.method = "sigmoid"
+            self.a = float(calibrator.a_)
+            self.b = float(calibrator.b_)
+        else:
+            raise TypeError(f"Unsupported calibrator: {type(calibrator).__name__}")
+
+    def __call__(self, p: np.ndarray) -> np.ndarray:
+        if self.method == "isotonic":
+            if len(self.x) == 1:
+                return np.full_like(p, self.y[0])
+            return np.interp(np.clip(p, self.x_min, self.x_max), self.x, self.y)
+        return 1.0 / (1.0 + np.exp(self.a * p + self.b))
+
+
+class Explanation(NamedTuple):
+    """Per-row feature contributions to the uncalibrated forest vote"""
+    probability: np.ndarray  # calibrated, as predict_proba[:, 1]
+    vote: np.ndarray  # mean tree vote before calibration: base_value + contributions.sum(axis=1)
+    base_value: float
+    contributions: np.ndarray  # (n_rows, n_features_in)
+
+
+class EarlyExit(NamedTuple):
+    """Probabilities from as many trees as each row needed"""
+    probability: np.ndarray  # calibrated, from the running vote of the evaluated trees
+    trees: np.ndarray  # trees evaluated per row (n_trees when the row was never settled early)
+    n_trees: int
+    budget_exhausted: int  # rows cut short by the budget before they were settled
+
+
+class CompiledModel:
+    """Average of one or more (forest, calibrator) members, like CalibratedClassifierCV"""
+
+    def __init__(self, members: List[Tuple[CompiledForest, Optional[CompiledCalibrator]]]):
+        self.members = members
+        self.n_features_in = members[0][0].n_features_in
+        self.n_trees = sum(forest.n_trees for forest, _ in members)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the forest arrays"""
+        return sum(forest.nbytes for forest, _ in self.members)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Return class probabilities with shape (n_rows, 2), matching sklearn"""
+        X = np.asarray(X, dtype=np.float64)
+        positive = np.zeros(X.shape[0], dtype=np.float64)
+        for forest, calibrator in self.members:
+            p = forest.positive_proba(X)
+            if calibrator is not None:
+                p = calibrator(p)
+            positive += p
+        positive = _average(positive, len(self.members))
+        proba = np.empty((X.shape[0], 2), dtype=np.float64)
+        proba[:, 1] = positive
+        proba[:, 0] = 1.0 - positive
+        return proba
+
+    def explain(self, X, model=None) -> Explanation:
+        """
+        Calibrated probabilities plus the contributions of every feature, from one traversal per member
+
+        With `model` (the sklearn model this was compiled from), sklearn's
+        `apply` finds the leaves.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        positive = np.zeros(X.shape[0], dtype=np.float64)
+        vote = np.zeros(X.shape[0], dtype=np.float64)
+        contributions = np.zeros((X.shape[0], self.n_features_in), dtype=np.float64)
+        base = 0.0
+        appliers = _appliers(model) if model is not None else [None] * len(self.members)
+        if len(appliers) != len(self.members):
+            raise ValueError("model does not match the compiled members")
+        for (forest, calibrator), apply in zip(self.members, appliers):
+            v, c = forest.explain(X, apply)
+            positive += calibrator(v) if calibrator is not None else v
+            vote += v
+            contributions += c
+            base += forest.base_value()
+        n = len(self.members)
+        return Explanation(_average(positive, n), vote / n, base / n, contributions / n)
+
+    def predict_early(self, X, threshold: float, confidence: float = 0.999, budget: Optional[float] = None,
+                      min_trees: int = 32, model=None) -> EarlyExit:
+        """
+        Positive-class probabilities, evaluating trees only until each row's class is settled
+
+        Trees run in their stored order in blocks of `min_trees`, then
+        doubling. The trees of a forest are exchangeable, so after k of n
+        trees the running mean vote estimates the full one with standard
+        error s * sqrt((1 - k/n) / k), s being the spread of the k votes.
+        A row stops once the calibrated probability of the vote +/- z
+        standard errors (z: the one-sided normal quantile of `confidence`)
+        is on one side of `threshold`. With `budget` (seconds) no new block
+        starts after it is spent, and unsettled rows keep their running
+        vote. With `model`, sklearn's trees score the blocks.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        deadline = None if budget is None else time.perf_counter() + budget
+        z = NormalDist().inv_cdf(confidence)
+        voters = _voters(model) if model is not None else [(f.transform, f.tree_votes) for f, _ in self.members]
+        if len(voters) != len(self.members):
+            raise ValueError("model does not match the compiled members")
+        inputs = [prepare(X) for prepare, _ in voters]
+        sizes = np.array([forest.n_trees for forest, _ in self.members], dtype=np.float64)[:, None]
+        total = np.zeros((len(self.members), X.shape[0]))
+        squares = np.zeros_like(total)
+        counts = np.zeros_like(total)
+        active = np.arange(X.shape[0])
+        done, stop, exhausted = 0, max(1, min_trees), 0
+        while len(active):
+            for i, (_, votes) in enumerate(voters):
+                first, last = min(done, int(sizes[i, 0])), min(stop, int(sizes[i, 0]))
+                if last > first:
+                    v = votes(inputs[i][active], first, last)
+                    total[i, active] += v.sum(axis=0)
+                    squares[i, active] += np.square(v).sum(axis=0)
+                    counts[i, active] = last
+            done, stop = stop, 2 * stop
+            if done >= sizes.max():
+                break
+            active = active[~self._settled(total[:, active], squares[:, active], counts[:, active], sizes,
+                                           z, threshold)]
+            if deadline is not None and len(active) and time.perf_counter() >= deadline:
+                exhausted = len(active)
+                break
+        positive = np.zeros(X.shape[0], dtype=np.float64)
+        for (_, calibrator), vote in zip(self.members, total / counts):
+            positive += calibrator(vote) if calibrator is not None else vote
+        return EarlyExit(_average(positive, len(self.members)), counts.sum(axis=0).astype(np.intp),
+                         self.n_trees, exhausted)
+
+    def _settled(self, total, squares, counts, sizes, z, threshold) -> np.ndarray:
+        """Rows whose probability bounds (running vote +/- z standard errors) fall on one side of threshold"""
+        mean = total / counts
+        variance = np.maximum(squares - counts * mean * mean, 0.0) / np.maximum(counts - 1, 1)
+        margin = z * np.sqrt(variance * (1.0 - counts / sizes) / counts)
+        low = np.zeros(total.shape[1])
+        high = np.zeros(total.shape[1])
+        for (_, calibrator), lo, hi in zip(self.members, np.clip(mean - margin, 0, 1), np.clip(mean + margin, 0, 1)):
+            if calibrator is not None:
+                lo, hi = calibrator(lo), calibrator(hi)
+            low += np.minimum(lo, hi)  # a sigmoid calibrator may decrease
+            high += np.maximum(lo, hi)
+        n = len(self.members)
+        return (low / n >= threshold) | (high / n < threshold)
+
+
+def _average(positive: np.ndarray, members: int) -> np.ndarray:
+    positive /= members
+    # CalibratedClassifierCV clips values that minimally exceed 1.0
+    positive[(positive > 1.0) & (positive <= 1.0 + 1e-5)] = 1.0
+    return positive
+
+
+def unwrap_frozen(estimator):
+    """Strip FrozenEstimator wrappers used for prefit calibration"""
+    while type(estimator).__name__ == "FrozenEstimator":
+        estimator = estimator.estimator
+    return estimator
+
+
+def model_pipelines(model) -> List[Any]:
+    """The (imputer +) forest pipeline of each calibration member, unwrapped, or the model itself"""
+    if hasattr(model, "calibrated_classifiers_"):
+        return [unwrap_frozen(member.estimator) for member in model.calibrated_classifiers_]
+    return [model]
+
+
+def pipeline_parts(estimator) -> Tuple[Any, Any]:
+    """
+    (imputer or None, forest) of an ``[SimpleImputer] -> RandomForestClassifier`` pipeline
+
+    Raises TypeError for any other shape, so every caller accepts the same models.
+    """
+    estimator = unwrap_frozen(estimator)
+    steps = [step for _, step in estimator.steps] if hasattr(estimator, "steps") else [estimator]
+    steps = [step for step in steps if step not in (None, "passthrough")]
+
+    imputer = None
+    if len(steps) == 2 and type(steps[0]).__name__ == "SimpleImputer":
+        imputer = steps[0]
+        if getattr(imputer, "add_indicator", False):
+            raise TypeError("SimpleImputer with add_indicator is not supported")
+        if not (isinstance(imputer.missing_values, float) and np.isnan(imputer.missing_values)):
+            raise TypeError("SimpleImputer must impute NaN values")
+        steps = steps[1:]
+    if len(steps) != 1:
+        raise TypeError("Expected a pipeline of an optional SimpleImputer followed by a forest")
+
+    forest = steps[0]
+    if not hasattr(forest, "estimators_") or not hasattr(forest, "classes_"):
+        raise TypeError(f"Unsupported estimator: {type(forest).__name__}")
+    if getattr(forest, "n_outputs_", 1) != 1 or len(forest.classes_) != 2:
+        raise TypeError("Only single-output binary forests are supported")
+    return imputer, forest
+
+
+def _members(model) -> List[Tuple[Any, Any]]:
+    """(imputer or None, forest) of every member of a compilable model"""
+    return [pipeline_parts(pipeline) for pipeline in model_pipelines(model)]
+
+
+def _appliers(model) -> List[Callable[[np.ndarray], np.ndarray]]:
+    """sklearn leaf finder (raw float64 rows -> per-tree node ids) of every member of a compilable model"""
+    return [_applier(imputer, forest) for imputer, forest in _members(model)]
+
+
+def _voters(model) -> List[Tuple[Callable[[np.ndarray], np.ndarray], Callable[[np.ndarray, int, int], np.ndarray]]]:
+    """sklearn versions of (CompiledForest.transform, CompiledForest.tree_votes) for every member"""
+    voters = []
+    for imputer, forest in _members(model):
+        def prepare(X, imputer=imputer, forest=forest):
+            X = _frame(X, imputer, forest)
+            return np.ascontiguousarray(X if imputer is None else imputer.transform(X), dtype=np.float32)
+
+        def votes(X32, start, stop, trees=forest.estimators_):
+            return np.array([tree.predict_proba(X32, check_input=False)[:, 1] for tree in trees[start:stop]])
+        voters.append((prepare, votes))
+    return voters
+
+
+def _frame(X, imputer, forest):
+    names = getattr(imputer if imputer is not None else forest, "feature_names_in_", None)
+    if names is None:
+        return X
+    import pandas as pd  # fitted with column names; avoids sklearn's feature-name warning
+    return pd.DataFrame(X, columns=names)
+
+
+def _applier(imputer, forest):
+    def apply(X):
+        X = _frame(X, imputer, forest)
+        return forest.apply(X if imputer is None else imputer.transform(X))
+    return apply
+
+
+def compile_pipeline(estimator) -> CompiledForest:
+    """Compile ``[SimpleImputer] -> RandomForestClassifier`` into a CompiledForest"""
+    return CompiledForest(*pipeline_parts(estimator))
+
+
+def compile_model(model) -> CompiledModel:
+    """
+    Flatten a fitted model bundle into a CompiledModel
+
+    Raises TypeError when the model is not a (calibrated) Random Forest pipeline.
+    """
+    if hasattr(model, "calibrated_classifiers_"):
+        members = []
+        for calibrated in model.calibrated_classifiers_:
+            if len(calibrated.calibrators) != 1:
+                raise TypeError("Only binary calibration is supported")
+            members.append((compile_pipeline(calibrated.estimator), CompiledCalibrator(calibrated.calibrators[0])))
+        return CompiledModel(members)
+    return CompiledModel([(compile_pipeline(model), None)])
+
+
+def _compact_forest(forest: CompiledForest, storage: str) -> CompiledForest:
+    compact = copy.copy(forest)
+    # Largest float32 <= threshold: float32 inputs go left exactly when they did before
+    threshold = forest.threshold.astype(np.float32)
+    too_high = threshold.astype(np.float64) > forest.threshold
+    threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+    compact.threshold = threshold
+    if storage == "float32":
+        compact.leaf_value = forest.leaf_value.astype(np.float32)
+    else:
+        levels = np.iinfo(storage).max
+        compact.leaf_value = np.rint(forest.leaf_value * levels).astype(storage)
+        compact.leaf_scale = 1.0 / levels
+    return compact
+
+
+def with_storage(compiled: CompiledModel, storage: str) -> CompiledModel:
+    """
+    The same model with smaller arrays (one of STORAGE_TYPES)
+
+    Thresholds become float32. Leaf values become float32 or fixed-point
+    fractions; uint16 moves each leaf by at most 7.7e-6, uint8 by at most
+    2e-3. Node indices stay intp: narrower index arrays are converted on
+    every gather, which made single rows slower. "float64" returns
+    `compiled` unchanged.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unsupported storage {storage!r}, expected one of {STORAGE_TYPES}")
+    if storage == "float64":
+        return compiled
+    return CompiledModel([(_compact_forest(forest, storage), calibrator) for forest, calibrator in compiled.members])
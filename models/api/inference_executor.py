@@ -0,0 +1,71 @@
+"""
+Executor layer that keeps CPU-bound work off the asyncio event loop
+
+Scoring and model loading are synchronous; running them inside `async def`
+handlers stalls every other request on the worker, including /health.
+InferenceExecutor runs them in a thread pool (default) or a process pool.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+class InferenceExecutor:
+    """
+    Run scoring in a thread or process pool and in-process work in a thread pool
+
+    - thread: scoring and loading share one thread pool; sklearn trees and
+      NumPy release the GIL for most of the work
+    - process: scoring runs in worker processes that hold their own copy of
+      the model (call `restart()` after a reload); loading and work that
+      touches in-process objects still use a thread
+    - inline: run everything on the event loop (previous behaviour)
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None,
+                 initializer: Optional[Callable[[], None]] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}, expected one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.initializer = initializer
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        if kind != "inline":
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        if kind == "process":
+            self._processes = self._make_process_pool()
+
+    def _make_process_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+
+    async def _submit(self, pool: Optional[Executor], fn: Callable, *args) -> Any:
+        if pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a picklable scoring function in the pool (worker process in process mode)"""
+        return await self._submit(self._processes or self._threads, fn, *args)
+
+    async def run_in_thread(self, fn: Callable, *args) -> Any:
+        """Run work that must see this process's state (model loading, frame building)"""
+        return await self._submit(self._threads, fn, *args)
+
+    def restart(self):
+        """Replace worker processes so they pick up a newly loaded model"""
+        if self._processes is not None:
+            old, self._processes = self._processes, self._make_process_pool()
+            old.shutdown(wait=False)
+
+    def shutdown(self):
+        for pool in (self._processes, self._threads):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "max_workers": self.max_workers}
@@ -0,0 +1,31 @@
+"""
+Labelled validation rows for the offline model tools
+
+compact_model.py and early_exit_report.py measure variants against labels.
+They read them with exo_classification's `thresholds.labelled_rows`, the
+loader threshold re-tuning and evaluation use, so every tool agrees on
+which rows are labelled and how TOI columns map to KOI features.
+"""
+
+import os
+import sys
+from typing import Sequence, Tuple
+
+import numpy as np
+
+EXO_CLASSIFICATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      "exo_classification")
+if EXO_CLASSIFICATION_DIR not in sys.path:
+    sys.path.append(EXO_CLASSIFICATION_DIR)
+
+from thresholds import evaluate_threshold, labelled_rows as _labelled_frame  # noqa: E402
+
+
+def labelled_rows(path: str, features: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """float64 feature matrix (columns in `features` order) and 0/1 labels of a labelled CSV"""
+    frame, labels = _labelled_frame(path, features, cache_dir=None)
+    return frame.to_numpy(dtype=np.float64), np.asarray(labels, dtype=np.int64)
+
+
+def f1(y: np.ndarray, proba: np.ndarray, threshold: float) -> float:
+    return evaluate_threshold(y, proba, threshold).f1
@@ -4,17 +4,35 @@ FastAPI wrapper for Exoplanet Classification Random Forest Model
 
 import os
 import sys
+import json
+import time
 import joblib
 import numpy as np
-import pandas as pd
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field, validator
-from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field, ValidationError, validator
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from starlette.requests import ClientDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 
 # Add parent directory to path to access model files
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Make sibling modules importable when launched as `models.api.main:app`
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from inference_executor import InferenceExecutor
+from batch_response import (BATCH_LAYOUTS, add_trees_used, encode_batch_columns, encode_explanations,
+                            postprocess_batch, prediction_lines)
+from columnar import binary_to_matrix, columns_to_matrix, validate_matrix
+from forest_engine import EarlyExit
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ApiMetrics, MetricsMiddleware, endpoint_label
+from micro_batcher import MicroBatcher
+from model_artifact import artifact_path, fresh_artifact_for, is_artifact, load_artifact
+from model_registry import ModelRegistry, ModelSnapshot, model_name_from_path, parse_assignments
+from prediction_cache import PredictionCache, canonical_features
+from profiling import RequestProfiler, active as profiling_active
+from streaming import BodyStreamingResponse, detect_format, iter_line_chunks, parse_csv_header, parse_line
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,10 +52,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables for model and metadata
-model = None
-model_metadata = {}
-model_loaded = False
+# Prometheus metrics at /metrics (request and per-stage latency, batch sizes, errors, model loads)
+METRICS_ENABLED = os.getenv("EXO_API_METRICS", "1") != "0"
+metrics = ApiMetrics(enabled=METRICS_ENABLED)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Opt-in cProfile of single requests: `X-Profile: 1|inline` / `?profile=` when enabled, or random sampling
+profiler = RequestProfiler(
+    on_demand=os.getenv("EXO_API_PROFILING", "0") == "1",
+    sample_rate=float(os.getenv("EXO_API_PROFILE_SAMPLE_RATE", "0")),
+    directory=os.getenv("EXO_API_PROFILE_DIR", "profiles"),
+    keep=int(os.getenv("EXO_API_PROFILE_KEEP", "100"))
+)
+
+# Batches larger than this go through sklearn, whose per-call overhead is amortized
+COMPILED_MAX_ROWS = int(os.getenv("EXO_API_COMPILED_MAX_ROWS", "512"))
+
+# Early-exit scoring (`?early_exit=true` or `?budget_ms=`): one-sided confidence that a row stopped
+# early keeps its full-forest class, and the trees evaluated before the first check
+EARLY_EXIT_CONFIDENCE = float(os.getenv("EXO_API_EARLY_EXIT_CONFIDENCE", "0.999"))
+EARLY_EXIT_MIN_TREES = int(os.getenv("EXO_API_EARLY_EXIT_MIN_TREES", "32"))
+
+# Optional coalescing of concurrent /predict calls (disabled when the window is 0)
+MICROBATCH_WINDOW_MS = float(os.getenv("EXO_API_MICROBATCH_WINDOW_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.getenv("EXO_API_MICROBATCH_MAX_SIZE", "256"))
+
+# Where scoring and model loading run: "thread" (default), "process" or "inline"
+EXECUTOR_KIND = os.getenv("EXO_API_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.getenv("EXO_API_EXECUTOR_WORKERS", "0")) or None
+inference_executor = None
+
+# LRU cache of probabilities keyed by features, model version and threshold (0 disables)
+CACHE_SIZE = int(os.getenv("EXO_API_CACHE_SIZE", "10000"))
+prediction_cache = PredictionCache(CACHE_SIZE) if CACHE_SIZE > 0 else None
+
+# Rows parsed, scored and streamed back at a time by /predict/stream
+STREAM_CHUNK_ROWS = int(os.getenv("EXO_API_STREAM_CHUNK_ROWS", "5000"))
+
+# Named bundles served side by side (`rf=path,logreg=path`); default: first bundle found in MODEL_PATHS
+MODEL_SPECS = os.getenv("EXO_API_MODELS", "")
+DEFAULT_MODEL = os.getenv("EXO_API_DEFAULT_MODEL") or None
+# Optional weighted routing of requests that do not name a model (`rf=90,logreg=10`)
+TRAFFIC_SPLIT = os.getenv("EXO_API_TRAFFIC_SPLIT", "")
+
+# Open `<bundle>.mmap` artifacts (see export_model.py) memory-mapped instead of the .joblib bundle
+USE_MMAP = os.getenv("EXO_API_MMAP", "1") != "0"
+
+MODEL_PATHS = [
+    "models/best_koi_reduced_rf.joblib",
+    "../exo_classification/models/best_koi_reduced_rf.joblib",
+    "exo_classification/models/best_koi_reduced_rf.joblib",
+    "test_classification/models/best_koi_reduced_rf.joblib"
+]
+
+def _on_model_published():
+    # Cached probabilities may come from the replaced version
+    if prediction_cache is not None:
+        prediction_cache.clear()
+
+# Cap on sklearn n_jobs inside loaded models (0 keeps the bundle's setting, n_jobs=-1 for the forest)
+SKLEARN_JOBS = int(os.getenv("EXO_API_SKLEARN_JOBS", "0")) or None
+
+# Loaded models; each request resolves one immutable snapshot and uses it throughout
+registry = ModelRegistry(COMPILED_MAX_ROWS, on_publish=_on_model_published, n_jobs=SKLEARN_JOBS)
+micro_batchers: Dict[str, tuple] = {}  # name -> (snapshot, MicroBatcher)
 
 # Pydantic models for request/response
 class ExoplanetFeatures(BaseModel):
@@ -81,73 +160,101 @@ class PredictionResponse(BaseModel):
     confidence: str = Field(..., description="Confidence level (LOW/MEDIUM/HIGH)")
     threshold_used: float = Field(..., description="Classification threshold used")
     model_info: Dict[str, Any] = Field(..., description="Model metadata")
+    trees_used: Optional[int] = Field(None, description="Trees behind the probability (early-exit scoring only)")
 
 class BatchPredictionRequest(BaseModel):
     """Request model for batch predictions"""
     candidates: List[ExoplanetFeatures] = Field(..., description="List of exoplanet candidates")
 
+class ColumnarBatchRequest(BaseModel):
+    """Columnar request model for batch predictions"""
+    columns: Dict[str, List[Optional[float]]] = Field(..., description="One array per feature; null or an absent column means missing")
+
+def _batch_request_schema() -> Dict[str, Any]:
+    """OpenAPI request body for /predict/batch, which parses its body by Content-Type"""
+    candidates = BatchPredictionRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+    candidates.pop("$defs", None)
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"oneOf": [candidates, ColumnarBatchRequest.model_json_schema()]}},
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary",
+            "description": "Little-endian row-major float matrix, one column per feature in `features` order, NaN for missing values"}}
+    }}}
+
 class BatchPredictionResponse(BaseModel):
     """Response model for batch predictions"""
     predictions: List[Dict[str, Any]] = Field(..., description="List of predictions")
     summary: Dict[str, Any] = Field(..., description="Summary statistics")
 
+class ExplanationResponse(BaseModel):
+    """Response model for feature-contribution explanations"""
+    features: List[str] = Field(..., description="Feature names, in contribution order")
+    base_value: float = Field(..., description="Forest vote before any split (mean positive fraction at the tree roots)")
+    explanations: List[Dict[str, Any]] = Field(..., description="Per candidate: prediction fields, forest_vote and contributions per feature")
+    summary: Dict[str, Any] = Field(..., description="Summary statistics")
+
+class RoutingUpdate(BaseModel):
+    """Request model for changing model routing"""
+    default: Optional[str] = Field(None, description="Model used when a request names none and no split is set")
+    traffic_split: Optional[Dict[str, float]] = Field(None, description="Relative weights per model name; {} disables the split")
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     model_loaded: bool
     model_info: Optional[Dict[str, Any]] = None
 
-def load_model():
-    """Load the trained model and metadata"""
-    global model, model_metadata, model_loaded
-    
+def activate_model(bundle, name: Optional[str] = None, source: Optional[str] = None,
+                   make_default: bool = False) -> ModelSnapshot:
+    """Load, compile and warm a bundle (dict or legacy estimator), then publish it in one swap"""
+    if name is None:
+        name, make_default = registry.state.default or "default", True
+    snapshot = registry.load(bundle, name, source=source, make_default=make_default)
+    print(f"✅ Model {snapshot.label} loaded successfully. Threshold: {snapshot.threshold:.3f}")
+    return snapshot
+
+def model_sources() -> Dict[str, str]:
+    """Configured `{name: bundle path}`, or the first bundle found in MODEL_PATHS"""
+    if MODEL_SPECS:
+        return parse_assignments(MODEL_SPECS)
+    for path in MODEL_PATHS:
+        if os.path.exists(path) or is_artifact(artifact_path(path)):
+            return {model_name_from_path(path): path}
+    raise FileNotFoundError("Model file not found in any expected location")
+
+def open_bundle(path: str):
+    """An artifact directory, the up-to-date artifact exported next to a bundle, or the bundle itself"""
+    if is_artifact(path):
+        return load_artifact(path)
+    artifact = fresh_artifact_for(path) if USE_MMAP else None
+    if artifact is not None:
+        print(f"✅ Memory-mapping model artifact: {artifact}")
+        return load_artifact(artifact)
+    return joblib.load(path)
+
+def load_model(name: Optional[str] = None):
+    """Load the trained model(s) and publish each once it is ready"""
     try:
-        # Try to find the model file
-        model_paths = [
-            "models/best_koi_reduced_rf.joblib",
-            "../exo_classification/models/best_koi_reduced_rf.joblib",
-            "exo_classification/models/best_koi_reduced_rf.joblib",
-            "test_classification/models/best_koi_reduced_rf.joblib"
-        ]
+        sources = model_sources()
+        if name is not None:
+            if name not in sources:
+                raise KeyError(f"No bundle configured for model {name!r}, configured: {list(sources)}")
+            sources = {name: sources[name]}
         
-        model_path = None
-        for path in model_paths:
-            if os.path.exists(path):
-                model_path = path
-                break
+        initial = not registry.loaded
+        for model_name, model_path in sources.items():
+            start = time.perf_counter()
+            bundle = open_bundle(model_path)
+            print(f"✅ Loaded model from: {model_path}")
+            activate_model(bundle, model_name, source=model_path)
+            metrics.record_load(model_name, time.perf_counter() - start)
         
-        if model_path is None:
-            raise FileNotFoundError("Model file not found in any expected location")
-        
-        # Load the model bundle
-        bundle = joblib.load(model_path)
-        print(f"✅ Loaded model from: {model_path}")
-        
-        if isinstance(bundle, dict):
-            # New bundle format
-            model = bundle.get("model")
-            model_metadata = {
-                "threshold": bundle.get("threshold", 0.5),
-                "features": bundle.get("features", ["koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl"]),
-                "model_type": "Random Forest",
-                "version": "1.0.0"
-            }
-        else:
-            # Legacy format
-            model = bundle
-            model_metadata = {
-                "threshold": 0.5,
-                "features": ["koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl"],
-                "model_type": "Random Forest",
-                "version": "1.0.0"
-            }
-        
-        model_loaded = True
-        print(f"✅ Model loaded successfully. Threshold: {model_metadata['threshold']:.3f}")
+        # Configured routing applies at startup; later changes go through PUT /models/routing
+        if initial:
+            split = {k: float(v) for k, v in parse_assignments(TRAFFIC_SPLIT).items()} if TRAFFIC_SPLIT else None
+            registry.set_routing(default=DEFAULT_MODEL, split=split)
         
     except Exception as e:
         print(f"❌ Error loading model: {e}")
-        model_loaded = False
         raise e
 
 def get_confidence_level(probability: float) -> str:
@@ -159,14 +266,329 @@ def get_confidence_level(probability: float) -> str:
     else:
         return "LOW"
 
+def features_to_row(features: ExoplanetFeatures, snapshot: Optional[ModelSnapshot] = None) -> np.ndarray:
+    """
+    (1, n_features) float64 row in the model's training feature order
+
+    A new array per call, not a shared buffer: it is scored in an executor
+    thread while other requests build theirs, and snapshots differ in features.
+    """
+    feature_order = (snapshot or registry.get()).features
+    # Missing optional fields become NaN, like reindex + to_numeric
+    return np.array([[getattr(features, name, None) for name in feature_order]], dtype=np.float64)
+
+def predict_proba(X, name: Optional[str] = None) -> np.ndarray:
+    """Score rows with a named (or the default) model; picklable entry point for worker processes"""
+    return registry.get(name).predict_proba(X)
+
+def explain_rows(X, name: Optional[str] = None):
+    """Explain rows with a named (or the default) model; picklable entry point for worker processes"""
+    return registry.get(name).explain(X)
+
+def predict_early_rows(X, name: Optional[str] = None, budget: Optional[float] = None) -> EarlyExit:
+    """Early-exit scoring with a named (or the default) model; picklable entry point for worker processes"""
+    return registry.get(name).predict_early(X, budget, EARLY_EXIT_CONFIDENCE, EARLY_EXIT_MIN_TREES)
+
+def candidates_to_matrix(candidates: List[ExoplanetFeatures], feature_order) -> np.ndarray:
+    """Feature matrix for a batch in training feature order; missing optional fields become NaN"""
+    X = np.array([[getattr(candidate, name, None) for name in feature_order] for candidate in candidates],
+                 dtype=np.float64)
+    return X.reshape(len(candidates), len(feature_order))
+
+def parse_batch_body(body: bytes, content_type: str, dtype: str, feature_order,
+                     endpoint: str = "/predict/batch") -> np.ndarray:
+    """
+    Decode a /predict/batch (or /predict/explain) body into a validated feature matrix
+    
+    - `{"candidates": [...]}`: validated per row by ExoplanetFeatures
+    - `{"columns": {...}}`: one array per feature, validated with vectorized masks
+    - `application/octet-stream`: raw float matrix, validated with vectorized masks
+    """
+    feature_order = list(feature_order)
+    if "octet-stream" in content_type:
+        with metrics.stage(endpoint, "frame"):
+            X = binary_to_matrix(body, len(feature_order), dtype)
+    else:
+        with metrics.stage(endpoint, "validation"):
+            try:
+                payload = json.loads(body)
+            except ValueError as e:
+                raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": f"JSON decode error: {e}", "input": {}}])
+            columnar = isinstance(payload, dict) and "columns" in payload
+            if not columnar:
+                try:
+                    candidates = BatchPredictionRequest.model_validate(payload).candidates
+                except ValidationError as e:
+                    raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+        with metrics.stage(endpoint, "frame"):
+            if not columnar:
+                return candidates_to_matrix(candidates, feature_order)
+            X = columns_to_matrix(payload["columns"], feature_order)
+    
+    with metrics.stage(endpoint, "validation"):
+        failures = validate_matrix(X, feature_order)
+    if failures:
+        raise HTTPException(status_code=422, detail=failures)
+    return X
+
+def ensure_model_loaded():
+    """Process-pool initializer: load the models unless they were inherited via fork"""
+    if not registry.loaded:
+        load_model()
+
+async def offload(fn, *args):
+    """Run in-process work (frame building, model loading) on an executor thread"""
+    # Profiled requests run inline so the profile holds their whole call tree
+    if inference_executor is None or profiling_active():
+        return fn(*args)
+    return await inference_executor.run_in_thread(fn, *args)
+
+async def score_rows(X, snapshot: ModelSnapshot, endpoint: str = "/predict") -> np.ndarray:
+    """Run predict_proba in the inference executor so the event loop stays responsive"""
+    start = time.perf_counter()
+    if inference_executor is None or profiling_active():
+        probabilities = snapshot.predict_proba(X)
+    elif inference_executor.kind == "process":
+        # Workers hold their own registry; send the name rather than pickling the model
+        probabilities = await inference_executor.run(predict_proba, X, snapshot.name)
+    else:
+        probabilities = await inference_executor.run(snapshot.predict_proba, X)
+    elapsed = time.perf_counter() - start
+    registry.record(snapshot, len(X), elapsed, probabilities[:, 1])
+    metrics.observe_stage(endpoint, "predict_proba", elapsed)
+    metrics.observe_model_call(snapshot.name, len(X))
+    return probabilities
+
+async def explain_batch(X, snapshot: ModelSnapshot, endpoint: str = "/predict/explain"):
+    """Run snapshot.explain in the inference executor, recorded like a scoring call"""
+    start = time.perf_counter()
+    if inference_executor is None or profiling_active():
+        explanation = snapshot.explain(X)
+    elif inference_executor.kind == "process":
+        explanation = await inference_executor.run(explain_rows, X, snapshot.name)
+    else:
+        explanation = await inference_executor.run(snapshot.explain, X)
+    elapsed = time.perf_counter() - start
+    registry.record(snapshot, len(X), elapsed, explanation.probability)
+    metrics.observe_stage(endpoint, "predict_proba", elapsed)
+    metrics.observe_model_call(snapshot.name, len(X))
+    return explanation
+
+def early_exit_deadline(snapshot: ModelSnapshot, early_exit: bool, budget_ms: Optional[float]):
+    """(enabled, perf_counter deadline or None) of a request's early-exit options; 400 when unusable"""
+    if not early_exit and budget_ms is None:
+        return False, None
+    if budget_ms is not None and not budget_ms >= 0:
+        raise HTTPException(status_code=400, detail="budget_ms must be a non-negative number")
+    if snapshot.compiled is None:
+        raise HTTPException(status_code=400, detail=f"Model {snapshot.label} ({snapshot.model_type}) does not support early-exit scoring; only Random Forest bundles do")
+    return True, None if budget_ms is None else time.perf_counter() + budget_ms / 1000.0
+
+async def score_early(X, snapshot: ModelSnapshot, endpoint: str, deadline: Optional[float]) -> EarlyExit:
+    """Run snapshot.predict_early in the inference executor with what is left of the budget"""
+    start = time.perf_counter()
+    budget = None if deadline is None else max(0.0, deadline - start)
+    if inference_executor is None or profiling_active():
+        result = snapshot.predict_early(X, budget, EARLY_EXIT_CONFIDENCE, EARLY_EXIT_MIN_TREES)
+    elif inference_executor.kind == "process":
+        result = await inference_executor.run(predict_early_rows, X, snapshot.name, budget)
+    else:
+        result = await inference_executor.run(snapshot.predict_early, X, budget, EARLY_EXIT_CONFIDENCE,
+                                              EARLY_EXIT_MIN_TREES)
+    elapsed = time.perf_counter() - start
+    registry.record(snapshot, len(X), elapsed, result.probability)
+    metrics.observe_stage(endpoint, "predict_proba", elapsed)
+    metrics.observe_model_call(snapshot.name, len(X))
+    return result
+
+def get_micro_batcher(snapshot: ModelSnapshot) -> MicroBatcher:
+    """Micro-batcher for one snapshot, so a batch never mixes model versions"""
+    current, batcher = micro_batchers.get(snapshot.name, (None, None))
+    if current is not snapshot:
+        batcher = MicroBatcher(lambda X: score_rows(X, snapshot), window_ms=MICROBATCH_WINDOW_MS,
+                               max_batch_size=MICROBATCH_MAX_SIZE)
+        micro_batchers[snapshot.name] = (snapshot, batcher)
+    return batcher
+
+def cache_keys(X: np.ndarray, snapshot: ModelSnapshot) -> List[tuple]:
+    """Prediction cache keys for the rows of X"""
+    model_key = (snapshot.name, snapshot.version, snapshot.threshold)
+    return [(model_key, canonical_features(values)) for values in X.tolist()]
+
+def lookup_cached(X: np.ndarray, snapshot: ModelSnapshot):
+    """Cached probabilities for the rows of X (NaN where missing), their keys and the cache generation"""
+    generation = prediction_cache.generation
+    keys = cache_keys(X, snapshot)
+    cached = prediction_cache.get_many(keys)
+    probabilities = np.array([np.nan if p is None else p for p in cached], dtype=np.float64)
+    return probabilities, keys, generation
+
+async def predict_probabilities(X: np.ndarray, snapshot: ModelSnapshot, endpoint: str = "/predict") -> np.ndarray:
+    """Positive-class probabilities, scoring only the rows missing from the prediction cache"""
+    if prediction_cache is None:
+        return (await score_rows(X, snapshot, endpoint))[:, 1]
+    
+    if len(X) == 1:
+        probabilities, keys, generation = lookup_cached(X, snapshot)
+    else:
+        probabilities, keys, generation = await offload(lookup_cached, X, snapshot)
+    missing = np.flatnonzero(np.isnan(probabilities))
+    if len(missing) > 0:
+        scored = (await score_rows(X[missing], snapshot, endpoint))[:, 1]
+        probabilities[missing] = scored
+        prediction_cache.put_many([keys[i] for i in missing], scored, generation)
+    return probabilities
+
+async def early_exit_probabilities(X: np.ndarray, snapshot: ModelSnapshot, endpoint: str,
+                                   deadline: Optional[float]) -> EarlyExit:
+    """
+    Early-exit scoring of the rows missing from the prediction cache
+    
+    Cache hits are full-forest probabilities and count all trees; early-exit
+    results are approximate and never cached.
+    """
+    probabilities = np.full(len(X), np.nan)
+    if prediction_cache is not None:
+        if len(X) == 1:
+            probabilities = lookup_cached(X, snapshot)[0]
+        else:
+            probabilities = (await offload(lookup_cached, X, snapshot))[0]
+    trees = np.full(len(X), snapshot.compiled.n_trees, dtype=np.intp)
+    missing = np.flatnonzero(np.isnan(probabilities))
+    exhausted = 0
+    if len(missing) > 0:
+        result = await score_early(X[missing], snapshot, endpoint, deadline)
+        probabilities[missing] = result.probability
+        trees[missing] = result.trees
+        exhausted = result.budget_exhausted
+    return EarlyExit(probabilities, trees, snapshot.compiled.n_trees, exhausted)
+
+def encode_batch(probabilities: np.ndarray, threshold: float, layout: str,
+                 early_exit: Optional[EarlyExit] = None) -> bytes:
+    """/predict/batch response body, timing post-processing and serialization separately"""
+    with metrics.stage("/predict/batch", "postprocess"):
+        columns = postprocess_batch(probabilities, threshold)
+        if early_exit is not None:
+            add_trees_used(columns, early_exit)
+    with metrics.stage("/predict/batch", "serialization"):
+        return encode_batch_columns(columns, layout)
+
+def describe_error(e: Exception) -> str:
+    """One-line description of a parsing or validation error"""
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+def validate_lines(lines: List[bytes], fmt: str, header: Optional[List[str]], first_id: int, feature_order):
+    """Parse and validate a chunk of streamed lines into ids, a feature matrix and error records"""
+    ids, candidates, errors = [], [], []
+    with metrics.stage("/predict/stream", "validation"):
+        for offset, line in enumerate(lines):
+            try:
+                candidates.append(ExoplanetFeatures(**parse_line(line, fmt, header)))
+            except ValueError as e:
+                errors.append({"candidate_id": first_id + offset, "error": describe_error(e)})
+                continue
+            ids.append(first_id + offset)
+    with metrics.stage("/predict/stream", "frame"):
+        X = candidates_to_matrix(candidates, feature_order)
+    return ids, X, errors
+
+def format_stream_chunk(ids: List[int], probabilities: np.ndarray, errors: List[Dict[str, Any]],
+                        threshold: float) -> str:
+    """NDJSON lines for a scored chunk, in input order"""
+    lines = list(zip(ids, prediction_lines(probabilities, threshold, ids)))
+    if errors:
+        lines += [(error["candidate_id"], json.dumps(error, separators=(",", ":"))) for error in errors]
+        lines.sort(key=lambda line: line[0])
+    return "".join(line + "\n" for _, line in lines)
+
+async def stream_predictions(body, fmt: str, snapshot: ModelSnapshot):
+    """Score an NDJSON/CSV body chunk by chunk, yielding NDJSON results and a final summary"""
+    endpoint = "/predict/stream"
+    threshold = snapshot.threshold
+    header = None
+    next_id = 0
+    scored = planets = high_confidence = invalid = 0
+    probability_sum = 0.0
+    try:
+        async for lines in iter_line_chunks(body, STREAM_CHUNK_ROWS):
+            if fmt == "csv" and header is None:
+                header = parse_csv_header(lines[0])
+                lines = lines[1:]
+                if not lines:
+                    continue
+            
+            ids, X, errors = await offload(validate_lines, lines, fmt, header, next_id, snapshot.features)
+            next_id += len(lines)
+            probabilities = await predict_probabilities(X, snapshot, endpoint) if len(X) > 0 else np.empty(0)
+            with metrics.stage(endpoint, "serialization"):
+                chunk = await offload(format_stream_chunk, ids, probabilities, errors, threshold)
+            yield chunk
+            
+            scored += len(probabilities)
+            invalid += len(errors)
+            planets += int((probabilities >= threshold).sum())
+            high_confidence += int(((probabilities >= 0.8) | (probabilities <= 0.2)).sum())
+            probability_sum += float(probabilities.sum())
+    except ClientDisconnect as e:
+        metrics.count_error(endpoint, e)
+        return
+    except Exception as e:
+        metrics.count_error(endpoint, e)
+        yield json.dumps({"error": f"Streaming prediction failed: {str(e)}"}, separators=(",", ":")) + "\n"
+        return
+    
+    metrics.observe_batch(endpoint, scored + invalid)
+    yield json.dumps({"summary": {
+        "total_candidates": scored,
+        "invalid_candidates": invalid,
+        "predicted_planets": planets,
+        "predicted_false_positives": scored - planets,
+        "mean_probability": round(probability_sum / scored, 4) if scored else None,
+        "high_confidence": high_confidence,
+        "threshold_used": round(threshold, 4)
+    }}, separators=(",", ":")) + "\n"
+
+def resolve_model(name: Optional[str] = None) -> ModelSnapshot:
+    """Snapshot serving this request: `?model=` if given, else traffic split or the default"""
+    if not registry.loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        return registry.route(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """Default 422 response, counted in the error metrics"""
+    metrics.count_error(endpoint_label(request.scope), exc)
+    return await request_validation_exception_handler(request, exc)
+
 @app.on_event("startup")
 async def startup_event():
-    """Load model on startup"""
+    """Load model on startup (pre-forked workers inherit it from the supervisor)"""
+    global inference_executor
     try:
-        load_model()
+        if not registry.loaded:
+            load_model()
     except Exception as e:
         print(f"⚠️  Model loading failed: {e}")
         print("API will start but predictions will fail until model is loaded")
+    
+    # Created after loading so forked worker processes inherit the model
+    inference_executor = InferenceExecutor(EXECUTOR_KIND, max_workers=EXECUTOR_WORKERS,
+                                           initializer=ensure_model_loaded)
+    print(f"✅ Inference executor: {inference_executor.kind} ({inference_executor.max_workers} workers)")
+    
+    if MICROBATCH_WINDOW_MS > 0:
+        print(f"✅ Micro-batching enabled: {MICROBATCH_WINDOW_MS} ms window, up to {MICROBATCH_MAX_SIZE} rows")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop executor threads and worker processes"""
+    if inference_executor is not None:
+        inference_executor.shutdown()
 
 @app.get("/", response_model=Dict[str, str])
 async def root():
@@ -181,14 +603,17 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
+    loaded = registry.loaded
     return HealthResponse(
-        status="healthy" if model_loaded else "unhealthy",
-        model_loaded=model_loaded,
-        model_info=model_metadata if model_loaded else None
+        status="healthy" if loaded else "unhealthy",
+        model_loaded=loaded,
+        model_info=registry.get().metadata() if loaded else None
     )
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_single(features: ExoplanetFeatures):
+@profiler.profiled("predict")
+async def predict_single(features: ExoplanetFeatures, request: Request, model: Optional[str] = None,
+                         early_exit: bool = False, budget_ms: Optional[float] = None):
     """
     Predict exoplanet classification for a single candidate
     
@@ -198,109 +623,180 @@ async def predict_single(features: ExoplanetFeatures):
     - **koi_impact**: Impact parameter (optional, 0-1)
     - **koi_srho**: Stellar density (optional, g/cm³)
     - **koi_incl**: Orbital inclination (optional, degrees)
+    - **model** (query): name of a loaded model; defaults to the traffic split or default model
+    - **early_exit** (query): stop evaluating trees once the class is settled; reports `trees_used`
+    - **budget_ms** (query): latency budget for early-exit scoring (implies `early_exit`)
     """
-    if not model_loaded:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    endpoint = "/predict"
+    metrics.observe_since_request_start(endpoint, "validation", request.scope)
+    snapshot = resolve_model(model)
+    early, deadline = early_exit_deadline(snapshot, early_exit, budget_ms)
     
     try:
-        # Convert to DataFrame with correct feature order
-        feature_dict = features.dict()
-        df = pd.DataFrame([feature_dict])
-        
-        # Reorder columns to match training order
-        feature_order = model_metadata["features"]
-        df = df.reindex(columns=feature_order)
+        with metrics.stage(endpoint, "frame"):
+            row = features_to_row(features, snapshot)
+        probability = trees_used = None
+        if early:
+            result = await early_exit_probabilities(row, snapshot, endpoint, deadline)
+            probability, trees_used = float(result.probability[0]), int(result.trees[0])
+        elif prediction_cache is not None:
+            cached, keys, generation = lookup_cached(row, snapshot)
+            if not np.isnan(cached[0]):
+                probability = float(cached[0])
         
-        # Convert to numeric and handle missing values
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        if probability is None:
+            if MICROBATCH_WINDOW_MS > 0 and not profiling_active():
+                # Coalesce with other in-flight /predict calls for the same model
+                probability = await get_micro_batcher(snapshot).submit(row)
+            else:
+                probability = (await score_rows(row, snapshot))[0, 1]
+            if prediction_cache is not None:
+                prediction_cache.put(keys[0], probability, generation)
         
-        # Get prediction probability
-        probability = model.predict_proba(df)[0, 1]
+        with metrics.stage(endpoint, "postprocess"):
+            # Apply threshold for classification
+            threshold = snapshot.threshold
+            prediction = 1 if probability >= threshold else 0
+            
+            # Determine confidence level
+            confidence = get_confidence_level(probability)
+            
+            response = PredictionResponse(
+                prediction=prediction,
+                probability=round(probability, 4),
+                confidence=confidence,
+                threshold_used=round(threshold, 4),
+                model_info=snapshot.metadata(),
+                trees_used=trees_used
+            )
         
-        # Apply threshold for classification
-        threshold = model_metadata["threshold"]
-        prediction = 1 if probability >= threshold else 0
-        
-        # Determine confidence level
-        confidence = get_confidence_level(probability)
-        
-        return PredictionResponse(
-            prediction=prediction,
-            probability=round(probability, 4),
-            confidence=confidence,
-            threshold_used=round(threshold, 4),
-            model_info=model_metadata
-        )
+        # Encoded here (same JSON as response_model) so serialization is timed too
+        with metrics.stage(endpoint, "serialization"):
+            content = response.model_dump_json(exclude_none=True)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
+        metrics.count_error(endpoint, e)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-@app.post("/predict/batch", response_model=BatchPredictionResponse)
-async def predict_batch(request: BatchPredictionRequest):
+@app.post("/predict/batch", response_model=BatchPredictionResponse, openapi_extra=_batch_request_schema())
+@profiler.profiled("predict_batch")
+async def predict_batch(request: Request, dtype: str = "float64", layout: str = "rows",
+                        model: Optional[str] = None, early_exit: bool = False, budget_ms: Optional[float] = None):
     """
     Predict exoplanet classification for multiple candidates
     
     Accepts a list of exoplanet candidates and returns predictions for all.
+    Bulk clients can send a columnar payload (`{"columns": {"koi_period": [...], ...}}`)
+    or a raw binary matrix (`application/octet-stream`, `dtype` = `float64` or `float32`),
+    which are validated with vectorized checks that report the failing row indices.
+    `layout=columnar` returns one array per prediction field instead of one object per candidate.
+    `early_exit=true` (or a `budget_ms`) stops evaluating trees for each candidate once its class
+    is settled and reports `trees_used` per candidate.
+    The model that served the batch is reported in the `X-Model` header.
     """
-    if not model_loaded:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    endpoint = "/predict/batch"
+    snapshot = resolve_model(model)
+    if layout not in BATCH_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Unsupported layout {layout!r}, expected one of {BATCH_LAYOUTS}")
+    early, deadline = early_exit_deadline(snapshot, early_exit, budget_ms)
     
+    # Parsing and validation of large bodies also run off the event loop
+    body = await request.body()
     try:
-        # Convert to DataFrame
-        candidates_data = [candidate.dict() for candidate in request.candidates]
-        df = pd.DataFrame(candidates_data)
-        
-        # Reorder columns to match training order
-        feature_order = model_metadata["features"]
-        df = df.reindex(columns=feature_order)
-        
-        # Convert to numeric and handle missing values
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Get predictions
-        probabilities = model.predict_proba(df)[:, 1]
-        threshold = model_metadata["threshold"]
-        predictions = (probabilities >= threshold).astype(int)
-        
-        # Prepare response
-        results = []
-        for i, (prob, pred) in enumerate(zip(probabilities, predictions)):
-            results.append({
-                "candidate_id": i,
-                "prediction": int(pred),
-                "probability": round(float(prob), 4),
-                "confidence": get_confidence_level(prob)
-            })
-        
-        # Summary statistics
-        summary = {
-            "total_candidates": len(candidates_data),
-            "predicted_planets": int(predictions.sum()),
-            "predicted_false_positives": int((predictions == 0).sum()),
-            "mean_probability": round(float(probabilities.mean()), 4),
-            "high_confidence": sum(1 for p in probabilities if p >= 0.8 or p <= 0.2),
-            "threshold_used": round(threshold, 4)
-        }
-        
-        return BatchPredictionResponse(
-            predictions=results,
-            summary=summary
-        )
+        X = await offload(parse_batch_body, body, request.headers.get("content-type", ""), dtype, snapshot.features)
+    except ValueError as e:
+        metrics.count_error(endpoint, e)
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.observe_batch(endpoint, len(X))
+    
+    try:
+        # Scoring and post-processing run in the executor, not on the event loop;
+        # the body is encoded directly, bypassing response_model serialization
+        if early:
+            result = await early_exit_probabilities(X, snapshot, endpoint, deadline)
+            content = await offload(encode_batch, result.probability, snapshot.threshold, layout, result)
+        else:
+            probabilities = await predict_probabilities(X, snapshot, endpoint)
+            content = await offload(encode_batch, probabilities, snapshot.threshold, layout)
+        return Response(content=content, media_type="application/json", headers={"X-Model": snapshot.label})
         
     except Exception as e:
+        metrics.count_error(endpoint, e)
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
+@app.post("/predict/explain", response_model=ExplanationResponse, openapi_extra=_batch_request_schema())
+@profiler.profiled("predict_explain")
+async def predict_explain(request: Request, dtype: str = "float64", layout: str = "rows",
+                          model: Optional[str] = None):
+    """
+    Explain why each candidate was scored as it was
+    
+    Takes the same bodies as /predict/batch (a single candidate is a batch of one). Each
+    candidate gets its prediction plus the contribution of every feature to the forest's
+    vote, from its decision paths: `base_value + sum(contributions) = forest_vote`, the
+    uncalibrated mean of the tree votes that calibration maps to `probability`. Positive
+    contributions pushed towards CONFIRMED PLANET, negative ones towards FALSE POSITIVE.
+    """
+    endpoint = "/predict/explain"
+    snapshot = resolve_model(model)
+    if layout not in BATCH_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Unsupported layout {layout!r}, expected one of {BATCH_LAYOUTS}")
+    if snapshot.compiled is None:
+        raise HTTPException(status_code=400, detail=f"Model {snapshot.label} ({snapshot.model_type}) cannot be explained; only Random Forest bundles can")
+    
+    body = await request.body()
+    try:
+        X = await offload(parse_batch_body, body, request.headers.get("content-type", ""), dtype,
+                          snapshot.features, endpoint)
+    except ValueError as e:
+        metrics.count_error(endpoint, e)
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.observe_batch(endpoint, len(X))
+    
+    try:
+        explanation = await explain_batch(X, snapshot, endpoint)
+        with metrics.stage(endpoint, "serialization"):
+            content = await offload(encode_explanations, explanation, snapshot.features, snapshot.threshold, layout)
+        return Response(content=content, media_type="application/json", headers={"X-Model": snapshot.label})
+    
+    except Exception as e:
+        metrics.count_error(endpoint, e)
+        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request, format: Optional[str] = None, model: Optional[str] = None):
+    """
+    Stream predictions for an NDJSON or CSV body of any size
+    
+    The body is read and scored in chunks of `EXO_API_STREAM_CHUNK_ROWS` rows, so memory
+    is bounded by the chunk size. Each input row produces one NDJSON line (a prediction or
+    an error), followed by a final `{"summary": ...}` record. The format comes from the
+    `format` query parameter (`ndjson`/`csv`) or the Content-Type header.
+    """
+    snapshot = resolve_model(model)
+    
+    try:
+        fmt = detect_format(format, request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return BodyStreamingResponse(stream_predictions(request.stream(), fmt, snapshot),
+                                 media_type="application/x-ndjson", headers={"X-Model": snapshot.label})
+
 @app.get("/model/info")
-async def get_model_info():
-    """Get information about the loaded model"""
-    if not model_loaded:
+async def get_model_info(model: Optional[str] = None):
+    """Get information about the loaded (default or named) model"""
+    if not registry.loaded:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        snapshot = registry.get(model)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
     
     return {
-        "model_info": model_metadata,
-        "features_required": model_metadata["features"],
+        "model_info": snapshot.metadata(),
+        "features_required": list(snapshot.features),
         "feature_descriptions": {
             "koi_period": "Orbital period in days",
             "koi_duration": "Transit duration in hours",
@@ -311,16 +807,63 @@ async def get_model_info():
         }
     }
 
+@app.get("/predict/batching")
+async def get_batching_stats():
+    """Micro-batching queue depth and realized batch sizes, per model"""
+    if MICROBATCH_WINDOW_MS <= 0:
+        return {"enabled": False}
+    return {"enabled": True, "models": {snapshot.label: batcher.stats() for snapshot, batcher in micro_batchers.values()}}
+
+@app.get("/predict/cache")
+async def get_cache_stats():
+    """Prediction cache size and hit, miss and eviction counters"""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics of this worker process (text exposition format)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (EXO_API_METRICS=0)")
+    content = metrics.render(registry.state.snapshots.values())
+    return Response(content=content, media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/models")
+async def list_models():
+    """Loaded model versions, routing, and per-model request counts and latencies"""
+    return registry.describe()
+
+@app.put("/models/routing")
+async def update_routing(routing: RoutingUpdate):
+    """Change the default model and/or the traffic split used when requests name no model"""
+    try:
+        registry.set_routing(default=routing.default, split=routing.traffic_split)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.describe()
+
 @app.post("/model/reload")
-async def reload_model():
-    """Reload the model (useful for model updates)"""
+@profiler.profiled("reload_model")
+async def reload_model(request: Request, model: Optional[str] = None):
+    """
+    Reload the model(s) (useful for model updates)
+    
+    Each bundle is loaded and warmed up in the background while the current
+    version keeps serving, then swapped in atomically.
+    """
     try:
-        load_model()
-        return {"message": "Model reloaded successfully", "model_info": model_metadata}
+        await offload(load_model, model)
+        if inference_executor is not None:
+            inference_executor.restart()
+        return {"message": "Model reloaded successfully", "model_info": registry.get(model).metadata()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
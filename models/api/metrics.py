@@ -0,0 +1,279 @@
+"""
+Prometheus metrics for the API, without a client library dependency
+
+Exposes, in the Prometheus text format (served by GET /metrics):
+
+- request latency per endpoint and request counts per endpoint and status
+- per-stage latency inside the prediction endpoints (validation, frame
+  construction, predict_proba, post-processing, serialization)
+- rows per request and rows per predict_proba call
+- errors per endpoint and exception class
+- when each model was last loaded and how long loading took
+
+Recording is a dict lookup, a bisect and a locked increment per observation
+(one to two microseconds), cheap enough to leave on; see bench_metrics.py.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000, 100000, 1000000)
+
+# Stages timed inside the prediction endpoints
+STAGES = ("validation", "frame", "predict_proba", "postprocess", "serialization")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class _HistogramSeries:
+    """Bucket counts, sum and count of one label combination"""
+
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: above the largest bound
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues: str) -> _HistogramSeries:
+        series = self._series.get(labelvalues)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(labelvalues, _HistogramSeries(self.buckets))
+        return series
+
+    def observe(self, value: float, *labelvalues: str):
+        self.labels(*labelvalues).observe(value)
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series.counts) if series is not None else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, series in sorted(self._series.items()):
+            with series.lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class _StageTimer:
+    """Context manager observing its elapsed time into one histogram series"""
+
+    __slots__ = ("series", "start")
+
+    def __init__(self, series: _HistogramSeries):
+        self.series = series
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.start)
+        return False
+
+
+_DISABLED = nullcontext()
+
+
+class ApiMetrics:
+    """Every metric the API exports; with `enabled=False` recording is a no-op"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.request_seconds = Histogram("exo_api_request_duration_seconds",
+                                         "Request latency, until the last body byte is sent", ("endpoint",))
+        self.requests = Counter("exo_api_requests_total", "Requests by endpoint and status code",
+                                ("endpoint", "status"))
+        self.stage_seconds = Histogram("exo_api_stage_duration_seconds",
+                                       "Time spent in each stage of a prediction request", ("endpoint", "stage"))
+        self.batch_rows = Histogram("exo_api_batch_size_rows", "Candidates per batch or stream request",
+                                    ("endpoint",), buckets=SIZE_BUCKETS)
+        self.model_rows = Histogram("exo_api_model_batch_size_rows",
+                                    "Rows per predict_proba call, after caching and micro-batching",
+                                    ("model",), buckets=SIZE_BUCKETS)
+        self.errors = Counter("exo_api_errors_total", "Errors by endpoint and exception class",
+                              ("endpoint", "exception"))
+        self.load_seconds: Dict[str, float] = {}
+        self.started_at = time.time()
+
+    # ---------- recording ----------
+
+    def stage(self, endpoint: str, stage: str):
+        """`with metrics.stage("/predict", "frame"): ...` times the block"""
+        if not self.enabled:
+            return _DISABLED
+        return _StageTimer(self.stage_seconds.labels(endpoint, stage))
+
+    def observe_stage(self, endpoint: str, stage: str, seconds: float):
+        if self.enabled:
+            self.stage_seconds.labels(endpoint, stage).observe(seconds)
+
+    def observe_since_request_start(self, endpoint: str, stage: str, scope):
+        """Time from the middleware seeing the request until now (body read and FastAPI validation)"""
+        start = scope.get("state", {}).get("request_start") if self.enabled else None
+        if start is not None:
+            self.observe_stage(endpoint, stage, time.perf_counter() - start)
+
+    def observe_batch(self, endpoint: str, rows: int):
+        if self.enabled:
+            self.batch_rows.labels(endpoint).observe(rows)
+
+    def observe_model_call(self, model: str, rows: int):
+        if self.enabled:
+            self.model_rows.labels(model).observe(rows)
+
+    def count_error(self, endpoint: str, error: BaseException):
+        if self.enabled:
+            self.errors.inc(endpoint, type(error).__name__)
+
+    def observe_request(self, endpoint: str, status: int, seconds: float):
+        self.request_seconds.labels(endpoint).observe(seconds)
+        self.requests.inc(endpoint, str(status))
+
+    def record_load(self, model: str, seconds: float):
+        self.load_seconds[model] = seconds
+
+    # ---------- exposition ----------
+
+    def render(self, snapshots: Iterable = ()) -> str:
+        """Prometheus text exposition; `snapshots` are the loaded ModelSnapshots"""
+        lines = []
+        for metric in (self.request_seconds, self.requests, self.stage_seconds, self.batch_rows,
+                       self.model_rows, self.errors):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        snapshots = sorted(snapshots, key=lambda s: s.name)
+        gauges = [
+            ("exo_api_model_loaded_timestamp_seconds", "Unix time the serving version of each model was loaded",
+             [((s.name, s.version), s.loaded_at) for s in snapshots]),
+            ("exo_api_model_load_duration_seconds", "Time the last load of each model took (open, compile, warm up)",
+             [((s.name, s.version), self.load_seconds[s.name]) for s in snapshots if s.name in self.load_seconds]),
+            ("exo_api_last_model_load_timestamp_seconds", "Unix time of the most recent model load",
+             [((), max(s.loaded_at for s in snapshots))] if snapshots else []),
+            ("exo_api_process_start_timestamp_seconds", "Unix time this worker started", [((), self.started_at)]),
+        ]
+        for name, documentation, values in gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values:
+                labelnames = ("model", "version") if labels else ()
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+def endpoint_label(scope) -> str:
+    """Route template of a request, so unknown paths cannot create unbounded label values"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request, including streamed bodies"""
+
+    def __init__(self, app, metrics: ApiMetrics, skip: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.metrics = metrics
+        self.skip = skip
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["request_start"] = start
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            self.metrics.count_error(endpoint_label(scope), e)
+            raise
+        finally:
+            self.metrics.observe_request(endpoint_label(scope), status, time.perf_counter() - start)
@@ -0,0 +1,108 @@
+"""
+Adaptive micro-batching of concurrent single-row predictions
+
+Concurrent /predict calls each pay the fixed cost of a scoring call. The
+MicroBatcher collects rows that arrive within a short window (or until the
+batch is full), scores them with one awaited call and resolves each caller's
+future with its own probability.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesce rows submitted within `window_ms` into batches of at most `max_batch_size`"""
+
+    def __init__(self, score_fn: Callable[[np.ndarray], Awaitable[np.ndarray]], window_ms: float = 2.0,
+                 max_batch_size: int = 256):
+        if window_ms <= 0:
+            raise ValueError("window_ms must be positive")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer = None
+        self._tasks = set()
+        # Counters for tuning throughput against tail latency
+        self.batches = 0
+        self.rows = 0
+        self.last_batch_size = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, row: np.ndarray) -> float:
+        """Queue one feature row (1, n_features) and wait for its positive-class probability"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """Hand everything queued so far to a single scoring call"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        self.batches += 1
+        self.rows += len(pending)
+        self.last_batch_size = len(pending)
+        self.batch_sizes[self._bucket(len(pending))] += 1
+
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = asyncio.ensure_future(self._score(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, pending: List[Tuple[np.ndarray, asyncio.Future]]):
+        try:
+            probabilities = (await self.score_fn(np.vstack([row for row, _ in pending])))[:, 1]
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), probability in zip(pending, probabilities):
+            # A caller may have been cancelled (client disconnect) while queued
+            if not future.done():
+                future.set_result(float(probability))
+
+    @staticmethod
+    def _bucket(size: int) -> str:
+        """Power-of-two bucket label for the batch size distribution"""
+        upper = 1
+        while upper < size:
+            upper *= 2
+        return f"<={upper}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "rows": self.rows,
+            "last_batch_size": self.last_batch_size,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "batch_size_distribution": dict(sorted(self.batch_sizes.items(), key=lambda kv: int(kv[0][2:]))),
+        }
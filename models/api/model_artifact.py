@@ -0,0 +1,125 @@
+"""
+Memory-mappable model artifacts shared by all worker processes
+
+`joblib.load` of a bundle gives every uvicorn worker a private copy of the
+forest. An artifact is a directory next to the bundle:
+
+    best_koi_reduced_rf.mmap/
+        meta.json        threshold, features, version, model type
+        compiled.joblib  the CompiledModel arrays, stored uncompressed
+        model.joblib     the original sklearn model (absent for engine-only bundles)
+
+`compiled.joblib` is opened with `mmap_mode="r"`, so its arrays are backed by
+the page cache and shared between processes instead of copied into each one.
+The sklearn model (only needed for large batches or models the engine cannot
+compile) is loaded on first use.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+import joblib
+
+ARTIFACT_SUFFIX = ".mmap"
+ARTIFACT_FORMAT = 1
+
+
+def artifact_path(bundle_path: str) -> str:
+    """`models/best_koi_reduced_rf.joblib` -> `models/best_koi_reduced_rf.mmap`"""
+    return os.path.splitext(bundle_path)[0] + ARTIFACT_SUFFIX
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def fresh_artifact_for(bundle_path: str) -> Optional[str]:
+    """Artifact exported from this bundle, unless the bundle has been replaced since"""
+    path = artifact_path(bundle_path)
+    if not is_artifact(path):
+        return None
+    if os.path.exists(bundle_path) and os.path.getmtime(bundle_path) > os.path.getmtime(os.path.join(path, "meta.json")):
+        return None
+    return path
+
+
+def export_artifact(bundle, path: str, compiled=None, model_type: Optional[str] = None) -> str:
+    """Write a bundle (dict or legacy estimator) as an artifact directory, replacing any previous one"""
+    if not isinstance(bundle, dict):
+        bundle = {"model": bundle}
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "threshold": float(bundle.get("threshold", 0.5)),
+        "features": list(bundle["features"]) if "features" in bundle else None,
+        "version": bundle.get("version"),
+        "model_type": model_type,
+        "compiled": compiled is not None,
+        "model": bundle.get("model") is not None,
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    staging = tempfile.mkdtemp(prefix=".artifact-", dir=parent)
+    try:
+        os.chmod(staging, 0o755)  # mkdtemp is owner-only; workers may run as another user
+        if meta["model"]:
+            joblib.dump(bundle["model"], os.path.join(staging, "model.joblib"))
+        if compiled is not None:
+            # Uncompressed, so every array can be memory-mapped on load
+            joblib.dump(compiled, os.path.join(staging, "compiled.joblib"), compress=0)
+        # Written last: its presence marks a complete artifact
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        previous = None
+        if os.path.exists(path):
+            previous = tempfile.mkdtemp(prefix=".artifact-old-", dir=parent)
+            os.rmdir(previous)
+            os.rename(path, previous)
+        os.rename(staging, path)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return path
+
+
+def load_artifact(path: str) -> Dict[str, Any]:
+    """
+    Open an artifact as a bundle dict
+
+    `compiled` is memory-mapped read-only; `model` is replaced by `model_loader`,
+    a callable that loads the sklearn model when it is first needed. Artifacts
+    of engine-only bundles have no `model_loader`.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format {meta.get('format')!r} in {path}")
+
+    bundle: Dict[str, Any] = {"threshold": meta["threshold"]}
+    if meta.get("model", True):  # artifacts written before engine-only bundles always have one
+        bundle["model_loader"] = _model_loader(path)
+    for key in ("features", "version", "model_type"):
+        if meta.get(key) is not None:
+            bundle[key] = meta[key]
+    if meta["compiled"]:
+        bundle["compiled"] = joblib.load(os.path.join(path, "compiled.joblib"), mmap_mode="r")
+    return bundle
+
+
+def _model_loader(path: str) -> Callable[[], Any]:
+    model_path = os.path.join(path, "model.joblib")
+    expected = os.stat(model_path)
+
+    def load():
+        with open(model_path, "rb") as f:
+            current = os.fstat(f.fileno())
+            # A re-export replaces the directory; never pair the mapped engine with another model
+            if (current.st_dev, current.st_ino) != (expected.st_dev, expected.st_ino):
+                raise RuntimeError(f"{path} was re-exported after it was loaded; reload the model")
+            return joblib.load(f)
+    return load
@@ -0,0 +1,374 @@
+"""
+Versioned model registry with atomic hot-swap and traffic splitting
+
+Each loaded bundle becomes an immutable ModelSnapshot (model, compiled engine,
+threshold, features, version). A new bundle is loaded, compiled and warmed up
+before the registry publishes it, and the registry state (snapshots, default
+model, traffic split) is replaced with a single reference assignment, so a
+request that resolved a snapshot never sees a mix of old and new state.
+
+Snapshots built from memory-mapped artifacts (see model_artifact.py) score
+with the mapped compiled engine and load the sklearn model only on first use;
+pandas is likewise imported only when the sklearn path runs. Engine-only
+bundles (compact_model.py's storage variants) carry no sklearn model and
+score every batch with the engine.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from forest_engine import EarlyExit, Explanation, compile_model
+
+DEFAULT_FEATURES = ("koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl")
+DEFAULT_VERSION = "1.0.0"
+
+# Display names for the final estimators produced by the training notebook
+MODEL_TYPES = {
+    "RandomForestClassifier": "Random Forest",
+    "LogisticRegression": "Logistic Regression",
+}
+
+# Recent scoring latencies kept per model for the percentile stats
+LATENCY_WINDOW = 1000
+
+
+def parse_assignments(spec: str) -> Dict[str, str]:
+    """Parse `name=value,name=value` (used by EXO_API_MODELS and EXO_API_TRAFFIC_SPLIT)"""
+    assignments = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip() or not value.strip():
+            raise ValueError(f"Expected `name=value`, got {item!r}")
+        assignments[name.strip()] = value.strip()
+    return assignments
+
+
+def model_name_from_path(path: str) -> str:
+    """`best_koi_reduced_rf.joblib` -> `rf`, matching the training notebook's pipeline names"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.rsplit("_", 1)[-1] if stem.startswith("best_koi_") else stem
+
+
+def limit_n_jobs(model, n_jobs: int):
+    """Set n_jobs on every estimator inside a fitted model (the notebook's forest uses n_jobs=-1)"""
+    seen = set()
+    pending = [model]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (list, tuple)):
+            pending.extend(obj)
+            continue
+        attributes = getattr(obj, "__dict__", None)
+        if attributes is None or not type(obj).__module__.startswith("sklearn"):
+            continue
+        if "n_jobs" in attributes:
+            obj.n_jobs = n_jobs
+        # Fitted trees have no n_jobs and no nested estimators
+        pending.extend(v for k, v in attributes.items() if k != "estimators_" or not _are_trees(v))
+    return model
+
+
+def _are_trees(value) -> bool:
+    return isinstance(value, list) and bool(value) and hasattr(value[0], "tree_")
+
+
+def describe_model(model) -> str:
+    """Human-readable type of the final estimator behind calibration and pipelines"""
+    estimator = model
+    for _ in range(10):
+        if type(estimator).__name__ in MODEL_TYPES:
+            break  # forests also have an `estimator` attribute (their base tree)
+        if hasattr(estimator, "calibrated_classifiers_"):
+            estimator = estimator.calibrated_classifiers_[0].estimator
+        elif hasattr(estimator, "estimator") and not hasattr(estimator, "steps"):
+            estimator = estimator.estimator  # CalibratedClassifierCV before fit, FrozenEstimator
+        elif hasattr(estimator, "steps"):
+            estimator = estimator.steps[-1][1]
+        else:
+            break
+    name = type(estimator).__name__
+    return MODEL_TYPES.get(name, name)
+
+
+@dataclass(frozen=True, eq=False)
+class ModelSnapshot:
+    """Everything needed to score with one model version; never mutated after publishing"""
+    name: str
+    version: str
+    model: Any
+    threshold: float
+    features: Tuple[str, ...]
+    model_type: str
+    compiled: Any = None
+    compiled_max_rows: int = 512
+    source: Optional[str] = None
+    loaded_at: float = field(default_factory=time.time)
+    # Loads `model` on first use when the snapshot comes from a memory-mapped artifact
+    model_loader: Optional[Callable[[], Any]] = None
+    _model_lock: Any = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "threshold": self.threshold,
+            "features": list(self.features),
+            "model_type": self.model_type,
+            "version": self.version,
+        }
+
+    @property
+    def has_model(self) -> bool:
+        """Whether a sklearn model is loaded or loadable; engine-only snapshots score everything compiled"""
+        return self.model is not None or self.model_loader is not None
+
+    def get_model(self):
+        """The sklearn model, loading it first if the snapshot was built lazily"""
+        if self.model is None and self.model_loader is not None:
+            with self._model_lock:
+                if self.model is None:
+                    # Materialized once; the snapshot is otherwise unchanged
+                    object.__setattr__(self, "model", self.model_loader())
+        return self.model
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Score rows in feature order; the compiled engine handles small batches"""
+        if self.compiled is not None and (len(X) <= self.compiled_max_rows or not self.has_model):
+            if hasattr(X, "to_numpy"):
+                X = X.to_numpy(dtype=np.float64)
+            return self.compiled.predict_proba(X)
+        import pandas as pd  # deferred: only the sklearn path needs it
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X, columns=list(self.features))
+        return self.get_model().predict_proba(X)
+
+    def explain(self, X) -> Explanation:
+        """Per-feature contributions to each row's forest vote; large batches use sklearn's traversal"""
+        if self.compiled is None:
+            raise TypeError(f"{self.label} ({self.model_type}) is not a forest the engine can explain")
+        if hasattr(X, "to_numpy"):
+            X = X.to_numpy(dtype=np.float64)
+        model = self.get_model() if len(X) > self.compiled_max_rows and self.has_model else None
+        return self.compiled.explain(X, model=model)
+
+    def predict_early(self, X, budget: Optional[float] = None, confidence: float = 0.999,
+                      min_trees: int = 32) -> EarlyExit:
+        """Early-exit probabilities against this snapshot's threshold; large batches use sklearn's trees"""
+        if self.compiled is None:
+            raise TypeError(f"{self.label} ({self.model_type}) is not a forest the engine can score tree by tree")
+        if hasattr(X, "to_numpy"):
+            X = X.to_numpy(dtype=np.float64)
+        model = self.get_model() if len(X) > self.compiled_max_rows and self.has_model else None
+        return self.compiled.predict_early(X, self.threshold, confidence=confidence, budget=budget,
+                                           min_trees=min_trees, model=model)
+
+
+def build_snapshot(bundle, name: str, source: Optional[str] = None, compiled_max_rows: int = 512,
+                   warm_up: bool = True, n_jobs: Optional[int] = None) -> ModelSnapshot:
+    """
+    Turn a loaded bundle (dict or legacy estimator) into a compiled, warmed-up snapshot
+
+    Bundles opened from an artifact carry a ready `compiled` engine and a
+    `model_loader` instead of the sklearn `model`; engine-only bundles carry
+    just `compiled`. `n_jobs` caps sklearn's
+    parallelism so several workers do not oversubscribe the machine.
+    """
+    if not isinstance(bundle, dict):
+        # Legacy format: a bare estimator
+        bundle = {"model": bundle}
+    model = bundle.get("model")
+    model_loader = bundle.get("model_loader")
+    threshold = bundle.get("threshold", 0.5)
+    features = bundle.get("features", DEFAULT_FEATURES)
+    version = str(bundle.get("version", DEFAULT_VERSION))
+    if model is None and model_loader is None and bundle.get("compiled") is None:
+        raise TypeError("Bundle has no model")
+    if model is not None and not hasattr(model, "predict_proba"):
+        raise TypeError(f"Model {type(model).__name__} has no predict_proba method")
+    if n_jobs is not None:
+        if model is not None:
+            limit_n_jobs(model, n_jobs)
+        if model_loader is not None:
+            model_loader = (lambda load: lambda: limit_n_jobs(load(), n_jobs))(model_loader)
+
+    compiled = bundle.get("compiled")
+    if compiled is None and model is not None:
+        # Flatten the forest into NumPy arrays for low-overhead scoring
+        try:
+            compiled = compile_model(model)
+            print(f"✅ Compiled inference engine ready for {name} ({compiled.n_trees} trees)")
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"⚠️  Compiled engine unavailable for {name}, using sklearn predict_proba: {e}")
+    elif compiled is not None:
+        print(f"✅ Compiled inference engine mapped for {name} ({compiled.n_trees} trees)")
+
+    model_type = bundle.get("model_type")
+    if model_type is None:
+        # Only forests compile, so an engine-only bundle is a Random Forest
+        model_type = describe_model(model) if model is not None else MODEL_TYPES["RandomForestClassifier"]
+    snapshot = ModelSnapshot(name=name, version=version, model=model, threshold=float(threshold),
+                             features=tuple(features), model_type=model_type,
+                             compiled=compiled, compiled_max_rows=compiled_max_rows, source=source,
+                             model_loader=model_loader)
+    if warm_up:
+        # Pay first-call costs (imports, allocations, caches) before any request is routed here;
+        # a lazily loaded sklearn model is left alone unless it is the only scoring path
+        row = np.full((1, len(snapshot.features)), np.nan)
+        snapshot.predict_proba(row)
+        if snapshot.model is not None and compiled is not None:
+            import pandas as pd
+            snapshot.model.predict_proba(pd.DataFrame(row, columns=list(snapshot.features)))
+    return snapshot
+
+
+@dataclass(frozen=True)
+class RegistryState:
+    """Published registry contents, replaced as a whole on every change"""
+    snapshots: Mapping[str, ModelSnapshot] = field(default_factory=lambda: MappingProxyType({}))
+    default: Optional[str] = None
+    split: Tuple[Tuple[str, float], ...] = ()
+
+
+class ModelStats:
+    """Per-model request, row and latency counters for comparing versions side by side"""
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.probability_sum = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, rows: int, seconds: float, probability_sum: float):
+        self.requests += 1
+        self.rows += rows
+        self.probability_sum += probability_sum
+        self.latencies.append(seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) * 1000.0
+        p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (0.0, 0.0)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "mean_probability": round(self.probability_sum / self.rows, 4) if self.rows else None,
+            "latency_p50_ms": round(float(p50), 3),
+            "latency_p95_ms": round(float(p95), 3),
+        }
+
+
+class ModelRegistry:
+    """Named model versions served side by side, with a default model and optional traffic split"""
+
+    def __init__(self, compiled_max_rows: int = 512, on_publish: Optional[Callable[[], None]] = None,
+                 rng: Optional[random.Random] = None, n_jobs: Optional[int] = None):
+        self.compiled_max_rows = compiled_max_rows
+        self.n_jobs = n_jobs
+        self.on_publish = on_publish
+        self._state = RegistryState()
+        self._write_lock = threading.Lock()
+        self._rng = rng or random.Random()
+        self._stats: Dict[str, ModelStats] = {}
+
+    @property
+    def state(self) -> RegistryState:
+        return self._state
+
+    @property
+    def loaded(self) -> bool:
+        return self._state.default is not None
+
+    def names(self) -> List[str]:
+        return list(self._state.snapshots)
+
+    def load(self, bundle, name: str, source: Optional[str] = None, make_default: bool = False) -> ModelSnapshot:
+        """Build and warm a snapshot outside the lock, then publish it atomically"""
+        snapshot = build_snapshot(bundle, name, source=source, compiled_max_rows=self.compiled_max_rows,
+                                  n_jobs=self.n_jobs)
+        self.publish(snapshot, make_default=make_default)
+        return snapshot
+
+    def publish(self, snapshot: ModelSnapshot, make_default: bool = False):
+        """Add or replace a named snapshot with one swap of the registry state"""
+        with self._write_lock:
+            state = self._state
+            snapshots = dict(state.snapshots)
+            snapshots[snapshot.name] = snapshot
+            default = snapshot.name if make_default or state.default is None else state.default
+            self._state = RegistryState(MappingProxyType(snapshots), default, state.split)
+            self._stats[snapshot.name] = ModelStats()
+        if self.on_publish is not None:
+            self.on_publish()
+
+    def set_routing(self, default: Optional[str] = None, split: Optional[Dict[str, float]] = None):
+        """Change the default model and/or the traffic split (an empty split disables it)"""
+        with self._write_lock:
+            state = self._state
+            if default is not None and default not in state.snapshots:
+                raise KeyError(f"Unknown model {default!r}, loaded: {list(state.snapshots)}")
+            new_split = state.split
+            if split is not None:
+                unknown = [name for name in split if name not in state.snapshots]
+                if unknown:
+                    raise KeyError(f"Unknown model(s) {unknown} in traffic split, loaded: {list(state.snapshots)}")
+                weights = {name: float(weight) for name, weight in split.items()}
+                if any(w < 0 for w in weights.values()) or (weights and sum(weights.values()) <= 0):
+                    raise ValueError("Traffic split weights must be non-negative with a positive sum")
+                total = sum(weights.values())
+                new_split = tuple((name, w / total) for name, w in weights.items() if w > 0)
+            self._state = RegistryState(state.snapshots, default or state.default, new_split)
+
+    def get(self, name: Optional[str] = None) -> ModelSnapshot:
+        """Snapshot for an explicit name, or the default model"""
+        state = self._state
+        key = name or state.default
+        if key is None:
+            raise LookupError("No model loaded")
+        try:
+            return state.snapshots[key]
+        except KeyError:
+            raise KeyError(f"Unknown model {key!r}, loaded: {list(state.snapshots)}")
+
+    def route(self, name: Optional[str] = None) -> ModelSnapshot:
+        """Snapshot for a request: explicit name, else a traffic-split draw, else the default"""
+        state = self._state
+        if name is None and state.split:
+            draw = self._rng.random()
+            for candidate, weight in state.split:
+                draw -= weight
+                if draw < 0:
+                    return state.snapshots[candidate]
+            return state.snapshots[state.split[-1][0]]
+        return self.get(name)
+
+    def record(self, snapshot: ModelSnapshot, rows: int, seconds: float, probabilities: np.ndarray):
+        stats = self._stats.get(snapshot.name)
+        if stats is not None:
+            stats.record(rows, seconds, float(np.sum(probabilities)))
+
+    def describe(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "default": state.default,
+            "traffic_split": dict(state.split),
+            "models": {
+                name: {**snapshot.metadata(), "source": snapshot.source, "loaded_at": snapshot.loaded_at,
+                       "compiled": snapshot.compiled is not None,
+                       "sklearn_model_loaded": snapshot.model is not None,
+                       "stats": self._stats[name].as_dict() if name in self._stats else None}
+                for name, snapshot in state.snapshots.items()
+            },
+        }
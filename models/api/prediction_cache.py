@@ -0,0 +1,89 @@
+"""
+Bounded LRU cache of prediction probabilities
+
+The classify page and backend callers often resend the same candidate. Keys
+are the canonicalized feature tuple plus the model version and threshold, so
+a cached probability is never served for a different model; the cache is
+also cleared whenever a model is (re)loaded.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def canonical_features(values: Iterable[float]) -> Tuple[Optional[float], ...]:
+    """Feature tuple usable as a dict key (NaN never compares equal, so map it to None)"""
+    return tuple(None if v is None or math.isnan(v) else float(v) for v in values)
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping of cache key -> positive-class probability"""
+
+    def __init__(self, max_size: int = 10000):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped on clear() so results computed by the previous model are not stored
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[float]:
+        return self.get_many([key])[0]
+
+    def put(self, key: Hashable, probability: float, generation: Optional[int] = None):
+        self.put_many([key], [probability], generation)
+
+    def get_many(self, keys: List[Hashable]) -> List[Optional[float]]:
+        """Look up several keys, refreshing the recency of every hit"""
+        found = []
+        with self._lock:
+            for key in keys:
+                probability = self._entries.get(key)
+                if probability is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                found.append(probability)
+        return found
+
+    def put_many(self, keys: List[Hashable], probabilities: Iterable[float], generation: Optional[int] = None):
+        """Store probabilities; skipped if the cache was cleared since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, probability in zip(keys, probabilities):
+                self._entries[key] = float(probability)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (called when a model is loaded)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "max_size": self.max_size,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
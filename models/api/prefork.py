@@ -0,0 +1,218 @@
+"""
+Pre-fork multi-worker server for production
+
+The parent process binds the listening socket and loads the model once, then
+forks N uvicorn workers that inherit both, so the model pages are shared
+copy-on-write instead of being loaded per worker. The parent supervises the
+workers:
+
+- a worker that dies is replaced
+- SIGHUP reloads the model in the parent and replaces workers one at a time,
+  starting each new worker and waiting until it serves before stopping the
+  old one, so capacity never drops by more than one worker
+- SIGTERM / SIGINT stop all workers gracefully (in-flight requests finish)
+"""
+
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import uvicorn
+
+# Native thread pools that would each default to one thread per core in every worker
+THREAD_LIMIT_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                     "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def limit_native_threads(threads: int):
+    """Cap BLAS/OpenMP threads per worker; must run before NumPy is imported"""
+    for name in THREAD_LIMIT_VARS:
+        os.environ.setdefault(name, str(threads))
+
+
+class _NotifyingServer(uvicorn.Server):
+    """uvicorn Server that tells the supervisor once startup (model checks, executor) is done"""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        try:
+            if not self.should_exit:
+                os.write(self.ready_fd, b"1")
+        except BrokenPipeError:
+            pass  # the supervisor only listens during rolling restarts
+        finally:
+            os.close(self.ready_fd)
+
+
+class PreforkServer:
+    """Supervise `workers` forked uvicorn processes serving one shared socket"""
+
+    def __init__(self, app_loader: Callable[[], object], preload: Callable[[], None], host: str = "0.0.0.0",
+                 port: int = 8000, workers: Optional[int] = None, cpu_affinity: bool = False,
+                 graceful_timeout: float = 30.0, startup_timeout: float = 120.0, log_level: str = "info"):
+        self.app_loader = app_loader
+        self.preload = preload
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.cpu_affinity_requested = cpu_affinity
+        self.cpu_affinity = cpu_affinity and hasattr(os, "sched_setaffinity")
+        self.graceful_timeout = graceful_timeout
+        self.startup_timeout = startup_timeout
+        self.log_level = log_level
+        self.cpus: List[int] = sorted(os.sched_getaffinity(0)) if self.cpu_affinity else []
+        self.children: Dict[int, int] = {}  # slot -> pid
+        self.socket: Optional[socket.socket] = None
+        self._restart_requested = False
+        self._stopping = False
+
+    # ---------- parent ----------
+
+    def run(self):
+        if self.cpu_affinity_requested and not self.cpu_affinity:
+            print("⚠️  CPU affinity is not supported on this platform")
+        self.socket = self._bind()
+        print(f"🔄 Loading model in the supervisor (pid {os.getpid()}) before forking")
+        self.preload()
+
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        for slot in range(self.workers):
+            self._start(slot, wait=False)
+        print(f"🚀 {self.workers} workers serving on {self.host}:{self.port} (kill -HUP {os.getpid()} to roll)")
+
+        while not self._stopping:
+            if self._restart_requested:
+                self._restart_requested = False
+                self.rolling_restart()
+            self._reap(respawn=True)
+            time.sleep(0.5)
+        self.stop()
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        # IPPROTO_TCP explicitly: asyncio only sets TCP_NODELAY on accepted sockets when proto says TCP
+        sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _on_hup(self, signum, frame):
+        self._restart_requested = True
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _start(self, slot: int, wait: bool) -> Optional[int]:
+        """Fork a worker for `slot`; with `wait`, return its pid once it serves (None on failure)"""
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._worker(slot, ready_w)  # never returns
+        os.close(ready_w)
+        try:
+            if not wait:
+                self.children[slot] = pid
+                return pid
+            readable, _, _ = select.select([ready_r], [], [], self.startup_timeout)
+            if readable and os.read(ready_r, 1) == b"1":
+                return pid
+            print(f"❌ Worker {slot} (pid {pid}) did not start")
+            self._terminate([pid])
+            return None
+        finally:
+            os.close(ready_r)
+
+    def _reap(self, respawn: bool):
+        """Collect exited workers and, unless stopping, replace them"""
+        for slot, pid in list(self.children.items()):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 0
+            if done == pid:
+                del self.children[slot]
+                if respawn and not self._stopping:
+                    print(f"⚠️  Worker {slot} (pid {pid}) exited with status {status}; restarting")
+                    self._start(slot, wait=False)
+
+    def rolling_restart(self):
+        """Reload the model, then replace workers one by one"""
+        print("🔄 Rolling restart: reloading model in the supervisor")
+        try:
+            self.preload()
+        except Exception as e:
+            print(f"❌ Model reload failed, keeping current workers: {e}")
+            return
+        for slot in range(self.workers):
+            old = self.children.get(slot)
+            new = self._start(slot, wait=True)
+            if new is None:
+                print("❌ Rolling restart aborted; remaining workers keep the previous model")
+                return
+            self.children[slot] = new
+            if old is not None:
+                self._terminate([old])
+            print(f"✅ Worker {slot} replaced (pid {old} -> {new})")
+        print("✅ Rolling restart complete")
+
+    def _terminate(self, pids: List[int]):
+        """SIGTERM (uvicorn finishes in-flight requests), then SIGKILL after the graceful timeout"""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                        remaining.discard(pid)
+                except ChildProcessError:
+                    remaining.discard(pid)
+            time.sleep(0.1)
+        for pid in remaining:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+    def stop(self):
+        print("👋 Stopping workers")
+        self._terminate(list(self.children.values()))
+        self.children.clear()
+        if self.socket is not None:
+            self.socket.close()
+
+    # ---------- worker ----------
+
+    def _worker(self, slot: int, ready_fd: int):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        if self.cpus:
+            os.sched_setaffinity(0, {self.cpus[slot % len(self.cpus)]})
+        code = 0
+        try:
+            config = uvicorn.Config(self.app_loader(), log_level=self.log_level, lifespan="on")
+            _NotifyingServer(config, ready_fd).run(sockets=[self.socket])
+        except BaseException as e:
+            print(f"❌ Worker {slot} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
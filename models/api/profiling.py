@@ -0,0 +1,183 @@
+"""
+Opt-in per-request profiling
+
+A request is profiled when profiling is enabled and it carries `X-Profile: 1`
+(or `?profile=1`), or when it is picked by random sampling. It then runs
+under cProfile and the profile is stored as a `.prof` file in the profile
+directory (open with `python -m pstats` or snakeviz); the file name is
+returned in the `X-Profile-Id` header. With `X-Profile: inline` (or
+`?profile=inline`) the response body becomes `{"response": ..., "profile": ...}`
+with the slowest functions by cumulative time.
+
+While a request is profiled, its executor work runs inline on the request's
+own thread (see `active()`), so the call tree covers scoring and encoding
+rather than only the awaits around them. Only one request is profiled at a
+time, since cProfile cannot run twice in one process on Python 3.12+.
+
+When neither trigger is configured, `profiled()` returns the endpoint
+unchanged, so profiling costs nothing.
+"""
+
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+HEADER = "X-Profile"
+ID_HEADER = "X-Profile-Id"
+INLINE = "inline"
+
+_active = contextvars.ContextVar("profiling_active", default=False)
+
+
+def active() -> bool:
+    """True inside a profiled request: callers should run work inline instead of offloading it"""
+    return _active.get()
+
+
+def top_functions(stats: pstats.Stats, limit: int = 30) -> List[Dict[str, Any]]:
+    """Slowest functions by cumulative time, with the functions they called"""
+    rows = []
+    for func, (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append((cumtime, func, ncalls, tottime))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    callees = _callees(stats)
+    return [{
+        "function": pstats.func_std_string(func),
+        "calls": ncalls,
+        "own_ms": round(tottime * 1000.0, 3),
+        "cumulative_ms": round(cumtime * 1000.0, 3),
+        "calls_into": [pstats.func_std_string(f) for f in callees.get(func, [])[:5]],
+    } for cumtime, func, ncalls, tottime in rows[:limit]]
+
+
+def _callees(stats: pstats.Stats) -> Dict[tuple, List[tuple]]:
+    """caller -> callees ordered by cumulative time spent in them from that caller"""
+    calls: Dict[tuple, List[tuple]] = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumtime) in callers.items():
+            calls.setdefault(caller, []).append((cumtime, func))
+    return {caller: [func for _, func in sorted(funcs, reverse=True)] for caller, funcs in calls.items()}
+
+
+class RequestProfiler:
+    """Decides which requests to profile, runs them under cProfile and stores the results"""
+
+    def __init__(self, on_demand: bool = False, sample_rate: float = 0.0, directory: str = "profiles",
+                 keep: int = 100, rng: Optional[random.Random] = None):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Profile sample rate must be within [0, 1], got {sample_rate}")
+        self.on_demand = on_demand
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.keep = keep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.on_demand or self.sample_rate > 0
+
+    def mode(self, request: Request) -> Optional[str]:
+        """None (not profiled), "store" or "inline" for this request"""
+        if self.on_demand:
+            flag = request.headers.get(HEADER) or request.query_params.get("profile")
+            if flag and flag.lower() not in ("0", "false", "no"):
+                return INLINE if flag.lower() == INLINE else "store"
+        if self.sample_rate > 0 and self._rng.random() < self.sample_rate:
+            return "store"
+        return None
+
+    def profiled(self, name: str):
+        """Decorator for endpoints taking a `request: Request` argument"""
+        def decorate(endpoint):
+            if not self.enabled:
+                return endpoint
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                mode = self.mode(request) if request is not None else None
+                # One at a time: cProfile cannot be enabled twice in a process
+                if mode is None or not self._lock.acquire(blocking=False):
+                    return await endpoint(*args, **kwargs)
+                try:
+                    return await self._run(name, mode, endpoint, args, kwargs)
+                finally:
+                    self._lock.release()
+            return wrapper
+        return decorate
+
+    async def _run(self, name: str, mode: str, endpoint, args, kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiling tool (e.g. a debugger) is active
+            return await endpoint(*args, **kwargs)
+        token = _active.set(True)
+        start = time.perf_counter()
+        try:
+            try:
+                result = await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+        except HTTPException as e:
+            profile_id = self.save(profiler, name)
+            raise HTTPException(e.status_code, e.detail, headers={**(e.headers or {}), ID_HEADER: profile_id})
+        finally:
+            _active.reset(token)
+        elapsed = time.perf_counter() - start
+
+        profile_id = self.save(profiler, name)
+        if mode == INLINE:
+            headers = {k: v for k, v in result.headers.items() if k.startswith("x-")} \
+                if isinstance(result, Response) else {}
+            return JSONResponse({"response": _body(result), "profile": {
+                "id": profile_id,
+                "endpoint": name,
+                "total_ms": round(elapsed * 1000.0, 3),
+                "functions": top_functions(pstats.Stats(profiler)),
+            }}, headers={**headers, ID_HEADER: profile_id})
+        if not isinstance(result, Response):
+            result = JSONResponse(jsonable_encoder(result))
+        result.headers[ID_HEADER] = profile_id
+        return result
+
+    def save(self, profiler: cProfile.Profile, name: str) -> str:
+        """Write the profile as `<time>-<endpoint>-<id>.prof` and prune the oldest files"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(self.directory, profile_id))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        files = sorted((f for f in os.listdir(self.directory) if f.endswith(".prof")),
+                       key=lambda f: os.path.getmtime(os.path.join(self.directory, f)))
+        for stale in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, stale))
+            except OSError:
+                pass
+
+
+def _body(result) -> Any:
+    """JSON-compatible form of an endpoint's return value"""
+    if isinstance(result, Response):
+        try:
+            return json.loads(result.body)
+        except (ValueError, AttributeError):
+            return None
+    return jsonable_encoder(result)
+
@@ -83,14 +83,65 @@ def start_api(host="0.0.0.0", port=8000, reload=True):
     
     return True
 
+def start_production(host="0.0.0.0", port=8000, workers=None, cpu_affinity=False, threads_per_worker=1,
+                     graceful_timeout=30.0, log_level="info"):
+    """Serve with pre-forked workers sharing one model loaded before forking"""
+    # Thread limits only take effect if set before NumPy / sklearn are imported
+    from prefork import limit_native_threads
+    limit_native_threads(threads_per_worker)
+    os.environ.setdefault("EXO_API_SKLEARN_JOBS", str(threads_per_worker))
+
+    if not check_dependencies():
+        return False
+
+    api_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(api_dir)
+    sys.path.insert(0, api_dir)
+    import main
+    from prefork import PreforkServer
+
+    server = PreforkServer(app_loader=lambda: main.app, preload=main.load_model, host=host, port=port,
+                           workers=workers, cpu_affinity=cpu_affinity, graceful_timeout=graceful_timeout,
+                           log_level=log_level)
+    print(f"🚀 Starting Exoplanet Classification API (production, {server.workers} workers) on {host}:{port}")
+    print(f"🔍 Health check: http://{host}:{port}/health")
+    print("-" * 50)
+    try:
+        server.run()
+    except Exception as e:
+        print(f"❌ Error starting API: {e}")
+        return False
+    return True
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Start the Exoplanet Classification API")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
     parser.add_argument("--no-reload", action="store_true", help="Disable auto-reload")
+    parser.add_argument("--production", action="store_true",
+                        help="Pre-forked workers sharing a model loaded once (no auto-reload)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (production)")
+    parser.add_argument("--cpu-affinity", action="store_true", help="Pin each worker to one CPU (production, Linux)")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="BLAS/OpenMP threads and sklearn n_jobs per worker (production)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="Seconds a stopping worker gets to finish in-flight requests (production)")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level (production)")
     
     args = parser.parse_args()
     
+    if args.production:
+        ok = start_production(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            cpu_affinity=args.cpu_affinity,
+            threads_per_worker=args.threads_per_worker,
+            graceful_timeout=args.graceful_timeout,
+            log_level=args.log_level
+        )
+        sys.exit(0 if ok else 1)
+    
     start_api(
         host=args.host,
         port=args.port,
@@ -0,0 +1,83 @@
+"""
+Helpers for streaming NDJSON/CSV batch scoring
+
+The request body is consumed incrementally, split into lines and handed to
+the caller in chunks of at most `chunk_rows` lines, so memory is bounded by
+the chunk size rather than the size of the upload.
+"""
+
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.responses import StreamingResponse
+
+STREAM_FORMATS = ("ndjson", "csv")
+
+
+def detect_format(requested: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the input format from an explicit `format` parameter or the Content-Type header"""
+    if requested:
+        fmt = requested.lower()
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported format {requested!r}, expected one of {STREAM_FORMATS}")
+        return fmt
+    if content_type and "csv" in content_type.lower():
+        return "csv"
+    return "ndjson"
+
+
+async def iter_line_chunks(body: AsyncIterator[bytes], chunk_rows: int) -> AsyncIterator[List[bytes]]:
+    """Yield lists of at most `chunk_rows` non-empty lines as the body arrives"""
+    pending = b""
+    lines: List[bytes] = []
+    async for data in body:
+        if not data:
+            continue
+        pending += data
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            if line.strip():
+                lines.append(line)
+                if len(lines) >= chunk_rows:
+                    yield lines
+                    lines = []
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield lines
+
+
+def parse_csv_header(line: bytes) -> List[str]:
+    return [name.strip() for name in next(csv.reader([line.decode("utf-8-sig")]))]
+
+
+def parse_line(line: bytes, fmt: str, header: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Parse one NDJSON object or CSV row; empty CSV fields are treated as missing"""
+    if fmt == "ndjson":
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("Each NDJSON line must be a JSON object")
+        return record
+    try:
+        values = next(csv.reader([line.decode("utf-8")]))
+    except csv.Error as e:
+        raise ValueError(f"Malformed CSV row: {e}")
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} CSV fields, got {len(values)}")
+    return {name: (value if value.strip() else None) for name, value in zip(header, values)}
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content generator reads the request body itself
+
+    On ASGI < 2.4 servers StreamingResponse listens for disconnects by calling
+    `receive()`, which would consume request body messages the generator is
+    still waiting for. A disconnect surfaces through `request.stream()` instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,61 @@
+"""
+Synthetic model bundles for tests and benchmarks
+
+`make_bundle_model()` trains the training notebook's pipeline (median
+imputer + 400-tree balanced Random Forest, isotonic prefit calibration) on
+labelled synthetic KOI-like rows, so the engine, the API and the benchmarks
+run without a model file.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from synthetic_koi import FEATURES
+
+
+def make_labelled_candidates(n, seed=0, missing_rate=0.1):
+    """Synthetic KOI-like candidates; optional features are sometimes missing"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "koi_period": rng.lognormal(3.0, 1.2, n),
+        "koi_duration": rng.lognormal(1.2, 0.5, n),
+        "koi_depth": rng.lognormal(6.0, 1.5, n),
+        "koi_impact": rng.uniform(0.0, 1.3, n),
+        "koi_srho": rng.lognormal(0.0, 1.0, n),
+        "koi_incl": rng.uniform(80.0, 90.0, n),
+    })
+    for col in ["koi_impact", "koi_srho", "koi_incl"]:
+        X.loc[rng.random(n) < missing_rate, col] = np.nan
+    y = ((np.log(X["koi_depth"]) < 6.5) ^ (X["koi_impact"].fillna(0.5) > 0.9)).astype(int).to_numpy(copy=True)
+    flip = rng.random(n) < 0.1
+    y[flip] = 1 - y[flip]
+    return X, y
+
+
+def make_rf_pipeline(n_estimators=400):
+    """Same RF pipeline as make_pipelines() in the training notebook"""
+    return Pipeline([("imputer", SimpleImputer(strategy="median")),
+                     ("clf", RandomForestClassifier(
+                         n_estimators=n_estimators, min_samples_leaf=4,
+                         class_weight="balanced", random_state=42, n_jobs=-1))])
+
+
+def calibrate(pipeline, X_val, y_val, method="isotonic"):
+    """Prefit calibration, using FrozenEstimator where cv="prefit" was removed"""
+    try:
+        from sklearn.frozen import FrozenEstimator
+        calibrated = CalibratedClassifierCV(FrozenEstimator(pipeline), method=method)
+    except ImportError:
+        calibrated = CalibratedClassifierCV(estimator=pipeline, method=method, cv="prefit")
+    return calibrated.fit(X_val, y_val)
+
+
+def make_bundle_model(n_estimators=400, method="isotonic"):
+    """Isotonic-calibrated RF pipeline trained like the production bundle's model"""
+    X, y = make_labelled_candidates(3000)
+    pipeline = make_rf_pipeline(n_estimators).fit(X[:2400], y[:2400])
+    return calibrate(pipeline, X[2400:], y[2400:], method=method)
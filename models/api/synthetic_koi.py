@@ -0,0 +1,43 @@
+"""
+Synthetic KOI candidates for benchmarks and load tests
+
+Marginals follow the shape of the Kepler KOI table: log-normal orbital
+periods (hours to years), transit durations of a few hours, depths spanning
+tens to tens of thousands of ppm, impact parameters mostly in [0, 1] with a
+grazing tail, log-normal stellar densities and inclinations piled up near
+90 degrees. Optional features are missing at KOI-like rates. Every value is
+clipped to the ranges ExoplanetFeatures accepts, so no generated row is
+rejected by validation.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+FEATURES = ["koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl"]
+
+# Fraction of rows without the optional feature
+MISSING_RATES = {"koi_impact": 0.04, "koi_srho": 0.04, "koi_incl": 0.04}
+
+
+def make_matrix(n: int, seed: int = 0) -> np.ndarray:
+    """(n, 6) float64 matrix in FEATURES order, NaN for missing optional features"""
+    rng = np.random.default_rng(seed)
+    grazing = rng.random(n) < 0.1
+    X = np.column_stack([
+        rng.lognormal(np.log(12.0), 1.3, n).clip(0.25, 9999.0),        # koi_period, days
+        rng.lognormal(np.log(3.5), 0.55, n).clip(0.2, 23.9),           # koi_duration, hours
+        rng.lognormal(np.log(500.0), 1.7, n).clip(5.0, 99999.0),       # koi_depth, ppm
+        np.where(grazing, rng.uniform(1.0, 1.8, n), rng.beta(1.2, 1.5, n)),  # koi_impact
+        rng.lognormal(0.0, 1.1, n).clip(1e-3, 500.0),                  # koi_srho, g/cm³
+        (90.0 - np.abs(rng.normal(0.0, 2.5, n))).clip(0.0, 90.0),      # koi_incl, degrees
+    ])
+    for name, rate in MISSING_RATES.items():
+        X[rng.random(n) < rate, FEATURES.index(name)] = np.nan
+    return X
+
+
+def make_candidates(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Request-ready candidates; missing optional features are left out"""
+    return [{name: value for name, value in zip(FEATURES, row) if value == value}
+            for row in make_matrix(n, seed).tolist()]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized batch response encoder
+
+Run with `python test_batch_response.py` or `pytest test_batch_response.py`.
+"""
+
+import json
+
+import numpy as np
+
+from batch_response import confidence_levels, encode_batch_response
+from bench_batch_response import legacy_batch_response
+from main import get_confidence_level
+
+# Bucket edges and values whose 4-digit rounding differs between round() and np.round
+EDGE_PROBABILITIES = [0.0, 0.2, 0.2000001, 0.4, 0.4000001, 0.5, 0.6, 0.5999999, 0.8, 1.0, 0.12345, 0.00005, 0.99995]
+
+
+def make_probabilities(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.random(n), EDGE_PROBABILITIES])
+
+
+def test_confidence_levels_match_per_row_function():
+    probabilities = make_probabilities()
+    assert confidence_levels(probabilities).tolist() == [get_confidence_level(p) for p in probabilities]
+
+
+def test_rows_layout_matches_legacy_response():
+    probabilities = make_probabilities()
+    for threshold in (0.5, 0.37):
+        assert json.loads(encode_batch_response(probabilities, threshold)) == \
+            json.loads(legacy_batch_response(probabilities, threshold))
+
+
+def test_columnar_layout_has_the_same_values():
+    probabilities = make_probabilities()
+    rows = json.loads(encode_batch_response(probabilities, 0.5))
+    columnar = json.loads(encode_batch_response(probabilities, 0.5, "columnar"))
+    assert columnar["summary"] == rows["summary"]
+    for field, values in columnar["predictions"].items():
+        assert values == [row[field] for row in rows["predictions"]]
+
+
+if __name__ == "__main__":
+    print("🔍 Testing vectorized batch responses...")
+    for test in [test_confidence_levels_match_per_row_function, test_rows_layout_matches_legacy_response,
+                 test_columnar_layout_has_the_same_values]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All batch response tests passed!")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the serving benchmark suite and its synthetic candidates
+
+Run with `python test_bench_serving.py` or `pytest test_bench_serving.py`.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import bench_serving
+from api_testing import isolated_api
+from main import ExoplanetFeatures
+from synthetic_bundle import make_bundle_model
+from synthetic_koi import FEATURES, make_candidates, make_matrix
+
+
+def test_synthetic_candidates_pass_validation():
+    X = make_matrix(5000, seed=2)
+    assert X.shape == (5000, len(FEATURES))
+    assert np.isnan(X[:, :3]).sum() == 0  # required features are always present
+    assert 0 < np.isnan(X[:, 3:]).mean() < 0.1
+    for candidate in make_candidates(2000, seed=3):
+        ExoplanetFeatures(**candidate)
+    assert make_candidates(5, seed=4) == make_candidates(5, seed=4)
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    def run(p50, p95, rps):
+        return {"results": {"/predict c=1": {"latency_ms": {"p50": p50, "p95": p95}, "throughput_rps": rps}}}
+    baseline = run(10.0, 20.0, 100.0)
+    assert bench_serving.compare(baseline, run(11.0, 22.0, 95.0), threshold=0.2) == []
+    assert bench_serving.compare(baseline, run(5.0, 10.0, 300.0), threshold=0.2) == []  # improvements
+    regressions = bench_serving.compare(baseline, run(13.0, 20.0, 70.0), threshold=0.2)
+    assert len(regressions) == 2
+    assert any("latency_ms.p50" in r for r in regressions) and any("throughput_rps" in r for r in regressions)
+    # Scenarios missing from the baseline are not compared
+    assert bench_serving.compare({"results": {}}, run(99.0, 99.0, 1.0), threshold=0.2) == []
+
+
+def test_in_process_run_writes_results_and_checks_baseline():
+    with isolated_api() as main, tempfile.TemporaryDirectory() as directory:
+        main.activate_model({"model": make_bundle_model(n_estimators=20), "threshold": 0.5, "features": FEATURES})
+        output, baseline = os.path.join(directory, "run.json"), os.path.join(directory, "baseline.json")
+        argv = ["--seconds", "0.2", "--concurrency", "1", "4", "--batch-sizes", "50", "--batch-concurrency", "1",
+                "--output", output, "--baseline", baseline]
+        assert bench_serving.main(argv + ["--update-baseline"]) == 0
+        with open(output) as f:
+            run = json.load(f)
+        assert set(run["results"]) == {"/predict c=1", "/predict c=4", "/predict/batch n=50 c=1"}
+        for result in run["results"].values():
+            assert result["requests"] >= 3 and result["errors"] == 0
+            assert result["latency_ms"]["p50"] <= result["latency_ms"]["p95"] <= result["latency_ms"]["p99"]
+
+        # A baseline that was 100x faster must be reported as a regression
+        for result in run["results"].values():
+            result["latency_ms"] = {k: v / 100 for k, v in result["latency_ms"].items()}
+            result["throughput_rps"] *= 100
+        with open(baseline, "w") as f:
+            json.dump(run, f)
+        assert bench_serving.main(argv) == 1
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the serving benchmark suite...")
+    for test in [test_synthetic_candidates_pass_validation, test_compare_flags_only_regressions_beyond_threshold,
+                 test_in_process_run_writes_results_and_checks_baseline]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All serving benchmark tests passed!")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for offline bulk scoring of catalogs
+
+Run with `python test_bulk_score.py` or `pytest test_bulk_score.py`.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bulk_score import main as bulk_main, score_catalog
+from main import get_confidence_level
+from synthetic_bundle import FEATURES, make_bundle_model
+from synthetic_koi import make_matrix
+
+THRESHOLD = 0.45
+
+
+def write_bundle(directory):
+    path = os.path.join(directory, "best_koi_reduced_rf.joblib")
+    joblib.dump({"model": make_bundle_model(n_estimators=30), "threshold": THRESHOLD, "features": FEATURES}, path)
+    return path
+
+
+def koi_frame(n, seed=0):
+    frame = pd.DataFrame(make_matrix(n, seed), columns=FEATURES)
+    frame.insert(0, "kepoi_name", [f"K{i:05d}.01" for i in range(n)])
+    frame["koi_comment"] = "quoted, with a comma"
+    return frame
+
+
+def score(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        stats = score_catalog(*args, **kwargs)
+    return stats, out.getvalue()
+
+
+def assert_scored(output, expected_proba, ids):
+    assert output["kepoi_name" if "kepoi_name" in output else "toi"].astype(str).tolist() == ids
+    assert np.abs(output["probability"].to_numpy() - expected_proba).max() < 1e-12
+    assert (output["prediction"].to_numpy() == (expected_proba >= THRESHOLD)).all()
+    assert output["confidence"].tolist() == [get_confidence_level(p) for p in output["probability"]]
+
+
+def test_koi_csv_scores_like_the_model_in_input_order():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = write_bundle(directory)
+        model = joblib.load(bundle_path)["model"]
+        frame = koi_frame(5000)
+        csv_path = os.path.join(directory, "koi.csv")
+        with open(csv_path, "w") as f:
+            f.write("# This file was produced by the NASA Exoplanet Archive\n\n")
+            frame.to_csv(f, index=False)
+        expected = model.predict_proba(frame[FEATURES])[:, 1]
+
+        for workers, output_name in ((1, "one.parquet"), (3, "three.parquet"), (2, "two.csv")):
+            output_path = os.path.join(directory, output_name)
+            stats, _ = score(csv_path, output_path, bundle_path, workers=workers, chunk_rows=700)
+            assert stats["rows"] == 5000 and stats["predicted_planets"] == int((expected >= THRESHOLD).sum())
+            reader = pd.read_csv if output_name.endswith(".csv") else pd.read_parquet
+            assert_scored(reader(output_path), expected, frame["kepoi_name"].tolist())
+
+
+def test_toi_columns_are_mapped_and_missing_features_imputed():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = write_bundle(directory)
+        model = joblib.load(bundle_path)["model"]
+        X = make_matrix(1200, seed=3)
+        toi = pd.DataFrame({"toi": [f"{1000 + i}.01" for i in range(len(X))], "pl_orbper": X[:, 0],
+                            "pl_trandurh": X[:, 1], "pl_trandep": X[:, 2]})
+        expected_X = pd.DataFrame(np.column_stack([X[:, :3], np.full((len(X), 3), np.nan)]), columns=FEATURES)
+        expected = model.predict_proba(expected_X)[:, 1]
+
+        tsv_path = os.path.join(directory, "toi.tsv")
+        toi.to_csv(tsv_path, sep="\t", index=False)
+        parquet_path = os.path.join(directory, "toi.parquet")
+        toi.to_parquet(parquet_path, index=False)
+        for input_path in (tsv_path, parquet_path):
+            output_path = os.path.join(directory, "scores.parquet")
+            _, out = score(input_path, output_path, bundle_path, workers=2, chunk_rows=500)
+            assert "koi_impact, koi_srho, koi_incl" in out
+            assert_scored(pd.read_parquet(output_path), expected, toi["toi"].tolist())
+
+
+def test_empty_and_unusable_catalogs():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = write_bundle(directory)
+        empty_path = os.path.join(directory, "empty.csv")
+        koi_frame(0).to_csv(empty_path, index=False)
+        output_path = os.path.join(directory, "empty.parquet")
+        stats, _ = score(empty_path, output_path, bundle_path, workers=1)
+        assert stats["rows"] == 0
+        assert list(pd.read_parquet(output_path).columns) == ["kepoi_name", "probability", "prediction", "confidence"]
+
+        other_path = os.path.join(directory, "other.csv")
+        pd.DataFrame({"ra": [1.0], "dec": [2.0]}).to_csv(other_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            code = bulk_main([other_path, output_path, "--bundle", bundle_path, "--workers", "1"])
+        assert code == 1 and "None of the model features" in out.getvalue()
+
+
+def test_malformed_rows_and_values_are_counted():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = write_bundle(directory)
+        model = joblib.load(bundle_path)["model"]
+        csv_path = os.path.join(directory, "koi.csv")
+        with open(csv_path, "w") as f:
+            f.write("kepoi_name,koi_period,koi_duration,koi_depth\n"
+                    "K1,11,2,500\n"
+                    "K2,11,2,500,EXTRA\n"  # too many fields
+                    "K3,abc,2,3\n"  # koi_period is not a number
+                    "K4,12\n"  # too few fields
+                    "K5,,2,NA\n")  # empty and NA cells are missing, not malformed
+        expected_X = pd.DataFrame([[11, 2, 500], [np.nan, 2, 3], [np.nan, 2, np.nan]], columns=FEATURES[:3])
+        expected = model.predict_proba(expected_X.reindex(columns=FEATURES))[:, 1]
+
+        output_path = os.path.join(directory, "scores.parquet")
+        stats, _ = score(csv_path, output_path, bundle_path, workers=1)
+        assert (stats["rows"], stats["malformed_rows"], stats["unparsed_values"]) == (3, 2, 1)
+        assert_scored(pd.read_parquet(output_path), expected, ["K1", "K3", "K5"])
+
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            assert bulk_main([csv_path, output_path, "--bundle", bundle_path, "--workers", "1"]) == 0
+        assert "Skipped 2 malformed lines" in out.getvalue() and "1 feature values" in out.getvalue()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            code = bulk_main([csv_path, output_path, "--bundle", bundle_path, "--workers", "1",
+                              "--on-bad-lines", "error"])
+        assert code == 1 and "Expected 4 columns, got 5: K2,11,2,500,EXTRA" in out.getvalue()
+
+
+if __name__ == "__main__":
+    print("🔍 Testing bulk catalog scoring...")
+    for test in [test_koi_csv_scores_like_the_model_in_input_order,
+                 test_toi_columns_are_mapped_and_missing_features_imputed,
+                 test_empty_and_unusable_catalogs,
+                 test_malformed_rows_and_values_are_counted]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All bulk scoring tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for columnar/binary batch payloads and their vectorized validation
+
+Run with `python test_columnar.py` or `pytest test_columnar.py`.
+"""
+
+import numpy as np
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from api_testing import isolated_api
+from columnar import MAX_REPORTED_ROWS, binary_to_matrix, columns_to_matrix, validate_matrix
+from main import ExoplanetFeatures
+from synthetic_bundle import make_bundle_model
+
+FEATURES = ["koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl"]
+
+# Values on and around every bound used by ExoplanetFeatures
+EDGE_VALUES = [np.nan, -1.0, 0.0, 1e-9, 0.5, 1.0, 24.0, 24.000001, 90.0, 180.0, 180.5,
+               10000.0, 10000.5, 100000.0, 100000.5]
+
+
+def random_edge_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.choice(EDGE_VALUES, size=(n, len(FEATURES)))
+
+
+def pydantic_valid(row):
+    record = {name: (None if np.isnan(v) else float(v)) for name, v in zip(FEATURES, row)}
+    try:
+        ExoplanetFeatures(**record)
+        return True
+    except ValidationError:
+        return False
+
+
+def vectorized_invalid_rows(X):
+    failures = validate_matrix(X, FEATURES)
+    return set(row for failure in failures for row in failure["rows"])
+
+
+def test_vectorized_validation_matches_pydantic():
+    X = random_edge_matrix(MAX_REPORTED_ROWS)  # every failing row index is reported
+    invalid = vectorized_invalid_rows(X)
+    mismatches = [i for i, row in enumerate(X) if pydantic_valid(row) == (i in invalid)]
+    assert not mismatches, f"rows disagreeing with ExoplanetFeatures: {mismatches[:10]}"
+
+
+def test_failures_report_field_rule_and_rows():
+    X = np.array([[5.0, 1.0, 100.0, np.nan, np.nan, np.nan],
+                  [0.0, 1.0, 100.0, np.nan, np.nan, np.nan],
+                  [5.0, 25.0, 100.0, np.nan, np.nan, 181.0]])
+    failures = {(f["field"], f["rule"]): f["rows"] for f in validate_matrix(X, FEATURES)}
+    assert failures == {("koi_period", "> 0"): [1], ("koi_duration", "<= 24"): [2], ("koi_incl", "<= 180"): [2]}
+
+
+def test_columns_and_binary_decode_to_the_same_matrix():
+    columns = {"koi_period": [10.0, 20.0], "koi_duration": [1.0, 2.0], "koi_depth": [100.0, 200.0],
+               "koi_impact": [None, 0.3]}
+    X = columns_to_matrix(columns, FEATURES)
+    assert np.isnan(X[:, 4:]).all() and np.isnan(X[0, 3]) and X[1, 3] == 0.3
+    np.testing.assert_array_equal(binary_to_matrix(X.tobytes(), len(FEATURES)), X)
+    np.testing.assert_array_equal(binary_to_matrix(X.astype(np.float32).tobytes(), len(FEATURES), "float32"),
+                                  X.astype(np.float32))
+
+
+def test_malformed_payloads_raise_value_error():
+    for call in (lambda: columns_to_matrix({"koi_period": [1.0], "koi_depth": [1.0, 2.0]}, FEATURES),
+                 lambda: columns_to_matrix({"koi_period": ["a"]}, FEATURES),
+                 lambda: columns_to_matrix({"koi_period": 5.0, "koi_depth": [1.0]}, FEATURES),
+                 lambda: columns_to_matrix({"koi_period": "12.5"}, FEATURES),
+                 lambda: binary_to_matrix(b"\x00" * 10, len(FEATURES))):
+        try:
+            call()
+        except ValueError:
+            continue
+        raise AssertionError("Expected ValueError")
+
+
+def test_scalar_column_is_a_client_error():
+    with isolated_api() as main:
+        main.activate_model({"model": make_bundle_model(n_estimators=5), "features": FEATURES})
+        with TestClient(main.app) as client:
+            response = client.post("/predict/batch", json={"columns": {"koi_period": 5.0, "koi_depth": [1.0]}})
+    assert response.status_code == 400 and "'koi_period'" in response.json()["detail"]
+
+
+if __name__ == "__main__":
+    print("🔍 Testing columnar payloads and vectorized validation...")
+    for test in [test_vectorized_validation_matches_pydantic, test_failures_report_field_rule_and_rows,
+                 test_columns_and_binary_decode_to_the_same_matrix, test_malformed_payloads_raise_value_error,
+                 test_scalar_column_is_a_client_error]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All columnar tests passed!")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for compact serving variants: tree selection, depth caps and engine storage
+
+Run with `python test_compact_model.py` or `pytest test_compact_model.py`.
+"""
+
+import contextlib
+import io
+import json
+import os
+import pickle
+import tempfile
+
+import joblib
+import numpy as np
+
+from api_testing import isolated_api
+from compact_model import capped_model, main as compact_main, select_trees, tree_orders, truncate_tree
+from export_model import export_bundle
+from forest_engine import compile_model, with_storage
+from main import open_bundle
+from synthetic_bundle import FEATURES, make_bundle_model, make_labelled_candidates
+
+THRESHOLD = 0.45
+
+
+def forests(model):
+    return [member.estimator.estimator.steps[-1][1] for member in model.calibrated_classifiers_]
+
+
+def test_truncated_tree_stops_at_the_cap():
+    model = make_bundle_model(n_estimators=5)
+    X, _ = make_labelled_candidates(500, seed=1)
+    pipeline = model.calibrated_classifiers_[0].estimator.estimator
+    Xt = pipeline.steps[0][1].transform(X).astype(np.float32)
+    for tree in forests(model)[0].estimators_:
+        cut = truncate_tree(tree, 4)
+        assert cut.tree_.max_depth == 4 and tree.tree_.max_depth > 4
+        # The row ends in the node its full path passes at depth 4 (or in an earlier leaf)
+        path = tree.decision_path(Xt).toarray().astype(bool)
+        expected = np.array([tree.tree_.value[np.flatnonzero(row)[:5][-1], 0] for row in path])
+        expected /= expected.sum(axis=1, keepdims=True)
+        assert np.allclose(cut.predict_proba(Xt), expected)
+        assert truncate_tree(tree, 100) is tree
+
+
+def test_selected_trees_track_the_full_forest():
+    model = make_bundle_model(n_estimators=60)
+    X, _ = make_labelled_candidates(1500, seed=2)
+    Xn = X.to_numpy(dtype=np.float64)
+    full = model.predict_proba(X)[:, 1]
+    orders = tree_orders(model, model, Xn, 60)
+    assert sorted(orders[0].tolist()) == list(range(60))
+
+    pruned = select_trees(model, orders, 15)
+    assert [len(f.estimators_) for f in forests(pruned)] == [15] and len(forests(model)[0].estimators_) == 60
+    assert len(pickle.dumps(pruned)) < len(pickle.dumps(model)) / 3
+    first = select_trees(model, [np.arange(60)], 15)
+    assert np.abs(pruned.predict_proba(X)[:, 1] - full).mean() < np.abs(first.predict_proba(X)[:, 1] - full).mean()
+    assert np.abs(compile_model(pruned).predict_proba(Xn) - pruned.predict_proba(X)).max() <= 1e-12
+
+    capped = select_trees(capped_model(model, 6), tree_orders(capped_model(model, 6), model, Xn, 15), 15)
+    assert max(t.tree_.max_depth for t in forests(capped)[0].estimators_) == 6
+    assert np.abs(compile_model(capped).predict_proba(Xn) - capped.predict_proba(X)).max() <= 1e-12
+
+
+def test_storage_keeps_the_splits():
+    model = make_bundle_model(n_estimators=40)
+    X, _ = make_labelled_candidates(2000, seed=3)
+    X = X.to_numpy(dtype=np.float64)
+    compiled = compile_model(model)
+    forest = compiled.members[0][0]
+    expected = forest.leaf_indices(forest.transform(X))
+    for storage, leaf_error in [("float32", 1e-7), ("uint16", 7.7e-6), ("uint8", 2e-3)]:
+        compact = with_storage(compiled, storage).members[0][0]
+        assert compact.threshold.dtype == np.float32 and compact.nbytes < forest.nbytes
+        assert np.array_equal(compact.leaf_indices(compact.transform(X)), expected)  # float32 splits are exact
+        leaves = compact.leaf_value.astype(np.float64) * compact.leaf_scale
+        assert np.abs(leaves - forest.leaf_value).max() <= leaf_error
+    assert with_storage(compiled, "float64") is compiled
+    try:
+        with_storage(compiled, "int4")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_cli_variants_load_like_load_model():
+    X, y = make_labelled_candidates(600, seed=4)
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, "best_koi_reduced_rf.joblib")
+        joblib.dump({"model": make_bundle_model(n_estimators=30), "threshold": THRESHOLD, "features": FEATURES,
+                     "version": "2.0.0"}, bundle_path)
+        csv_path = os.path.join(directory, "validation.csv")
+        X.assign(label=y).to_csv(csv_path, index=False)
+        output = os.path.join(directory, "compact")
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = compact_main([bundle_path, "--csv", csv_path, "--output-dir", output, "--trees", "all,10",
+                                 "--max-depth", "none,5", "--storage", "float64,uint16", "--repeats", "5"])
+        assert code == 0
+        with open(os.path.join(output, "report.json")) as f:
+            report = json.load(f)
+        assert [r["variant"] for r in report] == ["full", "tall.dfull.uint16", "t10.dfull.float64",
+                                                  "t10.dfull.uint16", "tall.d5.float64", "tall.d5.uint16",
+                                                  "t10.d5.float64", "t10.d5.uint16"]
+        small = next(r for r in report if r["variant"] == "t10.d5.uint16")
+        assert small["file_mb"] < report[0]["file_mb"] and small["engine_mb"] < report[0]["engine_mb"]
+        assert 0.0 <= small["flipped"] <= 1.0 and abs(small["f1_delta"]) < 0.2
+        # Storage variants leave the sklearn model out, so even with every tree the file is smaller
+        for r in report[1:]:
+            if r["storage"] == "uint16":
+                assert "model" not in joblib.load(r["path"]) and r["file_mb"] < report[0]["file_mb"] / 2
+
+        # load_model() serves the variant with its compact engine; so does an exported artifact
+        with isolated_api() as main, contextlib.redirect_stdout(io.StringIO()):
+            main.MODEL_SPECS = f"compact={small['path']}"
+            main.load_model("compact")
+            snapshot = main.registry.get("compact")
+        assert snapshot.version == "2.0.0+t10.d5.uint16" and snapshot.threshold == THRESHOLD
+        assert snapshot.compiled.members[0][0].leaf_value.dtype == np.uint16
+        # Batches above compiled_max_rows use the engine too; only the uint16 rounding differs from the sklearn trees
+        assert not snapshot.has_model and len(X) > snapshot.compiled_max_rows
+        pruned = joblib.load(small["path"].replace("uint16", "float64"))["model"]
+        assert np.abs(snapshot.predict_proba(X) - pruned.predict_proba(X)).max() < 1e-4
+        assert snapshot.explain(X).contributions.shape == (len(X), len(FEATURES))
+        with contextlib.redirect_stdout(io.StringIO()):
+            artifact = export_bundle(small["path"])
+            mapped = open_bundle(artifact)
+        assert mapped["compiled"].members[0][0].leaf_value.dtype == np.uint16
+        assert "model_loader" not in mapped and not os.path.exists(os.path.join(artifact, "model.joblib"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert compact_main([bundle_path, "--csv", csv_path, "--output-dir", output, "--storage", "int4"]) == 1
+
+
+if __name__ == "__main__":
+    print("🔍 Testing compact model variants...")
+    for test in [test_truncated_tree_stops_at_the_cap,
+                 test_selected_trees_track_the_full_forest,
+                 test_storage_keeps_the_splits,
+                 test_cli_variants_load_like_load_model]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All compact model tests passed!")
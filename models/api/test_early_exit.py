@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for early-exit scoring and the early_exit / budget_ms options of /predict and /predict/batch
+
+Run with `python test_early_exit.py` or `pytest test_early_exit.py`.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import joblib
+import numpy as np
+from fastapi.testclient import TestClient
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from api_testing import isolated_api
+from early_exit_report import main as report_main
+from forest_engine import compile_model
+from synthetic_bundle import FEATURES, make_bundle_model, make_labelled_candidates, make_rf_pipeline
+
+CANDIDATE = {"koi_period": 12.5, "koi_duration": 3.1, "koi_depth": 450.0, "koi_impact": 0.4}
+
+
+def test_settled_rows_keep_their_class():
+    model = make_bundle_model(n_estimators=200)
+    compiled = compile_model(model)
+    X = make_labelled_candidates(1000, seed=5)[0].to_numpy(dtype=np.float64)
+    full = compiled.predict_proba(X)[:, 1]
+    result = compiled.predict_early(X, 0.5, confidence=0.999, min_trees=16)
+
+    assert result.n_trees == 200 and result.budget_exhausted == 0
+    assert set(np.unique(result.trees)) <= {16, 32, 64, 128, 200} and result.trees.mean() < 100
+    assert np.array_equal(result.probability >= 0.5, full >= 0.5)
+    complete = result.trees == 200  # rows never settled early get the full-forest probability
+    assert np.abs(result.probability[complete] - full[complete]).max(initial=0.0) < 1e-12
+    # sklearn's trees (large batches) settle the same rows on the same votes
+    sklearn = compiled.predict_early(X, 0.5, confidence=0.999, min_trees=16, model=model)
+    assert np.array_equal(sklearn.trees, result.trees)
+    assert np.abs(sklearn.probability - result.probability).max() < 1e-12
+
+
+def test_every_tree_matches_predict_proba():
+    X, y = make_labelled_candidates(1200, seed=6)
+    # Two calibrated members (cv=2), each with its own 30-tree forest
+    model = CalibratedClassifierCV(make_rf_pipeline(n_estimators=30), cv=2).fit(X, y)
+    compiled = compile_model(model)
+    rows = make_labelled_candidates(300, seed=7)[0].to_numpy(dtype=np.float64)
+    for kwargs in ({}, {"model": model}):
+        result = compiled.predict_early(rows, 0.5, min_trees=30, **kwargs)
+        assert (result.trees == 60).all() and result.n_trees == 60
+        assert np.abs(result.probability - model.predict_proba(rows)[:, 1]).max() < 1e-12
+
+
+def test_budget_stops_after_the_first_block():
+    compiled = compile_model(make_bundle_model(n_estimators=100))
+    X = make_labelled_candidates(500, seed=8)[0].to_numpy(dtype=np.float64)
+    unlimited = compiled.predict_early(X, 0.5, min_trees=10)
+    result = compiled.predict_early(X, 0.5, min_trees=10, budget=0.0)
+    assert (result.trees == 10).all()
+    assert result.budget_exhausted == int((unlimited.trees > 10).sum()) > 0
+    settled = unlimited.trees == 10
+    assert np.array_equal(result.probability[settled], unlimited.probability[settled])
+
+
+def test_early_exit_endpoints():
+    candidates = [CANDIDATE, {**CANDIDATE, "koi_depth": 30000.0, "koi_impact": 1.2}]
+    with isolated_api() as main:
+        main.activate_model({"model": make_bundle_model(n_estimators=40), "threshold": 0.5, "features": FEATURES})
+        with TestClient(main.app) as client:
+            single = client.post("/predict?early_exit=true", json=CANDIDATE).json()
+            budgeted = client.post("/predict?budget_ms=0", json=CANDIDATE).json()
+            full = client.post("/predict", json=CANDIDATE).json()
+            batch = client.post("/predict/batch?early_exit=true", json={"candidates": candidates}).json()
+            columnar = client.post("/predict/batch?early_exit=true&layout=columnar",
+                                   json={"candidates": candidates}).json()
+            full_batch = client.post("/predict/batch", json={"candidates": candidates}).json()
+            negative = client.post("/predict/batch?budget_ms=-1", json={"candidates": candidates})
+
+            main.activate_model({"model": Pipeline([("imputer", SimpleImputer()), ("clf", LogisticRegression())]).fit(
+                *make_labelled_candidates(200)), "features": FEATURES}, name="logreg")
+            unsupported = client.post("/predict?early_exit=true&model=logreg", json=CANDIDATE)
+
+    assert "trees_used" not in full and "trees_used" not in full_batch["predictions"][0]
+    assert 32 <= single["trees_used"] <= 40 and single["prediction"] == full["prediction"]
+    assert budgeted["trees_used"] == 32
+    assert [p["prediction"] for p in batch["predictions"]] == [p["prediction"] for p in full_batch["predictions"]]
+    assert all(32 <= p["trees_used"] <= 40 for p in batch["predictions"])
+    assert columnar["predictions"]["trees_used"] == [p["trees_used"] for p in batch["predictions"]]
+    summary = batch["summary"]["early_exit"]
+    assert summary["trees_total"] == 40 and summary["budget_exhausted"] == 0
+    assert summary["mean_trees_used"] == round(np.mean([p["trees_used"] for p in batch["predictions"]]), 1)
+    assert negative.status_code == 400 and unsupported.status_code == 400
+
+
+def test_report_cli():
+    X, y = make_labelled_candidates(400, seed=9)
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, "best_koi_reduced_rf.joblib")
+        joblib.dump({"model": make_bundle_model(n_estimators=60), "threshold": 0.45, "features": FEATURES},
+                    bundle_path)
+        csv_path = os.path.join(directory, "validation.csv")
+        X.assign(label=y).to_csv(csv_path, index=False)
+        output = os.path.join(directory, "early_exit.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = report_main([bundle_path, "--csv", csv_path, "--confidence", "0.99,0.999", "--min-trees", "16",
+                                "--budget-ms", "none,0", "--repeats", "5", "--output", output])
+        assert code == 0
+        with open(output) as f:
+            report = json.load(f)
+        assert [r["setting"] for r in report] == ["full", "c0.99.m16", "c0.99.m16.b0ms", "c0.999.m16",
+                                                  "c0.999.m16.b0ms"]
+        assert report[0]["mean_trees"] == 60 and report[0]["flipped"] == 0
+        for r in report[1:]:
+            assert 16 <= r["mean_trees"] < 60 and 0.0 <= r["flipped"] <= 1.0
+        assert report[2]["mean_trees"] == 16 and report[2]["budget_exhausted"] > 0
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert report_main([bundle_path, "--csv", csv_path, "--confidence", "1.5"]) == 1
+
+
+if __name__ == "__main__":
+    print("🔍 Testing early-exit scoring...")
+    for test in [test_settled_rows_keep_their_class,
+                 test_every_tree_matches_predict_proba,
+                 test_budget_stops_after_the_first_block,
+                 test_early_exit_endpoints,
+                 test_report_cli]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All early-exit tests passed!")
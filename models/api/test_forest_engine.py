@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the compiled forest engine against sklearn predict_proba
+
+Run with `python test_forest_engine.py` or `pytest test_forest_engine.py`.
+The bundle is trained on synthetic KOI-like data with the same pipeline the
+training notebook uses, so no model file is required.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from forest_engine import compile_model, pipeline_parts
+from synthetic_bundle import FEATURES, calibrate, make_bundle_model, make_labelled_candidates, make_rf_pipeline
+
+TOLERANCE = 1e-12
+
+
+def assert_parity(model, X):
+    expected = model.predict_proba(X)
+    actual = compile_model(model).predict_proba(X.to_numpy(dtype=np.float64))
+    assert actual.shape == expected.shape
+    max_diff = np.abs(actual - expected).max()
+    assert max_diff <= TOLERANCE, f"max |diff| = {max_diff}"
+    return expected, actual
+
+
+def test_calibrated_forest_parity():
+    """Bundle model: isotonic-calibrated RF pipeline, 400 trees"""
+    model = make_bundle_model()
+    X, _ = make_labelled_candidates(2000, seed=1)
+    expected, actual = assert_parity(model, X)
+    threshold = 0.45
+    assert ((expected[:, 1] >= threshold) == (actual[:, 1] >= threshold)).all()
+
+
+def test_single_row_parity():
+    model = make_bundle_model(n_estimators=50)
+    X, _ = make_labelled_candidates(25, seed=2)
+    engine = compile_model(model)
+    for i in range(len(X)):
+        row = X.iloc[[i]]
+        assert abs(engine.predict_proba(row.to_numpy())[0, 1] - model.predict_proba(row)[0, 1]) <= TOLERANCE
+
+
+def test_all_optional_missing_parity():
+    """TOI-style rows with koi_impact, koi_srho and koi_incl all missing"""
+    model = make_bundle_model(n_estimators=50)
+    X, _ = make_labelled_candidates(500, seed=3, missing_rate=1.0)
+    assert_parity(model, X)
+
+
+def test_sigmoid_and_uncalibrated_parity():
+    X, y = make_labelled_candidates(1500, seed=4)
+    pipeline = make_rf_pipeline(50).fit(X[:1200], y[:1200])
+    X_eval, _ = make_labelled_candidates(500, seed=5)
+    assert_parity(pipeline, X_eval)
+    assert_parity(calibrate(pipeline, X[1200:], y[1200:], method="sigmoid"), X_eval)
+
+
+def test_threshold_edges_parity():
+    """Inputs placed exactly on split thresholds follow sklearn's `<=` rule"""
+    model = make_bundle_model(n_estimators=50)
+    engine = compile_model(model)
+    forest = engine.members[0][0]
+    split = np.isfinite(forest.threshold)
+    rng = np.random.default_rng(6)
+    X, _ = make_labelled_candidates(300, seed=6)
+    X = X.to_numpy(copy=True)
+    picks = rng.choice(np.flatnonzero(split), size=len(X))
+    X[np.arange(len(X)), forest.feature[picks]] = forest.threshold[picks]
+    assert_parity(model, pd.DataFrame(X, columns=FEATURES))
+
+
+def test_rejects_unsupported_models():
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    X, y = make_labelled_candidates(200, seed=7)
+    forest = RandomForestClassifier(n_estimators=5, random_state=0)
+    unsupported = [
+        Pipeline([("imputer", SimpleImputer(strategy="median")), ("clf", LogisticRegression(max_iter=2000))]),
+        Pipeline([("imputer", SimpleImputer(strategy="median", add_indicator=True)), ("clf", forest)]),
+        Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler()), ("clf", forest)]),
+    ]
+    for model in unsupported:
+        model.fit(X, y)
+        # Compilation and the sklearn paths of explanations and early exit share one pipeline check
+        for call in (compile_model, pipeline_parts):
+            try:
+                call(model)
+            except TypeError:
+                continue
+            raise AssertionError(f"{call.__name__} accepted {[name for name, _ in model.steps]}")
+
+
+if __name__ == "__main__":
+    print("🔍 Testing compiled engine parity with sklearn...")
+    for test in [test_calibrated_forest_parity, test_single_row_parity, test_all_optional_missing_parity,
+                 test_sigmoid_and_uncalibrated_parity, test_threshold_edges_parity, test_rejects_unsupported_models]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All parity tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus /metrics endpoint
+
+Run with `python test_metrics.py` or `pytest test_metrics.py`. The app runs
+in-process on a synthetic model bundle, so no server or model file is needed.
+"""
+
+import re
+
+from fastapi.testclient import TestClient
+
+from api_testing import isolated_api
+from metrics import STAGES, ApiMetrics, Histogram
+from synthetic_bundle import FEATURES, make_bundle_model
+
+CANDIDATE = {"koi_period": 10.0, "koi_duration": 2.0, "koi_depth": 500.0}
+
+
+def sample(text, name, **labels):
+    """Value of one sample in a text exposition, or None"""
+    for line in text.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            found = dict(re.findall(r'(\w+)="([^"]*)"', line.split(" ")[0]))
+            if found == {k: str(v) for k, v in labels.items()}:
+                return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "test", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "/x")
+    text = "\n".join(histogram.samples())
+    assert sample(text, "latency_seconds_bucket", endpoint="/x", le="0.1") == 2  # le is inclusive
+    assert sample(text, "latency_seconds_bucket", endpoint="/x", le="1.0") == 3
+    assert sample(text, "latency_seconds_bucket", endpoint="/x", le="+Inf") == 4
+    assert sample(text, "latency_seconds_count", endpoint="/x") == 4
+    assert abs(sample(text, "latency_seconds_sum", endpoint="/x") - 2.65) < 1e-9
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = ApiMetrics(enabled=False)
+    with metrics.stage("/predict", "frame"):
+        pass
+    metrics.observe_batch("/predict/batch", 10)
+    metrics.count_error("/predict", ValueError())
+    assert metrics.stage_seconds.count("/predict", "frame") == 0
+    assert metrics.batch_rows.count("/predict/batch") == 0
+    assert metrics.errors.value("/predict", "ValueError") == 0
+
+
+def test_endpoint_reports_requests_stages_batches_errors_and_loads():
+    # Metrics are process-wide (the middleware keeps the instance it was built with): assert deltas
+    with isolated_api() as main:
+        snapshot = main.activate_model({"model": make_bundle_model(n_estimators=20), "threshold": 0.5,
+                                        "features": FEATURES}, name="metrics-test", make_default=True)
+        main.metrics.record_load(snapshot.name, 0.25)
+        main.prediction_cache = None  # every request reaches predict_proba
+        with TestClient(main.app) as client:
+            before = client.get("/metrics").text
+            assert client.post("/predict", json=CANDIDATE).status_code == 200
+            assert client.post("/predict", json={"koi_period": -1}).status_code == 422
+            assert client.post("/predict/batch", json={"candidates": [CANDIDATE] * 30}).status_code == 200
+            assert client.get("/no/such/path").status_code == 404
+            response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    def delta(name, **labels):
+        return sample(text, name, **labels) - (sample(before, name, **labels) or 0.0)
+
+    assert delta("exo_api_requests_total", endpoint="/predict", status=200) == 1
+    assert delta("exo_api_requests_total", endpoint="/predict", status=422) == 1
+    assert delta("exo_api_requests_total", endpoint="unmatched", status=404) == 1
+    assert delta("exo_api_request_duration_seconds_count", endpoint="/predict/batch") == 1
+    for stage in STAGES:
+        for endpoint in ("/predict", "/predict/batch"):
+            assert delta("exo_api_stage_duration_seconds_count", endpoint=endpoint, stage=stage) >= 1
+    assert delta("exo_api_batch_size_rows_bucket", endpoint="/predict/batch", le="25.0") == 0
+    assert delta("exo_api_batch_size_rows_bucket", endpoint="/predict/batch", le="50.0") == 1
+    assert delta("exo_api_errors_total", endpoint="/predict", exception="RequestValidationError") == 1
+    assert sample(text, "exo_api_model_load_duration_seconds", model=snapshot.name, version=snapshot.version) == 0.25
+    assert sample(text, "exo_api_last_model_load_timestamp_seconds") > 0
+    # /metrics scrapes are not themselves recorded
+    assert sample(text, "exo_api_requests_total", endpoint="/metrics", status=200) is None
+
+if __name__ == "__main__":
+    print("🔍 Testing Prometheus metrics...")
+    for test in [test_histogram_buckets_are_cumulative, test_disabled_metrics_record_nothing,
+                 test_endpoint_reports_requests_stages_batches_errors_and_loads]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All metrics tests passed!")
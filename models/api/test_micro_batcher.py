@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for MicroBatcher: coalescing, size-triggered flushes, per-caller results and errors
+
+Run with `python test_micro_batcher.py` or `pytest test_micro_batcher.py`.
+"""
+
+import asyncio
+
+import numpy as np
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingScorer:
+    """Async score_fn whose positive-class probability is the row's first feature"""
+
+    def __init__(self, fail_calls=0):
+        self.calls = []
+        self.fail_calls = fail_calls
+
+    async def __call__(self, X):
+        self.calls.append(len(X))
+        if len(self.calls) <= self.fail_calls:
+            raise RuntimeError("scoring failed")
+        await asyncio.sleep(0)
+        return np.column_stack([1.0 - X[:, 0], X[:, 0]])
+
+
+def row(value):
+    return np.array([[value, 1.0, 2.0]])
+
+
+def test_rows_within_the_window_share_one_call():
+    async def run():
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, window_ms=20, max_batch_size=100)
+        values = [0.1, 0.2, 0.3, 0.4, 0.5]
+        results = await asyncio.gather(*(batcher.submit(row(v)) for v in values))
+        return scorer, batcher, values, results
+
+    scorer, batcher, values, results = asyncio.run(run())
+    assert scorer.calls == [5]
+    assert results == values  # every caller gets its own row back
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["rows"] == 5 and stats["last_batch_size"] == 5
+    assert stats["queue_depth"] == 0 and stats["max_queue_depth"] == 5
+    assert stats["batch_size_distribution"] == {"<=8": 1}
+
+
+def test_full_batches_flush_without_waiting_for_the_window():
+    async def run():
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, window_ms=60_000, max_batch_size=3)
+        values = [0.01 * i for i in range(6)]
+        # A one-minute window: only the size trigger can resolve these in time
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(row(v)) for v in values)), 5)
+        return scorer, batcher, values, results
+
+    scorer, batcher, values, results = asyncio.run(run())
+    assert scorer.calls == [3, 3] and results == values
+    assert batcher.stats()["mean_batch_size"] == 3.0 and batcher.queue_depth == 0
+
+
+def test_scoring_errors_reach_every_caller():
+    async def run():
+        scorer = RecordingScorer(fail_calls=1)
+        batcher = MicroBatcher(scorer, window_ms=10, max_batch_size=100)
+        failed = await asyncio.wait_for(asyncio.gather(*(batcher.submit(row(0.5)) for _ in range(4)),
+                                                       return_exceptions=True), 5)
+        # The batcher keeps serving after a failed call
+        recovered = await asyncio.wait_for(asyncio.gather(batcher.submit(row(0.7)), batcher.submit(row(0.9))), 5)
+        return scorer, failed, recovered
+
+    scorer, failed, recovered = asyncio.run(run())
+    assert scorer.calls == [4, 2]
+    assert len(failed) == 4 and all(isinstance(e, RuntimeError) for e in failed)
+    assert recovered == [0.7, 0.9]
+
+
+def test_rejects_bad_settings():
+    for kwargs in ({"window_ms": 0}, {"max_batch_size": 0}):
+        try:
+            MicroBatcher(RecordingScorer(), **kwargs)
+            raise AssertionError(f"expected ValueError for {kwargs}")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    print("🔍 Testing micro-batching...")
+    for test in [test_rows_within_the_window_share_one_call,
+                 test_full_batches_flush_without_waiting_for_the_window,
+                 test_scoring_errors_reach_every_caller,
+                 test_rejects_bad_settings]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All micro-batching tests passed!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for memory-mapped model artifacts
+
+Run with `python test_model_artifact.py` or `pytest test_model_artifact.py`.
+"""
+
+import os
+import tempfile
+
+import joblib
+import numpy as np
+
+from export_model import export_bundle
+from model_artifact import fresh_artifact_for, load_artifact
+from model_registry import build_snapshot
+from synthetic_bundle import FEATURES, make_bundle_model, make_labelled_candidates
+
+
+def make_bundle_file(directory, name="best_koi_reduced_rf.joblib"):
+    path = os.path.join(directory, name)
+    joblib.dump({"model": make_bundle_model(n_estimators=20), "threshold": 0.4, "features": FEATURES,
+                 "version": "3.1.0"}, path)
+    return path
+
+
+def test_artifact_is_memory_mapped_and_matches_the_bundle():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = make_bundle_file(directory)
+        artifact = export_bundle(bundle_path)
+        assert fresh_artifact_for(bundle_path) == artifact
+
+        bundle = load_artifact(artifact)
+        forest = bundle["compiled"].members[0][0]
+        assert all(isinstance(a, np.memmap) for a in (forest.feature, forest.threshold, forest.children))
+        assert "model" not in bundle
+
+        snapshot = build_snapshot(bundle, "rf", compiled_max_rows=64)
+        assert (snapshot.version, snapshot.threshold, snapshot.model_type) == ("3.1.0", 0.4, "Random Forest")
+        assert snapshot.model is None  # the sklearn model is loaded lazily
+
+        X, _ = make_labelled_candidates(200, seed=3)
+        expected = joblib.load(bundle_path)["model"].predict_proba(X)
+        np.testing.assert_allclose(snapshot.predict_proba(X.to_numpy()[:10]), expected[:10], atol=1e-12)
+        assert snapshot.model is None
+        # Larger batches go through sklearn, which loads the model on demand
+        np.testing.assert_allclose(snapshot.predict_proba(X.to_numpy()), expected, atol=1e-12)
+        assert snapshot.model is not None
+
+
+def test_stale_artifact_is_ignored_and_reexport_is_detected():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = make_bundle_file(directory)
+        artifact = export_bundle(bundle_path)
+        old = load_artifact(artifact)
+
+        # A bundle retrained after the export makes the artifact stale
+        earlier = os.path.getmtime(bundle_path) - 10
+        os.utime(os.path.join(artifact, "meta.json"), (earlier, earlier))
+        assert fresh_artifact_for(bundle_path) is None
+
+        # Re-exporting replaces the directory; the old snapshot must not lazily load the new model
+        export_bundle(bundle_path)
+        assert fresh_artifact_for(bundle_path) == artifact
+        try:
+            old["model_loader"]()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("Expected RuntimeError for a re-exported artifact")
+        assert load_artifact(artifact)["model_loader"]() is not None
+
+
+if __name__ == "__main__":
+    print("🔍 Testing memory-mapped model artifacts...")
+    for test in [test_artifact_is_memory_mapped_and_matches_the_bundle,
+                 test_stale_artifact_is_ignored_and_reexport_is_detected]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All model artifact tests passed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned model registry: atomic swaps, named models and traffic split
+
+Run with `python test_model_registry.py` or `pytest test_model_registry.py`.
+"""
+
+import random
+import threading
+
+import numpy as np
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import (ModelRegistry, ModelSnapshot, build_snapshot, limit_n_jobs, model_name_from_path,
+                            parse_assignments)
+from synthetic_bundle import FEATURES, make_bundle_model, make_labelled_candidates
+
+
+def make_snapshot(name, version, threshold=0.5):
+    return ModelSnapshot(name=name, version=str(version), model=None, threshold=threshold,
+                         features=tuple(FEATURES), model_type="stub")
+
+
+def expect_error(error_type, fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except error_type:
+        return
+    raise AssertionError(f"Expected {error_type.__name__}")
+
+
+def test_build_snapshot_compiles_forest_and_falls_back_for_logreg():
+    rf = build_snapshot({"model": make_bundle_model(n_estimators=20), "threshold": 0.4, "features": FEATURES}, "rf")
+    assert rf.compiled is not None and rf.model_type == "Random Forest" and rf.threshold == 0.4
+
+    X, y = make_labelled_candidates(500)
+    logreg_model = Pipeline([("prep", Pipeline([("imputer", SimpleImputer(strategy="median")),
+                                                ("scaler", StandardScaler())])),
+                             ("clf", LogisticRegression(max_iter=2000))]).fit(X, y)
+    logreg = build_snapshot({"model": logreg_model, "features": FEATURES, "version": "2"}, "logreg")
+    assert logreg.compiled is None and logreg.model_type == "Logistic Regression" and logreg.version == "2"
+    np.testing.assert_allclose(logreg.predict_proba(X.to_numpy()), logreg_model.predict_proba(X))
+
+
+def test_first_model_becomes_default_and_names_are_served_side_by_side():
+    registry = ModelRegistry()
+    assert not registry.loaded
+    registry.publish(make_snapshot("rf", 1))
+    registry.publish(make_snapshot("logreg", 1))
+    assert registry.get().name == "rf" and registry.get("logreg").name == "logreg"
+    registry.publish(make_snapshot("logreg", 2), make_default=True)
+    assert registry.get().label == "logreg@2" and registry.names() == ["rf", "logreg"]
+    expect_error(KeyError, registry.get, "missing")
+
+
+def test_traffic_split_routes_by_weight():
+    registry = ModelRegistry(rng=random.Random(0))
+    registry.publish(make_snapshot("rf", 1))
+    registry.publish(make_snapshot("logreg", 1))
+    registry.set_routing(split={"rf": 3, "logreg": 1})
+    names = [registry.route().name for _ in range(4000)]
+    assert abs(names.count("logreg") / len(names) - 0.25) < 0.03
+    # An explicit name always wins over the split
+    assert all(registry.route("rf").name == "rf" for _ in range(100))
+    registry.set_routing(split={})
+    assert {registry.route().name for _ in range(100)} == {"rf"}
+
+    expect_error(KeyError, registry.set_routing, split={"missing": 1})
+    expect_error(KeyError, registry.set_routing, default="missing")
+    expect_error(ValueError, registry.set_routing, split={"rf": -1})
+
+
+def test_readers_never_see_a_partially_published_state():
+    registry = ModelRegistry()
+    registry.publish(make_snapshot("rf", 0, threshold=0.0))
+    stop = threading.Event()
+    torn = []
+
+    def reader():
+        while not stop.is_set():
+            snapshot = registry.get()
+            # Every published version carries a matching threshold
+            if snapshot.threshold != int(snapshot.version) / 1000:
+                torn.append(snapshot.label)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for version in range(1, 1000):
+        registry.publish(make_snapshot("rf", version, threshold=version / 1000))
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert not torn and registry.get().version == "999"
+
+
+def test_on_publish_hook_and_config_parsing():
+    published = []
+    registry = ModelRegistry(on_publish=lambda: published.append(True))
+    registry.publish(make_snapshot("rf", 1))
+    assert published == [True]
+    assert parse_assignments("rf=a.joblib, logreg = b.joblib") == {"rf": "a.joblib", "logreg": "b.joblib"}
+    expect_error(ValueError, parse_assignments, "rf")
+    assert model_name_from_path("models/best_koi_reduced_logreg.joblib") == "logreg"
+    assert model_name_from_path("custom.joblib") == "custom"
+
+
+def test_n_jobs_is_capped_inside_nested_estimators():
+    model = make_bundle_model(n_estimators=10)
+    forest = model.calibrated_classifiers_[0].estimator.estimator.named_steps["clf"]
+    assert forest.n_jobs == -1
+    snapshot = build_snapshot({"model": model, "features": FEATURES}, "rf", n_jobs=1)
+    assert forest.n_jobs == 1 and snapshot.model is model
+    X, _ = make_labelled_candidates(20, seed=4)
+    np.testing.assert_allclose(limit_n_jobs(model, 2).predict_proba(X), snapshot.predict_proba(X.to_numpy()))
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the model registry...")
+    for test in [test_build_snapshot_compiles_forest_and_falls_back_for_logreg,
+                 test_first_model_becomes_default_and_names_are_served_side_by_side,
+                 test_traffic_split_routes_by_weight, test_readers_never_see_a_partially_published_state,
+                 test_on_publish_hook_and_config_parsing, test_n_jobs_is_capped_inside_nested_estimators]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All model registry tests passed!")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the LRU prediction cache and its invalidation on model swaps
+
+Run with `python test_prediction_cache.py` or `pytest test_prediction_cache.py`.
+"""
+
+import contextlib
+import io
+import math
+
+from model_registry import ModelRegistry, build_snapshot
+from prediction_cache import PredictionCache, canonical_features
+from synthetic_bundle import FEATURES, make_bundle_model
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_size=3)
+    cache.put_many(["a", "b", "c"], [0.1, 0.2, 0.3])
+    assert cache.get("a") == 0.1  # refreshes "a": "b" is now the oldest
+    cache.put("d", 0.4)
+    assert len(cache) == 3 and cache.get_many(["b", "c", "a", "d"]) == [None, 0.3, 0.1, 0.4]
+    cache.put("c", 0.35)  # overwriting refreshes too
+    cache.put_many(["e", "f"], [0.5, 0.6])
+    assert cache.get_many(["a", "d", "c", "e", "f"]) == [None, None, 0.35, 0.5, 0.6]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (7, 3, 3)
+    assert stats["size"] == 3 and stats["max_size"] == 3 and stats["hit_rate"] == 0.7
+    assert stats["invalidations"] == 0
+
+
+def test_canonical_keys_match_missing_values():
+    assert canonical_features([1, float("nan"), None]) == (1.0, None, None)
+    cache = PredictionCache()
+    cache.put(canonical_features([2.0, math.nan]), 0.9)
+    assert cache.get(canonical_features([2, float("nan")])) == 0.9
+
+
+def test_clear_drops_results_from_the_previous_generation():
+    cache = PredictionCache()
+    generation = cache.generation
+    cache.put("a", 0.1, generation)
+    cache.clear()
+    assert len(cache) == 0 and cache.get("a") is None
+    # A scoring call that started before the clear must not store its result
+    cache.put_many(["a", "b"], [0.1, 0.2], generation)
+    assert cache.get_many(["a", "b"]) == [None, None]
+    cache.put("a", 0.15, cache.generation)
+    assert cache.get("a") == 0.15
+    assert cache.stats()["invalidations"] == 1 and cache.generation == generation + 1
+
+
+def test_model_swap_invalidates_the_cache():
+    cache = PredictionCache()
+    registry = ModelRegistry(on_publish=cache.clear)
+    with contextlib.redirect_stdout(io.StringIO()):
+        registry.publish(build_snapshot({"model": make_bundle_model(n_estimators=5), "features": FEATURES}, "rf",
+                                        warm_up=False))
+        generation = cache.generation
+        cache.put("candidate", 0.8, generation)
+        registry.publish(build_snapshot({"model": make_bundle_model(n_estimators=6), "features": FEATURES,
+                                         "version": "2.0.0"}, "rf", warm_up=False))
+    assert cache.get("candidate") is None and cache.generation == generation + 1
+    # In-flight results of the replaced version are dropped
+    cache.put("candidate", 0.8, generation)
+    assert cache.get("candidate") is None
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the prediction cache...")
+    for test in [test_least_recently_used_entries_are_evicted,
+                 test_canonical_keys_match_missing_values,
+                 test_clear_drops_results_from_the_previous_generation,
+                 test_model_swap_invalidates_the_cache]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All prediction cache tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for production (pre-forked) serving in start_api.py
+
+Run with `python test_prefork.py` or `pytest test_prefork.py`. Linux/macOS only (uses fork).
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import joblib
+
+from synthetic_bundle import FEATURES, make_bundle_model
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_line(process, text, timeout=60):
+    deadline = time.monotonic() + timeout
+    lines = []
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if not line:
+            break
+        lines.append(line)
+        if text in line:
+            return lines
+    raise AssertionError(f"{text!r} not printed; output:\n{''.join(lines)}")
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.load(response)
+
+
+def test_workers_share_preloaded_model_and_roll_on_hup():
+    with tempfile.TemporaryDirectory() as directory:
+        bundle = os.path.join(directory, "best_koi_reduced_rf.joblib")
+        joblib.dump({"model": make_bundle_model(n_estimators=20), "threshold": 0.4, "features": FEATURES}, bundle)
+        port = free_port()
+        env = {**os.environ, "EXO_API_MODELS": f"rf={bundle}", "PYTHONUNBUFFERED": "1"}
+        process = subprocess.Popen([sys.executable, os.path.join(API_DIR, "start_api.py"), "--production",
+                                    "--host", "127.0.0.1", "--port", str(port), "--workers", "2",
+                                    "--log-level", "warning"],
+                                   env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            output = "".join(wait_for_line(process, "workers serving"))
+            assert output.count("loaded successfully") == 1  # once, in the supervisor
+
+            health = None
+            for _ in range(100):
+                try:
+                    health = get_json(f"http://127.0.0.1:{port}/health")
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            assert health is not None and health["model_loaded"]
+
+            process.send_signal(signal.SIGHUP)
+            wait_for_line(process, "Rolling restart complete")
+            assert get_json(f"http://127.0.0.1:{port}/health")["model_loaded"]
+
+            process.send_signal(signal.SIGTERM)
+            assert process.wait(timeout=30) == 0
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+if __name__ == "__main__":
+    print("🔍 Testing production pre-fork serving...")
+    for test in [test_workers_share_preloaded_model_and_roll_on_hup]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All pre-fork tests passed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for opt-in per-request profiling
+
+Run with `python test_profiling.py` or `pytest test_profiling.py`.
+"""
+
+import os
+import random
+import tempfile
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import ID_HEADER, RequestProfiler
+
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+
+def make_app(profiler):
+    app = FastAPI()
+
+    @app.post("/work")
+    @profiler.profiled("work")
+    async def work(request: Request, fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=404, detail="nope")
+        return {"result": busy(), "inline": profiling.active()}
+
+    return app
+
+
+def test_disabled_profiler_returns_the_endpoint_unchanged():
+    async def endpoint(request: Request):
+        return {}
+    assert RequestProfiler().profiled("x")(endpoint) is endpoint
+
+
+def test_profile_is_stored_or_returned_inline_on_request():
+    with tempfile.TemporaryDirectory() as directory:
+        client = TestClient(make_app(RequestProfiler(on_demand=True, directory=directory, keep=2)))
+
+        response = client.post("/work")
+        assert ID_HEADER not in response.headers and response.json()["inline"] is False
+
+        response = client.post("/work", headers={"X-Profile": "1"})
+        assert response.json() == {"result": busy(), "inline": True}
+        assert os.path.exists(os.path.join(directory, response.headers[ID_HEADER]))
+
+        response = client.post("/work?profile=inline")
+        body = response.json()
+        assert body["response"]["result"] == busy()
+        assert any("busy" in f["function"] for f in body["profile"]["functions"])
+        assert body["profile"]["id"] == response.headers[ID_HEADER]
+
+        # Errors keep their status and still get a profile
+        response = client.post("/work?fail=true", headers={"X-Profile": "1"})
+        assert response.status_code == 404 and ID_HEADER in response.headers
+
+        assert len(os.listdir(directory)) == 2  # oldest pruned
+
+
+def test_sampling_profiles_a_fraction_of_requests():
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = RequestProfiler(sample_rate=0.5, directory=directory, keep=1000, rng=random.Random(0))
+        client = TestClient(make_app(profiler))
+        profiled = sum(ID_HEADER in client.post("/work").headers for _ in range(40))
+        assert 10 <= profiled <= 30
+        # Without on-demand profiling the header is ignored
+        assert client.post("/work", headers={"X-Profile": "inline"}).json().keys() == {"result", "inline"}
+
+
+if __name__ == "__main__":
+    print("🔍 Testing request profiling...")
+    for test in [test_disabled_profiler_returns_the_endpoint_unchanged,
+                 test_profile_is_stored_or_returned_inline_on_request,
+                 test_sampling_profiles_a_fraction_of_requests]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All profiling tests passed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for /predict/stream: NDJSON and CSV bodies, per-line errors, chunking and the summary
+
+Run with `python test_streaming.py` or `pytest test_streaming.py`. The app runs
+in-process on a synthetic model bundle, so no server or model file is needed.
+"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from api_testing import isolated_api
+from streaming import detect_format, iter_line_chunks, parse_csv_header, parse_line
+from synthetic_bundle import FEATURES, make_bundle_model
+
+CANDIDATES = [
+    {"koi_period": 12.5, "koi_duration": 3.1, "koi_depth": 450.0, "koi_impact": 0.4},
+    {"koi_period": 3.2, "koi_duration": 1.5, "koi_depth": 30000.0, "koi_impact": 1.2, "koi_srho": 0.8},
+    {"koi_period": 250.0, "koi_duration": 6.0, "koi_depth": 120.0, "koi_incl": 89.9},
+]
+
+
+def stream(main, body: bytes, content_type: str, chunk_rows: int = 5000):
+    """POST a body to /predict/stream and return the response and its parsed NDJSON lines"""
+    main.STREAM_CHUNK_ROWS = chunk_rows
+    main.activate_model({"model": make_bundle_model(n_estimators=20), "threshold": 0.5, "features": FEATURES})
+    with TestClient(main.app) as client:
+        response = client.post("/predict/stream", content=body, headers={"Content-Type": content_type})
+        batch = client.post("/predict/batch", json={"candidates": CANDIDATES}).json()
+    return response, [json.loads(line) for line in response.text.splitlines()], batch["predictions"]
+
+
+def test_ndjson_stream_matches_the_batch_endpoint():
+    body = "".join(json.dumps(c) + "\n" for c in CANDIDATES).encode()
+    with isolated_api() as main:
+        response, lines, batch = stream(main, body, "application/x-ndjson")
+    assert response.status_code == 200 and response.headers["X-Model"] == "default@1.0.0"
+    assert lines[:-1] == batch
+    summary = lines[-1]["summary"]
+    assert summary["total_candidates"] == 3 and summary["invalid_candidates"] == 0
+    assert summary["predicted_planets"] == sum(p["prediction"] for p in batch)
+    # Every line, including the summary, is compact JSON
+    assert all(": " not in line and ", " not in line for line in response.text.splitlines())
+
+
+def test_csv_header_unknown_columns_and_line_errors():
+    rows = ["kepoi_name,koi_period,koi_duration,koi_depth,koi_impact,koi_srho,koi_incl",
+            "K1,12.5,3.1,450.0,0.4,,",
+            "K2,-1,3.1,450.0,,,",  # invalid period
+            "K3,3.2,1.5,30000.0,1.2,0.8,",
+            "K4,3.2,1.5",  # wrong field count
+            "K5,250.0,6.0,120.0,,,89.9"]
+    body = ("\ufeff" + "\r\n".join(rows) + "\r\n").encode()
+    with isolated_api() as main:
+        response, lines, batch = stream(main, body, "text/csv")
+    assert response.status_code == 200
+    assert [line.get("candidate_id") for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    assert [lines[i] for i in (0, 2, 4)] == [dict(p, candidate_id=i) for i, p in zip((0, 2, 4), batch)]
+    assert "koi_period" in lines[1]["error"] and "Expected 7 CSV fields, got 3" in lines[3]["error"]
+    summary = lines[-1]["summary"]
+    assert summary["total_candidates"] == 3 and summary["invalid_candidates"] == 2
+
+
+def test_chunks_keep_ids_and_order():
+    candidates = [dict(CANDIDATES[i % 3], koi_period=1.0 + i) for i in range(7)]
+    lines_in = [json.dumps(c) for c in candidates]
+    lines_in[4] = "[1, 2]"  # not an object; falls inside the second chunk
+    body = ("\n".join(lines_in) + "\n\n").encode()
+    with isolated_api() as main:
+        _, chunked, _ = stream(main, body, "application/x-ndjson", chunk_rows=3)
+        _, whole, _ = stream(main, body, "application/x-ndjson")
+    assert chunked == whole
+    assert [line.get("candidate_id") for line in chunked[:-1]] == list(range(7))
+    assert "error" in chunked[4] and chunked[-1]["summary"]["total_candidates"] == 6
+
+
+def test_stream_helpers():
+    async def collect(parts, chunk_rows):
+        async def body():
+            for part in parts:
+                yield part
+        return [chunk async for chunk in iter_line_chunks(body(), chunk_rows)]
+
+    # Lines split across body messages are reassembled; blank lines are skipped
+    chunks = asyncio.run(collect([b'{"a":', b' 1}\n\n{"b"', b': 2}\n{"c": 3}'], 2))
+    assert chunks == [[b'{"a": 1}', b'{"b": 2}'], [b'{"c": 3}']]
+    assert detect_format(None, "text/csv; charset=utf-8") == "csv" and detect_format("NDJSON", "text/csv") == "ndjson"
+    header = parse_csv_header(b"\xef\xbb\xbfkoi_period, koi_depth\r")
+    assert header == ["koi_period", "koi_depth"]
+    assert parse_line(b"5.0, ", "csv", header) == {"koi_period": "5.0", "koi_depth": None}
+    for bad in [lambda: detect_format("xml", None), lambda: parse_line(b"[1]", "ndjson")]:
+        try:
+            bad()
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    print("🔍 Testing streaming predictions...")
+    for test in [test_ndjson_stream_matches_the_batch_endpoint,
+                 test_csv_header_unknown_columns_and_line_errors,
+                 test_chunks_keep_ids_and_order,
+                 test_stream_helpers]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All streaming tests passed!")
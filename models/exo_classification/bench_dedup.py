@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark ephemeris de-dup: the notebook's per-star loop vs the sort-based version
+
+Catalogs are synthetic and KOI-shaped: 1-7 candidates per star, with about
+a quarter of them re-detections of another candidate's ephemeris. The loop
+is only timed up to --reference-max rows, and its output is checked against
+the vectorized result at those sizes.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from dedup import dedup_by_ephemeris, dedup_by_ephemeris_reference
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    per_star = rng.integers(1, 8, n)
+    kepid = np.repeat(np.arange(n), per_star)[:n] + 757_000
+    period = rng.lognormal(np.log(12.0), 1.3, n)
+    duration = rng.lognormal(np.log(3.5), 0.5, n)
+    same_star = np.r_[False, kepid[1:] == kepid[:-1]]
+    redetected = np.flatnonzero(same_star & (rng.random(n) < 0.25))
+    period[redetected] = period[redetected - 1] * (1 + rng.normal(0, 3e-5, len(redetected)))
+    duration[redetected] = duration[redetected - 1] * (1 + rng.normal(0, 0.005, len(redetected)))
+    return pd.DataFrame({
+        "kepid": kepid,
+        "koi_disposition": rng.choice(["CONFIRMED", "FALSE POSITIVE"], n, p=[0.4, 0.6]),
+        "koi_period": period,
+        "koi_duration": duration,
+        "koi_model_snr": rng.lognormal(np.log(25.0), 1.0, n).round(1),
+        "koi_vet_date": rng.choice(["2015-09-24", "2016-05-10", "2018-08-16"], n),
+    })
+
+
+def best_of(fn, repeats):
+    timings, result = [], None
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ephemeris de-duplication")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Catalog rows")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--reference-max", type=int, default=10_000,
+                        help="Largest catalog to run the notebook loop on")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        df = synthetic_catalog(n)
+        print(f"\n🔍 {n} rows, {df['kepid'].nunique()} stars")
+        fast, kept = best_of(lambda: dedup_by_ephemeris(df), args.repeats)
+        if n <= args.reference_max:
+            loop, expected = best_of(lambda: dedup_by_ephemeris_reference(df), 1)
+            pd.testing.assert_frame_equal(kept, expected)
+            print(f"  {'per-star loop':<20s} {loop:10.1f} ms")
+            print(f"  {'sort-based':<20s} {fast:10.1f} ms   ({loop / fast:.0f}x, identical output)")
+        else:
+            print(f"  {'sort-based':<20s} {fast:10.1f} ms")
+        print(f"  kept {len(kept)} of {n}")
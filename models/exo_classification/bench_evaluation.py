@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark holdout evaluation: the notebook's separate sklearn metric calls vs evaluation.py
+
+The notebook computes each metric, the confusion matrix and both curves
+with its own sklearn call. The engine sorts once and derives all of them
+from per-threshold counts. The bootstrap column is the time per replicate
+on one worker.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics import (accuracy_score, average_precision_score, confusion_matrix, f1_score,
+                             precision_recall_curve, precision_score, recall_score, roc_auc_score, roc_curve)
+
+from evaluation import evaluate_scores
+
+
+def sklearn_report(y, proba, threshold=0.5):
+    """The notebook's evaluation cells"""
+    pred = (proba >= threshold).astype(int)
+    return {
+        "accuracy": accuracy_score(y, pred),
+        "precision": precision_score(y, pred, zero_division=0),
+        "recall": recall_score(y, pred, zero_division=0),
+        "f1": f1_score(y, pred, zero_division=0),
+        "roc_auc": roc_auc_score(y, proba),
+        "average_precision": average_precision_score(y, proba),
+        "confusion": confusion_matrix(y, pred, labels=[0, 1]).tolist(),
+        "roc": roc_curve(y, proba),
+        "pr": precision_recall_curve(y, proba),
+    }
+
+
+def best_of(fn, repeats):
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark holdout evaluation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Holdout rows")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--bootstrap", type=int, default=20, help="Replicates timed for the bootstrap column")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        y = (rng.random(n) < 0.4).astype(int)
+        proba = np.clip(rng.normal(0.35 + 0.3 * y, 0.2), 0, 1)
+        sk_ms, expected = best_of(lambda: sklearn_report(y, proba), args.repeats)
+        engine_ms, report = best_of(lambda: evaluate_scores(y, proba, n_bootstrap=0), args.repeats)
+        worst = max(abs(report["metrics"][name]["value"] - expected[name]) for name in report["metrics"])
+        boot_ms, _ = best_of(lambda: evaluate_scores(y, proba, n_bootstrap=args.bootstrap, n_jobs=1), 1)
+        print(f"\n🔍 {n} rows")
+        print(f"  {'sklearn calls':<22s} {sk_ms:9.1f} ms")
+        print(f"  {'single pass':<22s} {engine_ms:9.1f} ms   ({sk_ms / engine_ms:.1f}x, max diff {worst:.1e})")
+        print(f"  {'bootstrap':<22s} {(boot_ms - engine_ms) / args.bootstrap:9.1f} ms per replicate")
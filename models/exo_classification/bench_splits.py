@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark star-level train/test splitting: rejection sampling vs single-pass assignment
+
+The notebook drew GroupShuffleSplits until the test positive rate was
+within `tol` of the overall rate (up to 500 tries). Its runtime grows as
+the tolerance tightens, and it falls back to an unstratified split when no
+draw qualifies. The single-pass assignment takes the same time whatever
+the tolerance would have been.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import GroupShuffleSplit
+
+from splits import stratified_group_split
+
+
+def rejection_split(df_in, feature_cols, test_size=0.20, max_tries=500, tol=0.02, seed=42):
+    """The notebook's stratified_group_split; also returns the number of draws"""
+    df2 = df_in.dropna(subset=list(feature_cols), how="all").copy()
+    X, y, g = df2[list(feature_cols)].copy(), df2["label"].values, df2["kepid"].values
+    overall_pos = y.mean()
+    rng = np.random.RandomState(seed)
+    for tries in range(1, max_tries + 1):
+        rs = int(rng.randint(0, 10_000))
+        tr_idx, te_idx = next(GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=rs).split(X, y, g))
+        if abs(y[te_idx].mean() - overall_pos) <= tol:
+            return tr_idx, te_idx, y, tries
+    print("Note: used first group split (strat tol not met).")
+    tr_idx, te_idx = next(GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=seed).split(X, y, g))
+    return tr_idx, te_idx, y, max_tries
+
+
+def catalog(n, seed=0):
+    rng = np.random.default_rng(seed)
+    stars = np.repeat(np.arange(n), rng.integers(1, 8, n))[:n]
+    label = (rng.random(n) < rng.beta(0.5, 0.8, n)[stars]).astype(int)
+    return pd.DataFrame({"kepid": stars, "koi_period": rng.random(n), "label": label})
+
+
+def describe(tr_idx, te_idx, y):
+    return f"test {len(te_idx) / (len(tr_idx) + len(te_idx)):.4f} of rows, positive-rate gap " \
+           f"{abs(y[te_idx].mean() - y.mean()):.5f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark stratified group splits")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Catalog rows")
+    parser.add_argument("--tolerances", type=float, nargs="+", default=[0.02, 0.002, 0.0002],
+                        help="Positive-rate tolerances for rejection sampling")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        df = catalog(n)
+        print(f"\n🔍 {n} rows, {df['kepid'].nunique()} stars")
+        for tol in args.tolerances:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                tr_idx, te_idx, y, tries = rejection_split(df, ["koi_period"], tol=tol)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            note = ", fell back to unstratified" if "Note" in out.getvalue() else ""
+            print(f"  {f'rejection, tol={tol:g}':<26s} {elapsed:9.1f} ms  {tries:3d} draws{note}; "
+                  f"{describe(tr_idx, te_idx, y)}")
+        start = time.perf_counter()
+        tr_idx, te_idx, _, _, y, _ = stratified_group_split(df, ["koi_period"])
+        elapsed = (time.perf_counter() - start) * 1000.0
+        print(f"  {'single pass':<26s} {elapsed:9.1f} ms             {describe(tr_idx, te_idx, y)}")
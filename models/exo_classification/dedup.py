@@ -0,0 +1,184 @@
+"""
+Ephemeris de-duplication of KOI / TOI catalogs
+
+Within a star, candidates whose orbital period and transit duration agree
+within relative tolerances are the same signal found more than once. One
+is kept per bucket, by priority: best disposition (CONFIRMED, then FALSE
+POSITIVE), then highest model SNR, then earliest vetting date. Ties keep
+the catalog order.
+
+`dedup_by_ephemeris` reproduces the notebook's per-star double loop
+(`dedup_by_ephemeris_reference`) exactly, including its greedy, keeper-
+anchored bucketing and `np.isclose` tolerance semantics. It does not
+compare every pair of candidates in a star:
+
+1. Sort all rows once by (star, period). Near-duplicates are then
+   neighbours, and comparing each row with the next k rows only while any
+   pair is still within the period window finds every candidate pair.
+2. Apply the exact tolerance test to all candidate pairs at once, oriented
+   from the higher-priority row to the lower-priority one.
+3. Resolve the greedy choice in vectorized rounds. A row is dropped if a
+   kept higher-priority row matches it, and kept once every row that
+   matches it has been dropped.
+
+The cost is O(n log n) plus the number of near-duplicate pairs.
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+DISPOSITION_RANK = {"CONFIRMED": 2, "FALSE POSITIVE": 1}
+REQUIRED_COLUMNS = ["kepid", "koi_period", "koi_duration"]
+ATOL = 1e-8  # np.isclose default, part of the reference semantics
+
+
+def _check_columns(df: pd.DataFrame):
+    for c in REQUIRED_COLUMNS:
+        if c not in df.columns:
+            raise ValueError(f"Missing {c} for de-dup")
+
+
+def priority_order(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row positions sorted by star, then by keep priority, and the star code of each row
+
+    Rows without a star id get code -1 and are left out of the order, as the
+    reference's groupby drops them.
+    """
+    n = len(df)
+    star, _ = pd.factorize(df["kepid"], sort=True)
+    disp = df["koi_disposition"].map(DISPOSITION_RANK).fillna(0).to_numpy(dtype=np.float64) \
+        if "koi_disposition" in df else np.zeros(n)
+    snr = df["koi_model_snr"].fillna(-1).to_numpy(dtype=np.float64) if "koi_model_snr" in df else np.full(n, -1.0)
+    vet = pd.to_datetime(df["koi_vet_date"], errors="coerce") if "koi_vet_date" in df \
+        else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    # Unknown vetting dates sort last, as sort_values(na_position="last") does
+    vet_key = np.where(vet.isna().to_numpy(), np.iinfo(np.int64).max,
+                       vet.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    # lexsort is stable and sorts by the last key first
+    order = np.lexsort((np.arange(n), vet_key, -snr, -disp, star))
+    return order[star[order] >= 0], star
+
+
+def candidate_pairs(star: np.ndarray, period: np.ndarray, tol_period_rel: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All same-star row pairs whose periods may pass the tolerance test (a superset)
+
+    With rows sorted by period inside each star, the period gap to the k-th
+    next row only grows with k, so the scan stops at the first offset where
+    no row is still within its star's widest window.
+    """
+    valid = star >= 0
+    rows = np.flatnonzero(valid)
+    by_period = rows[np.lexsort((period[rows], star[rows]))]  # NaN periods sort last in each star
+    s, p = star[by_period], period[by_period]
+    finite = np.isfinite(p)
+    # Widest window any pair in the star can need: atol + rtol * max |period|
+    scale = np.zeros(star.max() + 1 if len(rows) else 0)
+    np.maximum.at(scale, s[finite], np.abs(p[finite]))
+    window = ATOL + abs(tol_period_rel) * scale[s]
+
+    first, second = [], []
+    active = np.arange(len(by_period))
+    k = 1
+    while len(active):
+        active = active[active + k < len(by_period)]
+        other = active + k
+        with np.errstate(invalid="ignore"):
+            near = (s[active] == s[other]) & ((p[other] - p[active] <= window[active]) | (p[other] == p[active]))
+        active = active[near]
+        first.append(by_period[active])
+        second.append(by_period[active + k])
+        k += 1
+    if not first:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def resolve_greedy(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Keep mask for the greedy pass over rows in priority order
+
+    `src -> dst` means the higher-priority row `src` absorbs `dst` if it is
+    kept. A row is kept exactly when no kept row absorbs it.
+    """
+    state = np.zeros(n, dtype=np.int8)  # 0 undecided, 1 kept, -1 dropped
+    has_source = np.zeros(n, dtype=bool)
+    has_source[dst] = True
+    state[~has_source] = 1
+    while len(src):
+        dropped = np.zeros(n, dtype=bool)
+        dropped[dst[state[src] == 1]] = True
+        state[dropped & (state == 0)] = -1
+        # Edges from dropped rows no longer matter; rows left without live edges are kept
+        live = state[src] != -1
+        src, dst = src[live], dst[live]
+        pending = np.zeros(n, dtype=bool)
+        pending[dst] = True
+        state[(state == 0) & ~pending] = 1
+        live = state[dst] == 0
+        src, dst = src[live], dst[live]
+    return state == 1
+
+
+def dedup_by_ephemeris(df_in: pd.DataFrame, tol_period_rel: float = 1e-4,
+                       tol_duration_rel: float = 0.02, verbose: bool = True) -> pd.DataFrame:
+    """Keep one candidate per star and (period, duration) bucket; same rows, order and index as the reference"""
+    _check_columns(df_in)
+    work = df_in.reset_index(drop=True)
+    n = len(work)
+    order, star = priority_order(work)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    period = pd.to_numeric(work["koi_period"], errors="coerce").to_numpy(dtype=np.float64)
+    duration = pd.to_numeric(work["koi_duration"], errors="coerce").to_numpy(dtype=np.float64)
+    a, b = candidate_pairs(star, period, tol_period_rel)
+    src = np.where(rank[a] < rank[b], a, b)
+    dst = np.where(rank[a] < rank[b], b, a)
+    # Exact reference test: np.isclose(keeper, other) is not symmetric
+    match = np.isclose(period[src], period[dst], rtol=tol_period_rel) & \
+        np.isclose(duration[src], duration[dst], rtol=tol_duration_rel)
+
+    keep = resolve_greedy(n, src[match], dst[match])
+    cleaned = work.iloc[order[keep[order]]]
+    if verbose:
+        print(f"De-dup: {len(df_in)} ➜ {len(cleaned)}")
+    return cleaned
+
+
+def dedup_by_ephemeris_reference(df_in: pd.DataFrame, tol_period_rel: float = 1e-4,
+                                 tol_duration_rel: float = 0.02) -> pd.DataFrame:
+    """The notebook's original O(n²)-per-star loop, kept to test and benchmark against"""
+    _check_columns(df_in)
+
+    work = df_in.copy().reset_index(drop=True)
+    work["_snr_rank"] = work["koi_model_snr"].fillna(-1) if "koi_model_snr" in work else -1
+    work["_vet"] = pd.to_datetime(work["koi_vet_date"] if "koi_vet_date" in work else pd.NaT, errors="coerce")
+    work["_disp_rank"] = work["koi_disposition"].map(DISPOSITION_RANK).fillna(0)
+
+    keep_idx = []
+    for star, grp in work.groupby("kepid"):
+        g = grp.sort_values(by=["_disp_rank", "_snr_rank", "_vet"], ascending=[False, False, True]).copy()
+        used = np.zeros(len(g), dtype=bool)
+        g = g.reset_index()
+
+        for i in range(len(g)):
+            if used[i]:
+                continue
+            pi, di = g.loc[i, "koi_period"], g.loc[i, "koi_duration"]
+            bucket = [i]
+            for j in range(i + 1, len(g)):
+                if used[j]:
+                    continue
+                pj, dj = g.loc[j, "koi_period"], g.loc[j, "koi_duration"]
+                if np.isclose(pi, pj, rtol=tol_period_rel) and np.isclose(di, dj, rtol=tol_duration_rel):
+                    bucket.append(j)
+            keep_idx.append(int(g.loc[bucket[0], "index"]))
+            used[bucket] = True
+
+    cleaned = work.loc[keep_idx].drop(columns=["_snr_rank", "_vet", "_disp_rank"])
+    print(f"De-dup: {len(df_in)} ➜ {len(cleaned)}")
+    return cleaned
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Evaluation metrics from one sorted pass, with parallel bootstrap confidence intervals
+
+The notebook's evaluation cells call accuracy_score, precision_score,
+recall_score, f1_score, roc_auc_score, average_precision_score,
+confusion_matrix, roc_curve and precision_recall_curve separately, and each
+makes its own pass over the holdout. Here the probabilities are sorted once.
+The tied-probability groups, together with their positive and negative
+counts, then give everything:
+
+- ROC and PR curves: cumulative TP/FP counts at every distinct threshold.
+- ROC-AUC: the trapezoidal area under that curve. AP: the step sum
+  sum((R_n - R_{n-1}) P_n). Both match sklearn.
+- Accuracy, precision, recall, F1 and the confusion matrix: the counts at
+  the decision threshold.
+
+A bootstrap replicate resamples rows with replacement. That only changes how
+many times each row counts, not the sort order. A replicate is therefore
+one `bincount` of the resampled (group, label) cells plus cumulative sums
+over the groups, without another sort. Replicates are spread across a
+process pool. Each replicate has its own seed, so the intervals do not
+depend on the number of workers.
+
+    python evaluation.py --bundle models/best_koi_reduced_rf.joblib --csv TOI.csv --output toi_report.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+METRICS = ("accuracy", "precision", "recall", "f1", "roc_auc", "average_precision")
+
+
+class SortedScores:
+    """Holdout rows sorted once by descending probability and grouped by tied probability"""
+
+    def __init__(self, y_true, proba):
+        y = np.asarray(y_true)
+        p = np.asarray(proba, dtype=np.float64)
+        if y.shape != p.shape or y.ndim != 1:
+            raise ValueError("y_true and proba must be 1-D arrays of the same length")
+        if not np.isfinite(p).all():
+            raise ValueError("proba contains NaN or infinite values")
+        if not np.isin(y, (0, 1)).all():
+            raise ValueError("y_true must contain only 0 and 1")
+        order = np.argsort(-p, kind="stable")
+        p_sorted = p[order]
+        y_sorted = y[order].astype(np.int64)
+        starts = np.r_[True, p_sorted[1:] != p_sorted[:-1]] if len(p) else np.zeros(0, dtype=bool)
+        group = np.cumsum(starts) - 1
+        self.n = len(p)
+        self.thresholds = p_sorted[starts]  # descending
+        # Resampling unit: a row's (group, label) cell, negatives in [0, G) and positives in [G, 2G)
+        self.cells = group + y_sorted * len(self.thresholds)
+        self.negatives, self.positives = split_cells(np.bincount(self.cells, minlength=2 * len(self.thresholds)))
+
+    def cut(self, threshold: float) -> int:
+        """Number of groups predicted positive by `proba >= threshold`"""
+        return int(np.searchsorted(-self.thresholds, -threshold, side="right"))
+
+    def confusion(self, threshold: float):
+        """[[tn, fp], [fn, tp]] of `proba >= threshold`, like sklearn's confusion_matrix"""
+        cut = self.cut(threshold)
+        tp, fp = int(self.positives[:cut].sum()), int(self.negatives[:cut].sum())
+        return [[int(self.negatives.sum()) - fp, fp], [int(self.positives.sum()) - tp, tp]]
+
+
+def split_cells(counts: np.ndarray):
+    """(negatives, positives) per group from cell counts"""
+    half = len(counts) // 2
+    return counts[:half], counts[half:]
+
+
+def metrics_from_counts(negatives: np.ndarray, positives: np.ndarray, cut: int) -> Dict[str, float]:
+    """All METRICS from per-group label counts (descending threshold order) and the decision cut"""
+    tp, fp = np.cumsum(positives), np.cumsum(negatives)
+    n_pos = int(tp[-1]) if len(tp) else 0
+    n_neg = int(fp[-1]) if len(fp) else 0
+    tp_at, fp_at = (int(tp[cut - 1]), int(fp[cut - 1])) if cut else (0, 0)
+    fn_at, tn_at = n_pos - tp_at, n_neg - fp_at
+    total = n_pos + n_neg
+    result = {
+        "accuracy": (tp_at + tn_at) / total if total else float("nan"),
+        "precision": tp_at / (tp_at + fp_at) if tp_at + fp_at else 0.0,
+        "recall": tp_at / n_pos if n_pos else 0.0,
+        "f1": 2 * tp_at / (2 * tp_at + fp_at + fn_at) if tp_at + fp_at + fn_at else 0.0,
+        "roc_auc": float("nan"),
+        "average_precision": float("nan"),
+    }
+    if n_pos and n_neg:
+        # Trapezoids of the ROC curve: each group's negatives times the mean TPR before and after it
+        result["roc_auc"] = float(np.dot(negatives, (2 * tp - positives).astype(np.float64)) / (2 * n_pos * n_neg))
+        # sum((R_n - R_{n-1}) P_n): groups without positives add no recall, and the others have tp + fp >= 1
+        precision = tp / np.maximum(tp + fp, 1)
+        result["average_precision"] = float(np.dot(positives, precision) / n_pos)
+    return result
+
+
+def _bootstrap(cells: np.ndarray, n_groups: int, cut: int, seeds: Sequence[np.random.SeedSequence]) -> np.ndarray:
+    """(len(seeds), len(METRICS)) metric values, one row per resample"""
+    out = np.empty((len(seeds), len(METRICS)))
+    n = len(cells)
+    index_type = np.int32 if n < 2 ** 31 else np.int64
+    for r, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        counts = np.bincount(cells[rng.integers(0, n, n, dtype=index_type)], minlength=2 * n_groups)
+        values = metrics_from_counts(*split_cells(counts), cut)
+        out[r] = [values[name] for name in METRICS]
+    return out
+
+
+def bootstrap_metrics(scores: SortedScores, threshold: float, n_bootstrap: int = 1000, seed: int = 0,
+                      n_jobs: Optional[int] = -1) -> np.ndarray:
+    """Metric values of `n_bootstrap` resamples, computed in a process pool"""
+    import joblib
+
+    from orchestrator import cpu_budget
+
+    seeds = np.random.SeedSequence(seed).spawn(n_bootstrap)
+    workers = min(cpu_budget(n_jobs), max(1, n_bootstrap))
+    chunks = [chunk for chunk in np.array_split(np.arange(n_bootstrap), workers) if len(chunk)]
+    parts = joblib.Parallel(n_jobs=workers)(
+        joblib.delayed(_bootstrap)(scores.cells, len(scores.thresholds), scores.cut(threshold),
+                                   [seeds[i] for i in chunk]) for chunk in chunks)
+    return np.concatenate(parts) if parts else np.empty((0, len(METRICS)))
+
+
+def _curve_points(n: int, points: int) -> np.ndarray:
+    """At most `points` indices spread evenly over 0..n-1, both ends included"""
+    return np.unique(np.linspace(0, n - 1, min(n, points)).round().astype(int)) if n else np.zeros(0, dtype=int)
+
+
+def evaluate_scores(y_true, proba, threshold: float = 0.5, n_bootstrap: int = 1000, confidence: float = 0.95,
+                    seed: int = 0, n_jobs: Optional[int] = -1, curve_points: int = 200) -> Dict[str, Any]:
+    """
+    Point estimates, bootstrap intervals, confusion matrix and curves as a JSON-ready dict
+
+    Intervals are percentile intervals at `confidence`. Resamples without both
+    classes leave ROC-AUC and AP undefined and are skipped for those metrics.
+    `n_bootstrap=0` skips the intervals.
+    """
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f"confidence must be within (0, 1), got {confidence}")
+    scores = SortedScores(y_true, proba)
+    cut = scores.cut(threshold)
+    point = metrics_from_counts(scores.negatives, scores.positives, cut)
+    tp, fp = np.cumsum(scores.positives), np.cumsum(scores.negatives)
+    n_pos, n_neg = int(scores.positives.sum()), int(scores.negatives.sum())
+
+    metrics: Dict[str, Dict[str, Optional[float]]] = {name: {"value": point[name]} for name in METRICS}
+    if n_bootstrap:
+        samples = bootstrap_metrics(scores, threshold, n_bootstrap, seed, n_jobs)
+        tail = (1.0 - confidence) / 2 * 100
+        for j, name in enumerate(METRICS):
+            valid = samples[:, j][~np.isnan(samples[:, j])]
+            low, high = np.percentile(valid, [tail, 100 - tail]) if len(valid) else (np.nan, np.nan)
+            metrics[name].update(ci_low=float(low), ci_high=float(high), std=float(valid.std()) if len(valid) else None)
+
+    keep = _curve_points(len(scores.thresholds), curve_points)
+    precision = np.divide(tp, tp + fp, out=np.ones(len(tp)), where=(tp + fp) > 0)
+    report = {
+        "rows": scores.n,
+        "positives": n_pos,
+        "negatives": n_neg,
+        "threshold": float(threshold),
+        "metrics": metrics,
+        "confusion": scores.confusion(threshold),  # [[tn, fp], [fn, tp]]
+        "bootstrap": {"replicates": n_bootstrap, "confidence": confidence, "seed": seed},
+        "curves": {
+            "thresholds": scores.thresholds[keep].tolist(),
+            "fpr": (fp[keep] / n_neg if n_neg else np.zeros(len(keep))).tolist(),
+            "tpr": (tp[keep] / n_pos if n_pos else np.zeros(len(keep))).tolist(),
+            "precision": precision[keep].tolist(),
+        },
+    }
+    return _json_safe(report)
+
+
+def _json_safe(value):
+    """NaN (undefined metrics) as null, so the report is strict JSON"""
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def markdown_table(report: Dict[str, Any]) -> str:
+    """The README's metric table, with confidence intervals when the report has them"""
+    names = {"accuracy": "Accuracy", "precision": "Precision (Planet)", "recall": "Recall (Planet)",
+             "f1": "F1 (Planet)", "roc_auc": "ROC-AUC", "average_precision": "PR-AUC (AP)"}
+    level = f"{report['bootstrap']['confidence']:.0%} CI"
+    with_ci = report["bootstrap"]["replicates"] > 0
+    lines = ["| Metric | Value |" + (f" {level} |" if with_ci else ""),
+             "|--------|-------|" + ("--------|" if with_ci else "")]
+    for name, label in names.items():
+        m = report["metrics"][name]
+        value = "n/a" if m["value"] is None else f"{m['value']:.4f}"
+        interval = ""
+        if with_ci:
+            interval = " n/a |" if m.get("ci_low") is None else f" {m['ci_low']:.4f} – {m['ci_high']:.4f} |"
+        lines.append(f"| {label} | {value} |{interval}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    import joblib
+
+    from ingest import fingerprint
+    from thresholds import labelled_rows
+
+    parser = argparse.ArgumentParser(description="Evaluate a model bundle on a labelled holdout")
+    parser.add_argument("--bundle", required=True, help="Model bundle (.joblib)")
+    parser.add_argument("--csv", required=True,
+                        help="Labelled rows: a 0/1 `label` column, KOI dispositions or TOI dispositions (CP/FP)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples (0: no intervals)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Interval confidence level")
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap seed")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Bootstrap worker processes (-1: every core)")
+    parser.add_argument("--threshold", type=float, help="Decision threshold (default: the bundle's)")
+    parser.add_argument("--cache-dir", default=".ingest_cache", help="Parsed-catalog cache (see ingest.py)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not cache the parsed CSV")
+    args = parser.parse_args(argv)
+
+    bundle = joblib.load(args.bundle)
+    if not isinstance(bundle, dict) or "model" not in bundle:
+        print("❌ Expected a bundle dict with a model")
+        return 1
+    features = bundle.get("features") or ["koi_period", "koi_duration", "koi_depth",
+                                          "koi_impact", "koi_srho", "koi_incl"]
+    cache_dir = None if args.no_cache else args.cache_dir
+    X, y = labelled_rows(args.csv, features, cache_dir=cache_dir)
+    if len(np.unique(y)) < 2:
+        print(f"❌ Need both classes among the labelled rows, got {len(y)} rows of one class")
+        return 1
+    threshold = args.threshold if args.threshold is not None else float(bundle.get("threshold", 0.5))
+    report = evaluate_scores(y, bundle["model"].predict_proba(X)[:, 1], threshold, args.bootstrap,
+                             args.confidence, args.seed, args.n_jobs)
+    report["bundle"] = {"path": args.bundle, "version": bundle.get("version"), "features": list(features)}
+    report["data"] = {"path": args.csv, "sha256": fingerprint(args.csv, cache_dir)}
+
+    print(f"📊 {report['rows']} labelled rows ({report['positives']} planets), threshold {threshold:.4f}")
+    print(markdown_table(report))
+    tn_fp, fn_tp = report["confusion"]
+    print(f"Confusion [tn fp; fn tp]: {tn_fp} {fn_tp}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Single-pass, column-pruned catalog ingestion with a Parquet cache
+
+`read_catalog` replaces both the plain `pd.read_csv` of the KOI table and the
+notebook's `load_csv_robust` for TOI exports. That function re-read the file
+with up to six strategies, and one of them silently dropped every 100th row.
+Here the file is read from disk once:
+
+1. The first 64 KB are sniffed for the encoding (UTF-8, else Latin-1), the
+   leading `#` comment lines of NASA Exoplanet Archive exports and the
+   delimiter (`,`, tab, `;` or `|`), and the header gives the column names.
+2. The bytes are parsed by pyarrow's multithreaded CSV reader, which keeps
+   only the requested columns and converts them to explicit dtypes.
+3. The result is stored as Parquet, keyed by the SHA-256 of the file and by
+   the requested columns. When the file's size and mtime are unchanged, the
+   hash is taken from the cache index without reading the file, so later
+   runs load only the Parquet file.
+
+Rows with the wrong number of fields are skipped but always reported: a
+warning is printed on every load, including cached ones, and the rows are
+listed in `Catalog.bad_lines`. With `on_bad_lines="error"` they raise instead.
+Values that do not parse as their column's type become missing and are
+counted in `Catalog.bad_values`.
+"""
+
+import codecs
+import csv
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = ",\t;|"
+MAX_REPORTED = 20  # bad lines kept with their text; the rest are only counted
+# Cells Arrow reads as missing in a numeric column (empty, "NA", "NaN", ...); not counted as bad values
+NULL_VALUES = frozenset(pacsv.ConvertOptions().null_values)
+INDEX_DIR = "index"
+
+# Columns the training and evaluation code reads, with their dtypes
+KOI_COLUMNS: Dict[str, pa.DataType] = {
+    "kepid": pa.int64(),
+    "kepoi_name": pa.string(),
+    "koi_disposition": pa.string(),
+    "koi_vet_date": pa.string(),
+    "koi_period": pa.float64(),
+    "koi_duration": pa.float64(),
+    "koi_depth": pa.float64(),
+    "koi_model_snr": pa.float64(),
+    "koi_impact": pa.float64(),
+    "koi_srho": pa.float64(),
+    "koi_incl": pa.float64(),
+    "koi_num_transits": pa.float64(),
+}
+TOI_COLUMNS: Dict[str, pa.DataType] = {
+    "toi": pa.float64(),
+    "tid": pa.int64(),
+    "toipfx": pa.int64(),
+    "tfopwg_disp": pa.string(),
+    "pl_orbper": pa.float64(),
+    "pl_trandurh": pa.float64(),
+    "pl_trandep": pa.float64(),
+}
+# TOI columns standing in for KOI features (same units), as in the notebook's TOI evaluation
+TOI_FEATURES = {"koi_period": "pl_orbper", "koi_duration": "pl_trandurh", "koi_depth": "pl_trandep"}
+
+
+@dataclass(frozen=True)
+class Dialect:
+    encoding: str
+    delimiter: str
+    skip_rows: int  # comment lines before the header
+    header: List[str]
+
+
+@dataclass
+class BadLine:
+    line: Optional[int]  # 1-based line in the file, None if it could not be located
+    expected_fields: int
+    actual_fields: int
+    text: str
+
+
+@dataclass
+class Catalog:
+    frame: pd.DataFrame
+    sha256: str
+    dialect: Dialect
+    bad_lines: List[BadLine] = field(default_factory=list)
+    bad_line_count: int = 0
+    bad_values: Dict[str, int] = field(default_factory=dict)  # column -> values that did not parse
+    from_cache: bool = False
+
+
+def sniff(head: bytes) -> Dialect:
+    """Encoding, comment lines, delimiter and header from the start of a file"""
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            head.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the sample is still UTF-8
+            encoding = "utf-8" if e.start >= len(head) - 3 else "latin-1"
+    text = head.decode(encoding, errors="ignore")
+    lines = text.splitlines()
+    if len(head) == SNIFF_BYTES and lines:
+        lines = lines[:-1] or lines  # last line may be cut off
+    skip_rows = 0
+    while skip_rows < len(lines) and (lines[skip_rows].startswith("#") or not lines[skip_rows].strip()):
+        skip_rows += 1
+    if skip_rows == len(lines):
+        raise ValueError("No header line found")
+    sample = "\n".join(lines[skip_rows:skip_rows + 50])
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    header = next(csv.reader([lines[skip_rows]], delimiter=delimiter))
+    return Dialect(encoding=encoding, delimiter=delimiter, skip_rows=skip_rows,
+                   header=[name.strip() for name in header])
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _columns_spec(columns: Mapping[str, pa.DataType]) -> Dict[str, str]:
+    return {name: str(dtype) for name, dtype in columns.items()}
+
+
+class _Index:
+    """path -> (size, mtime, sha256), so unchanged files are not re-hashed"""
+
+    def __init__(self, cache_dir: str):
+        self.directory = os.path.join(cache_dir, INDEX_DIR)
+
+    def _path(self, path: str) -> str:
+        return os.path.join(self.directory, _key(os.path.abspath(path)) + ".json")
+
+    def lookup(self, path: str, stat: os.stat_result) -> Optional[str]:
+        try:
+            with open(self._path(path)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry.get("sha256")
+        return None
+
+    def store(self, path: str, stat: os.stat_result, sha256: str):
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json(self._path(path), {"path": os.path.abspath(path), "size": stat.st_size,
+                                       "mtime_ns": stat.st_mtime_ns, "sha256": sha256})
+
+
+def _write_json(path: str, payload):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def fingerprint(path: str, cache_dir: Optional[str] = ".ingest_cache") -> str:
+    """SHA-256 of a file, from the cache index when its size and mtime are unchanged"""
+    stat = os.stat(path)
+    index = _Index(cache_dir) if cache_dir else None
+    sha256 = index.lookup(path, stat) if index else None
+    if sha256 is None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        if index:
+            index.store(path, stat, sha256)
+    return sha256
+
+
+def read_catalog(path: str, columns: Mapping[str, pa.DataType], required: Sequence[str] = (),
+                 cache_dir: Optional[str] = ".ingest_cache", on_bad_lines: str = "report") -> Catalog:
+    """
+    Read `columns` (those present in the file) from a delimited catalog
+
+    `required` columns missing from the header raise ValueError; other absent
+    columns are left out of the frame. `cache_dir=None` disables the cache.
+    """
+    if on_bad_lines not in ("report", "error"):
+        raise ValueError(f"on_bad_lines must be 'report' or 'error', got {on_bad_lines!r}")
+    stat = os.stat(path)
+    index = _Index(cache_dir) if cache_dir else None
+    sha256 = index.lookup(path, stat) if index else None
+    spec = _columns_spec(columns)
+
+    if sha256 is not None:
+        catalog = _load_cached(cache_dir, sha256, spec)
+        if catalog is not None:
+            return _checked(path, catalog, required, on_bad_lines)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if index:
+        index.store(path, stat, sha256)
+        catalog = _load_cached(cache_dir, sha256, spec)  # same content under another name or mtime
+        if catalog is not None:
+            return _checked(path, catalog, required, on_bad_lines)
+
+    catalog = _parse(data, sha256, columns, required, on_bad_lines)
+    if cache_dir:
+        _store(cache_dir, catalog, spec)
+    return _checked(path, catalog, required, on_bad_lines)
+
+
+def _entry(cache_dir: str, sha256: str, spec: Dict[str, str]) -> str:
+    return os.path.join(cache_dir, f"{sha256[:16]}-{_key(spec)}")
+
+
+def _load_cached(cache_dir: str, sha256: str, spec: Dict[str, str]) -> Optional[Catalog]:
+    entry = _entry(cache_dir, sha256, spec)
+    try:
+        with open(entry + ".json") as f:
+            meta = json.load(f)
+        frame = pq.read_table(entry + ".parquet").to_pandas()
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+    return Catalog(frame=frame, sha256=sha256, dialect=Dialect(**meta["dialect"]),
+                   bad_lines=[BadLine(**line) for line in meta["bad_lines"]],
+                   bad_line_count=meta["bad_line_count"], bad_values=meta["bad_values"], from_cache=True)
+
+
+def _store(cache_dir: str, catalog: Catalog, spec: Dict[str, str]):
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = _entry(cache_dir, catalog.sha256, spec)
+    tmp = f"{entry}.parquet.tmp-{os.getpid()}"
+    pq.write_table(pa.Table.from_pandas(catalog.frame, preserve_index=False), tmp)
+    os.replace(tmp, entry + ".parquet")
+    _write_json(entry + ".json", {
+        "dialect": catalog.dialect.__dict__, "columns": spec,
+        "bad_lines": [line.__dict__ for line in catalog.bad_lines],
+        "bad_line_count": catalog.bad_line_count, "bad_values": catalog.bad_values,
+    })
+
+
+def _parse(data: bytes, sha256: str, columns: Mapping[str, pa.DataType], required: Sequence[str],
+           on_bad_lines: str) -> Catalog:
+    dialect = sniff(data[:SNIFF_BYTES])
+    missing = [c for c in required if c not in dialect.header]
+    if missing:
+        raise ValueError(f"Catalog missing required columns: {missing}")
+    wanted = {name: dtype for name, dtype in columns.items() if name in dialect.header}
+
+    bad: List[BadLine] = []
+    count = [0]
+
+    def invalid_row(row):
+        if on_bad_lines == "error":
+            return "error"
+        count[0] += 1
+        if len(bad) < MAX_REPORTED:
+            bad.append(BadLine(row.number, row.expected_columns, row.actual_columns, row.text))
+        return "skip"
+
+    def read(column_types):
+        return pacsv.read_csv(
+            pa.py_buffer(data),
+            read_options=pacsv.ReadOptions(encoding=dialect.encoding, skip_rows=dialect.skip_rows),
+            parse_options=pacsv.ParseOptions(delimiter=dialect.delimiter, invalid_row_handler=invalid_row),
+            convert_options=pacsv.ConvertOptions(include_columns=list(wanted), column_types=column_types))
+
+    bad_values: Dict[str, int] = {}
+    try:
+        frame = read(wanted).to_pandas()
+    except pa.ArrowInvalid as e:
+        if "conversion error" not in str(e):
+            raise ValueError(f"Malformed catalog: {e}") from e
+        # Some value does not parse as its type: read the numbers as text and coerce them
+        bad.clear()
+        count[0] = 0
+        text_types = {name: (pa.string() if pa.types.is_integer(t) or pa.types.is_floating(t) else t)
+                      for name, t in wanted.items()}
+        frame = read(text_types).to_pandas()
+        for name, dtype in wanted.items():
+            if text_types[name] is dtype:
+                continue
+            raw = frame[name]
+            numbers = pd.to_numeric(raw, errors="coerce")
+            missing = raw.isna() | raw.str.strip().isin(NULL_VALUES)
+            failed = int((numbers.isna() & ~missing).sum())
+            if failed:
+                bad_values[name] = failed
+            # Same dtypes as a clean read: integers with gaps become float64, as in Arrow's conversion
+            frame[name] = numbers.astype("float64" if numbers.isna().any() else dtype.to_pandas_dtype())
+
+    _locate(bad, data, dialect.encoding)
+    return Catalog(frame=frame, sha256=sha256, dialect=dialect, bad_lines=bad,
+                   bad_line_count=count[0], bad_values=bad_values)
+
+
+def _locate(bad: List[BadLine], data: bytes, encoding: str):
+    """Fill in line numbers the multithreaded parser could not provide"""
+    for line in bad:
+        if line.line is None:
+            position = data.find(line.text.encode(encoding.replace("-sig", "")))
+            if position >= 0:
+                line.line = data.count(b"\n", 0, position) + 1
+
+
+def _checked(path: str, catalog: Catalog, required: Sequence[str], on_bad_lines: str) -> Catalog:
+    """Report skipped lines and unparsed values (or raise for bad lines in "error" mode)"""
+    missing = [c for c in required if c not in catalog.dialect.header]
+    if missing:
+        raise ValueError(f"Catalog missing required columns: {missing}")
+    if catalog.bad_line_count and on_bad_lines == "error":
+        first = catalog.bad_lines[0]
+        raise ValueError(f"{path}: {catalog.bad_line_count} malformed lines, first at line {first.line}: "
+                         f"{first.actual_fields} fields, expected {first.expected_fields}")
+    if catalog.bad_line_count:
+        shown = ", ".join(f"line {line.line} ({line.actual_fields} fields, expected {line.expected_fields})"
+                          for line in catalog.bad_lines[:5])
+        more = f" and {catalog.bad_line_count - 5} more" if catalog.bad_line_count > 5 else ""
+        print(f"⚠️  {os.path.basename(path)}: skipped {catalog.bad_line_count} malformed lines: {shown}{more}")
+    for name, failed in catalog.bad_values.items():
+        print(f"⚠️  {os.path.basename(path)}: {failed} values in {name} are not numbers; treated as missing")
+    return catalog
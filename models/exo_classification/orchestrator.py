@@ -0,0 +1,120 @@
+"""
+Parallel training tasks under one CPU budget, checkpointed in the stage cache
+
+The notebook fit its candidates one after another, each Random Forest with
+`n_jobs=-1`, and cross-validated them with `cross_val_score`. Here every
+unit of work is a `Task`: one candidate fit (with calibration) or one CV
+fold of one hyperparameter configuration. `run_tasks` runs them as follows:
+
+1. Each task's stage-cache key is looked up. Finished tasks from an earlier
+   (possibly interrupted) run are read back and not run again.
+2. The remaining tasks share the CPU budget. `plan` chooses W worker
+   processes and T threads per task with W × T <= budget. Each task gets
+   `n_jobs=T` for its own estimator, and BLAS/OpenMP pools are limited to T
+   threads with threadpoolctl. Nested parallelism therefore never runs
+   more threads than the budget.
+3. Tasks are dispatched costliest first and stored in the cache as soon as
+   each one finishes. An interrupted search loses only the tasks that were
+   still running.
+
+The returned `RunReport` compares the wall-clock time with the summed CPU
+time of the tasks. That sum is how long the same tasks take one after
+another on a single core, so the ratio is the speedup over sequential
+training. It is measured as CPU time rather than per-task wall time, so
+that tasks slowed down by sharing a core do not inflate it.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+from threadpoolctl import threadpool_limits
+
+from stage_cache import StageCache
+
+
+@dataclass
+class Task:
+    """One unit of work; `fn(**kwargs, n_jobs=threads)` returns a stage output dict"""
+
+    stage: str
+    params: Dict[str, Any]
+    inputs: Sequence[str]
+    fn: Callable[..., Dict[str, Any]]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    cost: float = 1.0  # relative runtime estimate; costlier tasks are dispatched first
+
+
+@dataclass
+class RunReport:
+    tasks: int
+    cached: int
+    workers: int
+    threads: int
+    wall_seconds: float
+    task_seconds: float  # summed CPU time of the computed tasks
+
+    @property
+    def speedup(self) -> float:
+        return self.task_seconds / self.wall_seconds if self.wall_seconds > 0 else 1.0
+
+    def summary(self) -> str:
+        computed = self.tasks - self.cached
+        if not computed:
+            return f"all {self.tasks} tasks cached"
+        return (f"{computed} tasks ({self.cached} cached) on {self.workers} workers × {self.threads} threads: "
+                f"{self.wall_seconds:.1f}s wall vs {self.task_seconds:.1f}s sequential, "
+                f"{self.speedup:.1f}× speedup")
+
+
+def cpu_budget(n_jobs: Optional[int] = -1) -> int:
+    """Cores for a joblib-style `n_jobs` (None or -1: all, -2: all but one, ...)"""
+    cores = os.cpu_count() or 1
+    if n_jobs is None:
+        return cores
+    if n_jobs == 0:
+        raise ValueError("n_jobs must not be 0")
+    return max(1, cores + 1 + n_jobs if n_jobs < 0 else n_jobs)
+
+
+def plan(budget: int, n_tasks: int) -> Tuple[int, int]:
+    """(workers, threads per task): one worker per task up to the budget, spare cores go to threads"""
+    workers = max(1, min(budget, n_tasks))
+    return workers, max(1, budget // workers)
+
+
+def _execute(index: int, fn: Callable[..., Dict[str, Any]], kwargs: Dict[str, Any],
+             threads: int) -> Tuple[int, Dict[str, Any], float]:
+    start = time.process_time()  # this worker process, all of its threads
+    with threadpool_limits(limits=threads):
+        output = fn(**kwargs, n_jobs=threads)
+    return index, output, time.process_time() - start
+
+
+def run_tasks(tasks: Sequence[Task], cache: StageCache,
+              n_jobs: Optional[int] = -1) -> Tuple[List[Dict[str, Any]], List[str], RunReport]:
+    """Outputs and cache keys of `tasks` (in the given order), plus the timing report"""
+    start = time.perf_counter()
+    outputs: List[Optional[Dict[str, Any]]] = []
+    keys: List[str] = []
+    for task in tasks:
+        key, output = cache.lookup(task.stage, task.params, task.inputs)
+        keys.append(key)
+        outputs.append(output)
+    pending = sorted((i for i, output in enumerate(outputs) if output is None), key=lambda i: -tasks[i].cost)
+
+    workers, threads = plan(cpu_budget(n_jobs), len(pending))
+    task_seconds = 0.0
+    if pending:
+        parallel = joblib.Parallel(n_jobs=workers, return_as="generator_unordered")
+        for i, output, seconds in parallel(joblib.delayed(_execute)(i, tasks[i].fn, tasks[i].kwargs, threads)
+                                           for i in pending):
+            cache.store(tasks[i].stage, keys[i], output, tasks[i].params)  # checkpoint right away
+            outputs[i] = output
+            task_seconds += seconds
+
+    report = RunReport(tasks=len(tasks), cached=len(tasks) - len(pending), workers=workers, threads=threads,
+                       wall_seconds=time.perf_counter() - start, task_seconds=task_seconds)
+    return outputs, keys, report
@@ -0,0 +1,123 @@
+"""
+Content-addressed on-disk cache for training stage outputs
+
+A stage output lives in `<directory>/<stage>/<key>/`, where the key is a
+SHA-256 of the stage's parameters and of the keys of the stages (or the
+digests of the files) it consumes. Changing a parameter therefore changes
+the key of that stage and of everything downstream, while upstream stages
+keep their keys and are read back instead of recomputed.
+
+Outputs are dicts of named parts: DataFrames are stored as Parquet, plain
+JSON values in `meta.json`, anything else (fitted models) with joblib. A
+stage directory is written under a temporary name and renamed into place,
+so an interrupted run never leaves a partial entry behind.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import pandas as pd
+
+META_FILE = "meta.json"
+
+
+def content_key(stage: str, params: Dict[str, Any], inputs: Sequence[str] = ()) -> str:
+    """Cache key of a stage: hash of its name, parameters and upstream keys"""
+    payload = json.dumps({"stage": stage, "params": params, "inputs": list(inputs)},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+def _is_json(value: Any) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class StageCache:
+    """Runs stages, reusing a stored output when one exists for the stage's key"""
+
+    def __init__(self, directory: str = ".stage_cache", enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self.events: List[Tuple[str, str]] = []  # (stage, "hit" | "miss") in run order
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.directory, stage, key)
+
+    def run(self, stage: str, params: Dict[str, Any], inputs: Sequence[str],
+            compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+        """`compute()` unless `stage` already ran with these params and inputs; returns (output, key)"""
+        key, output = self.lookup(stage, params, inputs)
+        if output is None:
+            output = compute()
+            self.store(stage, key, output, params)
+        return output, key
+
+    def lookup(self, stage: str, params: Dict[str, Any],
+               inputs: Sequence[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(key, stored output), or (key, None) when the stage has to be computed"""
+        key = content_key(stage, params, inputs)
+        path = self.path(stage, key)
+        if self.enabled and os.path.isdir(path):
+            self.events.append((stage, "hit"))
+            print(f"♻️  {stage}: cached ({key})")
+            return key, self.load(path)
+        self.events.append((stage, "miss"))
+        print(f"⚙️  {stage}: computing ({key})")
+        return key, None
+
+    def store(self, stage: str, key: str, output: Dict[str, Any], params: Dict[str, Any]):
+        """Keep a computed output under its key (nothing when the cache is disabled)"""
+        if self.enabled:
+            self.save(self.path(stage, key), output, params)
+
+    def hits(self) -> List[str]:
+        return [stage for stage, event in self.events if event == "hit"]
+
+    def misses(self) -> List[str]:
+        return [stage for stage, event in self.events if event == "miss"]
+
+    @staticmethod
+    def save(path: str, output: Dict[str, Any], params: Dict[str, Any]):
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            meta = {"params": params, "values": {}, "frames": [], "objects": []}
+            for name, value in output.items():
+                if isinstance(value, pd.DataFrame):
+                    value.to_parquet(os.path.join(staging, f"{name}.parquet"), index=False)
+                    meta["frames"].append(name)
+                elif _is_json(value):
+                    meta["values"][name] = value
+                else:
+                    joblib.dump(value, os.path.join(staging, f"{name}.joblib"))
+                    meta["objects"].append(name)
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump(meta, f, indent=2, default=str)
+            try:
+                os.rename(staging, path)
+            except OSError:  # another run stored the same key first
+                shutil.rmtree(staging, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        output = dict(meta["values"])
+        for name in meta["frames"]:
+            output[name] = pd.read_parquet(os.path.join(path, f"{name}.parquet"))
+        for name in meta["objects"]:
+            output[name] = joblib.load(os.path.join(path, f"{name}.joblib"))
+        return output
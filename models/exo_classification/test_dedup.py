@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests that the vectorized ephemeris de-dup matches the notebook's loop exactly
+
+Run with `python test_dedup.py` or `pytest test_dedup.py`.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+
+from dedup import dedup_by_ephemeris, dedup_by_ephemeris_reference
+
+
+def make_catalog(n_stars, seed, dup_rate=0.3):
+    """Stars with several candidates, near-duplicate ephemerides, ties and missing values"""
+    rng = np.random.default_rng(seed)
+    per_star = rng.integers(1, 8, n_stars)
+    n = int(per_star.sum())
+    kepid = np.repeat(rng.permutation(n_stars) + 10_000, per_star).astype(float)
+    period = rng.lognormal(np.log(10.0), 1.0, n)
+    duration = rng.lognormal(np.log(3.0), 0.3, n)
+    # Copy ephemerides from the previous row of the same star, sometimes just outside the tolerance
+    for i in np.flatnonzero((rng.random(n) < dup_rate)[1:]) + 1:
+        if kepid[i] == kepid[i - 1]:
+            period[i] = period[i - 1] * (1 + rng.choice([0.0, 5e-5, 9.9e-5, 2e-4]))
+            duration[i] = duration[i - 1] * (1 + rng.choice([0.0, 0.01, 0.03]))
+    df = pd.DataFrame({
+        "kepid": kepid,
+        "koi_disposition": rng.choice(["CONFIRMED", "FALSE POSITIVE", "CANDIDATE"], n),
+        "koi_period": period,
+        "koi_duration": duration,
+        "koi_model_snr": rng.choice([10.0, 20.0, np.nan], n),  # coarse values force ties
+        "koi_vet_date": rng.choice(["2016-01-01", "2018-05-01", "not a date", None], n),
+        "koi_depth": rng.random(n),
+    })
+    df.loc[rng.random(n) < 0.02, "koi_period"] = np.nan
+    df.loc[rng.random(n) < 0.01, "kepid"] = np.nan
+    return df.set_index(rng.permutation(n) + 500)  # index is dropped by both implementations
+
+
+def assert_same(df, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = dedup_by_ephemeris_reference(df, **kwargs)
+        actual = dedup_by_ephemeris(df, **kwargs)
+    pd.testing.assert_frame_equal(actual, expected)
+    return actual
+
+
+def test_matches_reference_on_random_catalogs():
+    for seed in range(5):
+        df = make_catalog(300, seed)
+        actual = assert_same(df)
+        assert len(actual) < len(df)
+        assert_same(df, tol_period_rel=1e-3, tol_duration_rel=0.05)
+
+
+def test_greedy_chain_keeps_alternate_rows():
+    # Each row is within tolerance of its neighbours but not of rows two apart
+    df = pd.DataFrame({
+        "kepid": [1] * 5,
+        "koi_disposition": ["CONFIRMED"] * 5,
+        "koi_period": 10.0 * (1 + 0.6e-4) ** np.arange(5),
+        "koi_duration": [3.0] * 5,
+        "koi_model_snr": [50.0, 40.0, 30.0, 20.0, 10.0],
+    })
+    assert assert_same(df).index.tolist() == [0, 2, 4]
+
+
+def test_tie_break_order():
+    df = pd.DataFrame({
+        "kepid": [7, 7, 7, 7],
+        "koi_disposition": ["FALSE POSITIVE", "CONFIRMED", "CONFIRMED", "CONFIRMED"],
+        "koi_period": [5.0, 5.0, 5.0, 5.0],
+        "koi_duration": [2.0, 2.0, 2.0, 2.0],
+        "koi_model_snr": [99.0, 12.0, 12.0, 12.0],
+        "koi_vet_date": ["2015-01-01", "2019-01-01", "2017-01-01", "2017-01-01"],
+    })
+    # Disposition beats SNR, then the earliest vet date, then catalog order
+    assert assert_same(df).index.tolist() == [2]
+
+
+def test_edge_cases():
+    empty = make_catalog(5, 0).iloc[:0]
+    assert_same(empty)
+    no_optional = make_catalog(50, 3)[["kepid", "koi_disposition", "koi_period", "koi_duration"]]
+    assert_same(no_optional)
+    # Asymmetric np.isclose: only the keeper's period is compared against the other row's
+    df = pd.DataFrame({"kepid": [1, 1], "koi_disposition": ["CONFIRMED", "FALSE POSITIVE"],
+                       "koi_period": [1.0001, 1.0], "koi_duration": [1.0, 1.0]})
+    assert_same(df, tol_period_rel=1e-4)
+    inf = pd.DataFrame({"kepid": [1, 1, 1], "koi_disposition": ["CONFIRMED"] * 3,
+                        "koi_period": [np.inf, np.inf, 3.0], "koi_duration": [1.0, 1.0, 1.0]})
+    assert len(assert_same(inf)) == 2
+
+
+if __name__ == "__main__":
+    print("🔍 Testing ephemeris de-dup...")
+    for test in [test_matches_reference_on_random_catalogs,
+                 test_greedy_chain_keeps_alternate_rows,
+                 test_tie_break_order,
+                 test_edge_cases]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All de-dup tests passed!")
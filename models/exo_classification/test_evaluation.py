@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass evaluation engine and its bootstrap intervals
+
+Run with `python test_evaluation.py` or `pytest test_evaluation.py`.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (accuracy_score, average_precision_score, confusion_matrix, f1_score,
+                             precision_recall_curve, precision_score, recall_score, roc_auc_score, roc_curve)
+
+from evaluation import METRICS, evaluate_scores, main, markdown_table
+
+
+def sample(n, seed, decimals=None):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.3).astype(int)
+    proba = np.clip(rng.normal(0.35 + 0.3 * y, 0.2), 0, 1)
+    return y, (proba.round(decimals) if decimals else proba)
+
+
+def test_matches_sklearn():
+    for seed, decimals in [(0, None), (1, 2), (2, 1)]:  # rounding creates tied probabilities
+        y, proba = sample(2000, seed, decimals)
+        report = evaluate_scores(y, proba, threshold=0.5, n_bootstrap=0, curve_points=10 ** 6)
+        pred = (proba >= 0.5).astype(int)
+        expected = {
+            "accuracy": accuracy_score(y, pred),
+            "precision": precision_score(y, pred, zero_division=0),
+            "recall": recall_score(y, pred, zero_division=0),
+            "f1": f1_score(y, pred, zero_division=0),
+            "roc_auc": roc_auc_score(y, proba),
+            "average_precision": average_precision_score(y, proba),
+        }
+        for name in METRICS:
+            assert abs(report["metrics"][name]["value"] - expected[name]) < 1e-12, name
+        assert report["confusion"] == confusion_matrix(y, pred, labels=[0, 1]).tolist()
+
+        # Every distinct threshold is on the curves; sklearn's ROC curve adds (0, 0) and drops collinear points
+        fpr, tpr, roc_thresholds = roc_curve(y, proba, drop_intermediate=False)
+        assert np.allclose(report["curves"]["fpr"], fpr[1:]) and np.allclose(report["curves"]["tpr"], tpr[1:])
+        assert np.array_equal(report["curves"]["thresholds"], roc_thresholds[1:])
+        precision, _, pr_thresholds = precision_recall_curve(y, proba)
+        by_threshold = dict(zip(pr_thresholds, precision[:-1]))
+        assert all(abs(p - by_threshold[t]) < 1e-12
+                   for t, p in zip(report["curves"]["thresholds"], report["curves"]["precision"]))
+
+
+def test_bootstrap_intervals_are_reproducible():
+    y, proba = sample(3000, 3, decimals=3)
+    report = evaluate_scores(y, proba, n_bootstrap=200, seed=7, n_jobs=1)
+    for name in METRICS:
+        m = report["metrics"][name]
+        assert m["ci_low"] <= m["value"] <= m["ci_high"], name
+        assert m["ci_high"] - m["ci_low"] < 0.1 and m["std"] > 0, name
+    # Each replicate has its own seed, so the number of workers does not change the intervals
+    assert evaluate_scores(y, proba, n_bootstrap=200, seed=7, n_jobs=2)["metrics"] == report["metrics"]
+    assert evaluate_scores(y, proba, n_bootstrap=200, seed=8, n_jobs=1)["metrics"] != report["metrics"]
+    wider = evaluate_scores(y, proba, n_bootstrap=200, seed=7, confidence=0.99, n_jobs=1)["metrics"]
+    assert wider["roc_auc"]["ci_high"] - wider["roc_auc"]["ci_low"] >= \
+        report["metrics"]["roc_auc"]["ci_high"] - report["metrics"]["roc_auc"]["ci_low"]
+
+
+def test_report_is_strict_json():
+    y, proba = sample(500, 4)
+    report = evaluate_scores(y, proba, n_bootstrap=20, n_jobs=1, curve_points=50)
+    assert json.loads(json.dumps(report, allow_nan=False)) == report
+    assert len(report["curves"]["thresholds"]) == 50
+    assert "95% CI" in markdown_table(report) and "| ROC-AUC |" in markdown_table(report)
+
+    # One class only: ranking metrics are undefined and reported as null
+    single = evaluate_scores(np.ones(20, dtype=int), np.linspace(0, 1, 20), n_bootstrap=5, n_jobs=1)
+    assert single["metrics"]["roc_auc"]["value"] is None and single["metrics"]["roc_auc"]["ci_low"] is None
+    assert single["metrics"]["recall"]["value"] == 0.5
+    json.dumps(single, allow_nan=False)
+
+    for bad in [dict(y_true=[0, 2], proba=[0.1, 0.2]), dict(y_true=[0, 1], proba=[0.1, np.nan]),
+                dict(y_true=[0, 1], proba=[0.1, 0.2], confidence=1.0)]:
+        try:
+            evaluate_scores(**bad, n_bootstrap=0)
+            raise AssertionError(f"expected ValueError for {bad}")
+        except ValueError:
+            pass
+
+
+def test_cli_evaluates_a_toi_export():
+    rng = np.random.default_rng(5)
+    features = ["koi_period", "koi_duration", "koi_depth"]
+    X = pd.DataFrame(rng.random((400, 3)), columns=features)
+    y = (X["koi_depth"] + rng.normal(0, 0.2, 400) < 0.5).astype(int)
+    toi = pd.DataFrame({"toi": np.arange(400) + 100.01, "tfopwg_disp": np.where(y == 1, "CP", "FP"),
+                        "pl_orbper": X["koi_period"], "pl_trandurh": X["koi_duration"],
+                        "pl_trandep": X["koi_depth"]})
+    toi.loc[:19, "tfopwg_disp"] = "PC"  # unconfirmed candidates are not labelled
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, "bundle.joblib")
+        model = LogisticRegression().fit(X, y)
+        joblib.dump({"model": model, "threshold": 0.4, "features": features, "version": "1.0.0"}, bundle_path)
+        csv_path = os.path.join(directory, "TOI.csv")
+        with open(csv_path, "w") as f:
+            f.write("# NASA Exoplanet Archive export\n")
+            toi.to_csv(f, index=False)
+        output = os.path.join(directory, "report.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(["--bundle", bundle_path, "--csv", csv_path, "--output", output, "--bootstrap", "50",
+                         "--n-jobs", "1", "--no-cache"])
+        assert code == 0
+        with open(output) as f:
+            report = json.load(f)
+    assert report["rows"] == 380 and report["threshold"] == 0.4
+    assert report["bundle"]["version"] == "1.0.0" and len(report["data"]["sha256"]) == 64
+    proba = model.predict_proba(X.iloc[20:])[:, 1]
+    assert abs(report["metrics"]["roc_auc"]["value"] - roc_auc_score(y[20:], proba)) < 1e-12
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the evaluation engine...")
+    for test in [test_matches_sklearn,
+                 test_bootstrap_intervals_are_reproducible,
+                 test_report_is_strict_json,
+                 test_cli_evaluates_a_toi_export]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All evaluation tests passed!")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for catalog ingestion and its Parquet cache
+
+Run with `python test_ingest.py` or `pytest test_ingest.py`.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+
+from ingest import KOI_COLUMNS, TOI_COLUMNS, fingerprint, read_catalog, sniff
+
+HEADER = "# This file was produced by the NASA Exoplanet Archive\n# COLUMN kepid: KepID\n\n"
+
+
+def write_koi(path, n=200, delimiter=",", bad_rows=(), encoding="utf-8"):
+    with open(path, "w", encoding=encoding) as f:
+        f.write(HEADER)
+        f.write(delimiter.join(["kepid", "kepoi_name", "koi_disposition", "koi_period", "koi_comment"]) + "\n")
+        for i in range(n):
+            if i in bad_rows:
+                f.write(delimiter.join([str(i), f"K{i}"]) + "\n")
+            else:
+                f.write(delimiter.join([str(1000 + i), f"K{i}", "CONFIRMED", f"{i * 1.5}", "Stellar é"]) + "\n")
+
+
+def read(path, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        catalog = read_catalog(path, KOI_COLUMNS, required=["kepid"], **kwargs)
+    return catalog, out.getvalue()
+
+
+def test_sniffs_comments_delimiter_and_encoding():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "koi.tsv")
+        write_koi(path, delimiter="\t", encoding="latin-1")
+        catalog, _ = read(path, cache_dir=None)
+        assert (catalog.dialect.delimiter, catalog.dialect.skip_rows, catalog.dialect.encoding) == ("\t", 3, "latin-1")
+        # Only the requested columns that exist, with their dtypes
+        assert list(catalog.frame.columns) == ["kepid", "kepoi_name", "koi_disposition", "koi_period"]
+        assert catalog.frame["kepid"].dtype == np.int64 and catalog.frame["koi_period"].dtype == np.float64
+        assert len(catalog.frame) == 200 and catalog.frame["koi_period"].iloc[-1] == 199 * 1.5
+    assert sniff(b"a|b|c\n1|2|3\n").delimiter == "|"
+
+
+def test_bad_lines_are_reported_not_dropped_silently():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "koi.csv")
+        write_koi(path, bad_rows={10, 150})
+        catalog, out = read(path, cache_dir=None)
+        assert len(catalog.frame) == 198 and catalog.bad_line_count == 2
+        assert [line.line for line in catalog.bad_lines] == [15, 155]  # 3 comment/blank lines + header
+        assert "skipped 2 malformed lines" in out and "line 15" in out
+        try:
+            read(path, cache_dir=None, on_bad_lines="error")
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+        # Unparseable numbers become missing and are counted
+        with open(path, "a") as f:
+            f.write("2000,K2000,CONFIRMED,not-a-number,x\n")
+        catalog, out = read(path, cache_dir=None)
+        assert catalog.bad_values == {"koi_period": 1} and np.isnan(catalog.frame["koi_period"].iloc[-1])
+        assert catalog.frame["kepid"].dtype == np.int64 and "not numbers" in out
+        # Empty and "NA" cells are missing values, not unparseable ones, on the text re-read too
+        with open(path, "a") as f:
+            f.write("2001,K2001,CONFIRMED,,x\n2002,K2002,CONFIRMED,NA,x\n")
+        catalog, _ = read(path, cache_dir=None)
+        assert catalog.bad_values == {"koi_period": 1} and catalog.frame["koi_period"].iloc[-2:].isna().all()
+
+
+def test_cache_is_keyed_on_content():
+    with tempfile.TemporaryDirectory() as directory:
+        path, cache_dir = os.path.join(directory, "koi.csv"), os.path.join(directory, "cache")
+        write_koi(path, bad_rows={5})
+        first, _ = read(path, cache_dir=cache_dir)
+        second, out = read(path, cache_dir=cache_dir)
+        assert not first.from_cache and second.from_cache
+        assert second.frame.equals(first.frame) and second.frame.dtypes.equals(first.frame.dtypes)
+        assert "skipped 1 malformed lines" in out  # still reported from the cache
+
+        # New mtime, same bytes: re-hashed, still a hit
+        os.utime(path, ns=(0, 0))
+        assert read(path, cache_dir=cache_dir)[0].from_cache
+        # A different column set is a separate entry
+        with contextlib.redirect_stdout(io.StringIO()):
+            other = read_catalog(path, {"kepid": pa.int64()}, cache_dir=cache_dir)
+        assert not other.from_cache and list(other.frame.columns) == ["kepid"]
+        # Changed content is re-read
+        write_koi(path, n=50)
+        changed, _ = read(path, cache_dir=cache_dir)
+        assert not changed.from_cache and len(changed.frame) == 50
+        assert fingerprint(path, cache_dir) == changed.sha256
+        try:
+            read_catalog(path, TOI_COLUMNS, required=["tid"], cache_dir=cache_dir)
+            raise AssertionError("expected ValueError")
+        except ValueError as e:
+            assert "tid" in str(e)
+
+
+if __name__ == "__main__":
+    print("🔍 Testing catalog ingestion...")
+    for test in [test_sniffs_comments_delimiter_and_encoding,
+                 test_bad_lines_are_reported_not_dropped_silently,
+                 test_cache_is_keyed_on_content]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All ingestion tests passed!")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel, checkpointed task runner
+
+Run with `python test_orchestrator.py` or `pytest test_orchestrator.py`.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+from orchestrator import Task, cpu_budget, plan, run_tasks
+from stage_cache import StageCache
+
+
+def square(value, fail_on=None, n_jobs=1):
+    if value == fail_on:
+        raise RuntimeError(f"interrupted at {value}")
+    return {"value": value * value, "threads": n_jobs}
+
+
+def make_tasks(values, fail_on=None):
+    return [Task("square", {"value": v}, (), square, {"value": v, "fail_on": fail_on}, cost=v) for v in values]
+
+
+def run(tasks, cache, n_jobs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_tasks(tasks, cache, n_jobs)
+
+
+def test_budget_is_split_between_workers_and_threads():
+    assert plan(8, 20) == (8, 1)
+    assert plan(8, 2) == (2, 4)
+    assert plan(8, 0) == (1, 8)
+    assert plan(3, 2) == (2, 1)  # never more than the budget
+    cores = os.cpu_count() or 1
+    assert cpu_budget(-1) == cpu_budget(None) == cores and cpu_budget(4) == 4 and cpu_budget(-cores - 5) == 1
+
+
+def test_outputs_keep_task_order_in_parallel():
+    values = [3, 1, 4, 1, 5, 9, 2, 6]
+    outputs, keys, report = run(make_tasks(values), StageCache(enabled=False), n_jobs=3)
+    assert [o["value"] for o in outputs] == [v * v for v in values]
+    assert (report.workers, report.threads, report.cached) == (3, 1, 0)
+    outputs, _, report = run(make_tasks(values[:2]), StageCache(enabled=False), n_jobs=4)
+    assert [o["threads"] for o in outputs] == [2, 2] and report.workers == 2
+    assert len(set(keys)) == len(set(values)) and report.wall_seconds > 0 and report.speedup > 0
+
+
+def test_interrupted_run_resumes_from_checkpoints():
+    with tempfile.TemporaryDirectory() as directory:
+        values = [5, 4, 3, 2, 1]  # dispatched costliest first, i.e. in this order
+        cache = StageCache(directory)
+        try:
+            run(make_tasks(values, fail_on=2), cache, n_jobs=1)
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+
+        cache = StageCache(directory)
+        outputs, _, report = run(make_tasks(values), cache, n_jobs=1)
+        assert cache.hits() == ["square"] * 3 and report.cached == 3
+        assert [o["value"] for o in outputs] == [25, 16, 9, 4, 1]
+        assert "3 cached" in report.summary()
+        assert run(make_tasks(values), StageCache(directory), n_jobs=1)[2].summary() == "all 5 tasks cached"
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the training orchestrator...")
+    for test in [test_budget_is_split_between_workers_and_threads,
+                 test_outputs_keep_task_order_in_parallel,
+                 test_interrupted_run_resumes_from_checkpoints]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All orchestrator tests passed!")
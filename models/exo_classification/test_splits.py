@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for deterministic stratified group splits
+
+Run with `python test_splits.py` or `pytest test_splits.py`.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+
+from splits import BalancedGroupKFold, assign_groups, stratified_group_split
+
+
+def catalog(n, seed=0):
+    """Stars with 1-7 candidates each and a per-star planet rate, like KOI"""
+    rng = np.random.default_rng(seed)
+    stars = np.repeat(np.arange(n), rng.integers(1, 8, n))[:n] + 10_000
+    rate = rng.beta(0.5, 0.8, n)
+    label = (rng.random(n) < rate[stars - 10_000]).astype(int)
+    return pd.DataFrame({"kepid": stars, "koi_period": rng.random(n), "label": label})
+
+
+def test_split_is_grouped_balanced_and_reproducible():
+    df = catalog(5000)
+    tr_idx, te_idx, df2, X, y, g = stratified_group_split(df, ["koi_period"], test_size=0.2, seed=7)
+    assert len(tr_idx) + len(te_idx) == len(df2) and not set(tr_idx) & set(te_idx)
+    assert set(g[tr_idx]).isdisjoint(g[te_idx])
+    assert abs(len(te_idx) / len(df2) - 0.2) < 0.005
+    assert abs(y[te_idx].mean() - y.mean()) < 0.005
+
+    again = stratified_group_split(df, ["koi_period"], test_size=0.2, seed=7)
+    assert np.array_equal(again[0], tr_idx) and np.array_equal(again[1], te_idx)
+    other = stratified_group_split(df, ["koi_period"], test_size=0.2, seed=8)
+    assert not np.array_equal(other[1], te_idx)
+
+
+def test_rows_without_features_are_dropped():
+    df = catalog(200)
+    df.loc[:9, "koi_period"] = np.nan
+    tr_idx, te_idx, df2, *_ = stratified_group_split(df, ["koi_period"])
+    assert len(df2) == 190 and len(tr_idx) + len(te_idx) == 190
+
+
+def test_kfold_partitions_rows_into_balanced_folds():
+    df = catalog(3000, seed=1)
+    splitter = BalancedGroupKFold(n_splits=5, seed=3)
+    tests = [test for _, test in splitter.split(df, df["label"], df["kepid"])]
+    assert np.array_equal(np.sort(np.concatenate(tests)), np.arange(len(df)))
+    for train, test in splitter.split(df, df["label"], df["kepid"]):
+        assert set(df["kepid"].iloc[train]).isdisjoint(df["kepid"].iloc[test])
+        assert abs(len(test) / len(df) - 0.2) < 0.01
+        assert abs(df["label"].iloc[test].mean() - df["label"].mean()) < 0.01
+    # Usable wherever scikit-learn takes a CV splitter
+    scores = cross_val_score(LogisticRegression(), df[["koi_period"]], df["label"], groups=df["kepid"],
+                             cv=splitter, scoring="roc_auc")
+    assert len(scores) == 5
+
+
+def test_hard_cases_place_every_group():
+    # One dominant group and single-label groups: no tolerance to miss, each group placed once
+    groups = np.r_[np.zeros(500), np.arange(1, 101)]
+    y = np.r_[np.ones(500), np.zeros(100)].astype(int)
+    part = assign_groups(groups, y, [0.8, 0.2], seed=0)
+    assert len(np.unique(part[:500])) == 1
+    for bad in [([0.5], None), ([0.5, 0.0], None), ([0.8, 0.2], np.r_[np.nan, groups[1:]])]:
+        fractions, g = bad
+        try:
+            assign_groups(groups if g is None else g, y, fractions)
+            raise AssertionError(f"expected ValueError for {bad}")
+        except ValueError:
+            pass
+    try:
+        list(BalancedGroupKFold(5).split(None, [0, 1, 0], [1, 1, 2]))
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    print("🔍 Testing stratified group splits...")
+    for test in [test_split_is_grouped_balanced_and_reproducible,
+                 test_rows_without_features_are_dropped,
+                 test_kfold_partitions_rows_into_balanced_folds,
+                 test_hard_cases_place_every_group]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All split tests passed!")
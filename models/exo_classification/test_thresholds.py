@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the exhaustive threshold optimizer
+
+Run with `python test_thresholds.py` or `pytest test_thresholds.py`.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, fbeta_score, precision_score, recall_score
+
+from thresholds import evaluate_threshold, labelled_rows, main, optimize_threshold
+
+
+def brute_force(y, proba, score):
+    """Score every distinct probability with sklearn; lowest threshold wins ties"""
+    best_t, best = None, -1.0
+    for t in np.unique(proba):  # ascending
+        value = score(y, (proba >= t).astype(int))
+        if value > best + 1e-12:
+            best_t, best = t, value
+    return best_t, best
+
+
+def sample(n, seed, decimals=None):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.3).astype(int)
+    proba = np.clip(rng.normal(0.35 + 0.3 * y, 0.2), 0, 1)
+    return y, (proba.round(decimals) if decimals else proba)
+
+
+def test_matches_brute_force_f_scores():
+    for seed, decimals in [(0, None), (1, 2), (2, 1)]:  # rounding creates tied probabilities
+        y, proba = sample(400, seed, decimals)
+        result = optimize_threshold(y, proba)
+        t, best = brute_force(y, proba, lambda a, b: f1_score(a, b, zero_division=0))
+        assert result.threshold == t and abs(result.f1 - best) < 1e-12
+        assert result.candidates == len(np.unique(proba))
+        pred = (proba >= result.threshold).astype(int)
+        assert (result.tp, result.fp) == (int((pred & y).sum()), int((pred & (1 - y)).sum()))
+
+        result = optimize_threshold(y, proba, "fbeta", beta=2.0)
+        t, best = brute_force(y, proba, lambda a, b: fbeta_score(a, b, beta=2.0, zero_division=0))
+        assert result.threshold == t and abs(result.score - best) < 1e-12
+
+
+def test_precision_and_recall_floors():
+    y, proba = sample(600, 3)
+    result = optimize_threshold(y, proba, "precision_floor", min_precision=0.8)
+    candidates = [t for t in np.unique(proba)
+                  if precision_score(y, proba >= t, zero_division=0) >= 0.8]
+    best_recall = max(recall_score(y, proba >= t) for t in candidates)
+    assert result.precision >= 0.8 and abs(result.recall - best_recall) < 1e-12
+
+    result = optimize_threshold(y, proba, "recall_floor", min_recall=0.9)
+    assert result.recall >= 0.9
+    assert all(precision_score(y, proba >= t) <= result.precision + 1e-12
+               for t in np.unique(proba) if recall_score(y, proba >= t) >= 0.9)
+
+    for kwargs in [{"objective": "precision_floor", "min_precision": 1.01}, {"objective": "recall_floor"},
+                   {"objective": "accuracy"}, {"bounds": (2.0, 3.0)}]:
+        try:
+            optimize_threshold(y, proba, **kwargs)
+            raise AssertionError(f"expected ValueError for {kwargs}")
+        except ValueError:
+            pass
+
+
+def test_bounds_and_fixed_threshold():
+    y, proba = sample(500, 4)
+    result = optimize_threshold(y, proba, bounds=(0.45, 0.55))
+    assert 0.45 <= result.threshold <= 0.55
+    fixed = evaluate_threshold(y, proba, result.threshold)
+    assert (fixed.tp, fixed.fp, fixed.fn, fixed.tn) == (result.tp, result.fp, result.fn, result.tn)
+
+
+def test_retunes_a_bundle_without_retraining():
+    rng = np.random.default_rng(5)
+    features = ["koi_period", "koi_depth"]
+    X = pd.DataFrame(rng.random((300, 2)), columns=features)
+    y = (X["koi_depth"] + rng.normal(0, 0.2, 300) < 0.5).astype(int)
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, "bundle.joblib")
+        joblib.dump({"model": LogisticRegression().fit(X, y), "threshold": 0.5, "features": features,
+                     "version": "1.2.0"}, bundle_path)
+        csv_path = os.path.join(directory, "labelled.csv")
+        X.assign(label=y).to_csv(csv_path, index=False)
+        output = os.path.join(directory, "retuned.joblib")
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(["--bundle", bundle_path, "--csv", csv_path, "--objective", "recall_floor",
+                         "--min-recall", "0.95", "--output", output, "--no-cache"])
+        assert code == 0
+        retuned = joblib.load(output)
+        assert retuned["version"] == "1.2.0" and retuned["threshold"] < 0.5
+        proba = retuned["model"].predict_proba(X)[:, 1]
+        assert evaluate_threshold(y, proba, retuned["threshold"]).recall >= 0.95
+
+
+def test_labelled_rows_from_dispositions():
+    with tempfile.TemporaryDirectory() as directory:
+        koi_path = os.path.join(directory, "koi.csv")
+        pd.DataFrame({"koi_disposition": ["CONFIRMED", "candidate", " false positive", "Confirmed"],
+                      "koi_period": [1.0, 2.0, 3.0, 4.0]}).to_csv(koi_path, index=False)
+        toi_path = os.path.join(directory, "toi.csv")
+        pd.DataFrame({"tfopwg_disp": ["cp", "PC", "FP ", "KP"], "pl_orbper": [1.0, 2.0, 3.0, 4.0],
+                      "pl_trandep": [10.0, 20.0, 30.0, 40.0]}).to_csv(toi_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            koi_X, koi_y = labelled_rows(koi_path, ["koi_period", "koi_depth"], cache_dir=None)
+            toi_X, toi_y = labelled_rows(toi_path, ["koi_period", "koi_depth", "koi_impact"], cache_dir=None)
+    assert koi_X["koi_period"].tolist() == [1.0, 3.0, 4.0] and koi_y.tolist() == [1, 0, 1]
+    assert koi_X["koi_depth"].isna().all()
+    assert toi_X[["koi_period", "koi_depth"]].values.tolist() == [[1.0, 10.0], [3.0, 30.0]]
+    assert toi_y.tolist() == [1, 0] and toi_X["koi_impact"].isna().all()
+
+
+if __name__ == "__main__":
+    print("🔍 Testing threshold optimization...")
+    for test in [test_matches_brute_force_f_scores,
+                 test_precision_and_recall_floors,
+                 test_bounds_and_fixed_threshold,
+                 test_retunes_a_bundle_without_retraining,
+                 test_labelled_rows_from_dispositions]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All threshold tests passed!")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached training pipeline
+
+Run with `python test_training.py` or `pytest test_training.py`.
+"""
+
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from stage_cache import StageCache
+from training import TrainingConfig, dedup_by_ephemeris, main, run_pipeline
+
+
+def make_koi_csv(path, n_stars=150, seed=0):
+    """Small KOI-like table: a few candidates per star, duplicated ephemerides, unused columns"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for star in range(n_stars):
+        for _ in range(rng.integers(1, 4)):
+            confirmed = rng.random() < 0.4
+            row = {
+                "kepid": 1000 + star,
+                "kepoi_name": f"K{star:05d}.{len(rows) % 10:02d}",
+                "koi_disposition": rng.choice(["CONFIRMED", "FALSE POSITIVE", "CANDIDATE"],
+                                              p=[0.4, 0.5, 0.1]) if not confirmed else "CONFIRMED",
+                "koi_period": rng.lognormal(np.log(12.0), 1.0),
+                "koi_duration": rng.lognormal(np.log(3.5), 0.4),
+                "koi_depth": rng.lognormal(np.log(300.0 if confirmed else 3000.0), 1.0),
+                "koi_model_snr": rng.lognormal(np.log(20.0), 0.8),
+                "koi_impact": rng.beta(1.2, 1.5) + (0 if confirmed else rng.random()),
+                "koi_srho": rng.lognormal(0.0, 1.0),
+                "koi_incl": 90.0 - abs(rng.normal(0.0, 2.0)),
+                "koi_num_transits": int(rng.integers(3, 500)),
+                "koi_vet_date": f"2018-0{rng.integers(1, 10)}-1{rng.integers(0, 10)}",
+                "koi_comment": "unused",
+            }
+            rows.append(row)
+            if rng.random() < 0.15:  # same ephemeris, second pipeline run
+                rows.append({**row, "koi_period": row["koi_period"] * (1 + 1e-6),
+                             "koi_disposition": "FALSE POSITIVE"})
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def small_config(directory, csv_path, **overrides):
+    settings = {"n_estimators": 10, "max_iter": 500, "cv_folds": 3, "n_jobs": 1,
+                "output_dir": os.path.join(directory, "models"), **overrides}
+    return TrainingConfig(csv_path=csv_path, **settings)
+
+
+def test_changing_n_estimators_only_refits_the_forest():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "koi.csv")
+        make_koi_csv(csv_path)
+        cache_dir = os.path.join(directory, "cache")
+
+        cache = StageCache(cache_dir)
+        first = run_pipeline(small_config(directory, csv_path), cache)
+        assert cache.hits() == []
+
+        cache = StageCache(cache_dir)
+        second = run_pipeline(small_config(directory, csv_path, n_estimators=12), cache)
+        # Each model is one fit task plus one task per CV fold (cv_folds=3)
+        assert cache.hits() == ["ingest", "dedup", "split", "fit-logreg"] + ["cv-logreg"] * 3
+        assert cache.misses() == ["fit-rf"] + ["cv-rf"] * 3
+        assert second.keys["split"] == first.keys["split"]
+        assert second.keys["fit-rf"] != first.keys["fit-rf"]
+
+        # Fully cached run reproduces the same bundle
+        cache = StageCache(cache_dir)
+        third = run_pipeline(small_config(directory, csv_path, n_estimators=12), cache)
+        assert cache.misses() == []
+        assert third.results == second.results
+
+        # A different catalog invalidates everything downstream
+        make_koi_csv(csv_path, seed=1)
+        cache = StageCache(cache_dir)
+        run_pipeline(small_config(directory, csv_path), cache)
+        assert cache.hits() == []
+
+
+def test_bundle_has_the_load_model_format():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "koi.csv")
+        make_koi_csv(csv_path)
+        result = run_pipeline(small_config(directory, csv_path, models=("rf",), version="2.1.0"),
+                              StageCache(enabled=False))
+        assert os.path.basename(result.bundle_path) == "best_koi_reduced_rf.joblib"
+
+        bundle = joblib.load(result.bundle_path)
+        assert set(bundle) == {"model", "threshold", "features", "version"}
+        assert bundle["features"] == ["koi_period", "koi_duration", "koi_depth", "koi_impact",
+                                      "koi_srho", "koi_incl"]
+        assert 0.0 < bundle["threshold"] <= 1.0
+        X = pd.DataFrame([[10.0, 3.0, 500.0, 0.3, 1.2, 89.0]], columns=bundle["features"])
+        assert bundle["model"].predict_proba(X).shape == (1, 2)
+
+
+def test_stage_outputs_survive_the_parquet_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "koi.csv")
+        make_koi_csv(csv_path)
+        cache = StageCache(os.path.join(directory, "cache"))
+        result = run_pipeline(small_config(directory, csv_path, models=("logreg",)), cache)
+
+        frame = StageCache.load(cache.path("dedup", result.keys["dedup"]))["frame"]
+        assert "koi_comment" not in frame.columns and "CANDIDATE" not in set(frame["koi_disposition"])
+        expected = dedup_by_ephemeris(pd.read_csv(csv_path).query("koi_disposition != 'CANDIDATE'"))
+        assert len(frame) == len(expected)
+        split = StageCache.load(cache.path("split", result.keys["split"]))["frame"]
+        assert set(split["split"]) == {"train", "val", "test"}
+        # Stars never straddle the train/test boundary
+        test_stars = set(split.loc[split["split"] == "test", "kepid"])
+        assert test_stars.isdisjoint(split.loc[split["split"] != "test", "kepid"])
+
+
+def test_parallel_grid_search_matches_sequential():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "koi.csv")
+        make_koi_csv(csv_path)
+        grid = {"rf": {"n_estimators": [5, 10], "min_samples_leaf": [2, 4]}}
+        sequential = run_pipeline(small_config(directory, csv_path, grid=grid), StageCache(enabled=False))
+        parallel = run_pipeline(small_config(directory, csv_path, grid=grid, n_jobs=3), StageCache(enabled=False))
+        assert parallel.results == sequential.results
+        assert len(sequential.results) == 5 and "rf[n_estimators=10,min_samples_leaf=2]" in sequential.results
+        assert (parallel.report.tasks, parallel.report.workers) == (20, 3)
+
+        # Grid configurations compete on CV ROC-AUC, then the models on test ROC-AUC
+        rf_labels = [label for label in sequential.results if label.startswith("rf")]
+        rf_best = max(rf_labels, key=lambda label: sequential.results[label]["cv_roc"])
+        assert sequential.best == max(["logreg", rf_best], key=lambda label: sequential.results[label]["roc"])
+        model_name = sequential.best.split("[")[0]
+        assert os.path.basename(sequential.bundle_path) == f"best_koi_reduced_{model_name}.joblib"
+
+
+def test_cli_rejects_unknown_models():
+    assert main(["--csv", "missing.csv", "--models", "rf,xgb"]) == 2
+    assert main(["--csv", "missing.csv", "--grid", "rf.max_depth=3,5"]) == 2
+    assert main(["--csv", "missing.csv", "--models", "rf", "--grid", "logreg.max_iter=100"]) == 2
+
+
+if __name__ == "__main__":
+    print("🔍 Testing the training pipeline...")
+    for test in [test_changing_n_estimators_only_refits_the_forest,
+                 test_bundle_has_the_load_model_format,
+                 test_stage_outputs_survive_the_parquet_round_trip,
+                 test_parallel_grid_search_matches_sequential,
+                 test_cli_rejects_unknown_models]:
+        test()
+        print(f"  ✅ {test.__name__}")
+    print("\n✅ All training pipeline tests passed!")
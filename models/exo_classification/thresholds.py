@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Exhaustive decision-threshold optimization in O(n log n)
+
+The notebook's `tune_threshold` tried 25 grid points in [0.2, 0.8], each
+with its own `f1_score` pass over the validation set. Here the
+probabilities are sorted once. Cumulative sums then give the TP and FP
+counts of the rule `proba >= t` for every distinct probability t, so every
+possible cut point is scored exactly from counts.
+
+Objectives:
+
+- `f1`, or `fbeta` with `beta`: maximize the F-score. Ties go to the lowest
+  threshold, as the grid search did.
+- `precision_floor`: maximize recall subject to precision >= `min_precision`.
+- `recall_floor`: maximize precision subject to recall >= `min_recall`.
+
+The cost is one sort, so it is cheap enough to run inside cross-validation
+folds. It can also re-tune a trained bundle against newly labelled data
+without retraining:
+
+    python thresholds.py --bundle models/best_koi_reduced_rf.joblib --csv labelled.csv \\
+        --objective precision_floor --min-precision 0.9 --output models/best_koi_reduced_rf.joblib
+"""
+
+import argparse
+import sys
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+OBJECTIVES = ("f1", "fbeta", "precision_floor", "recall_floor")
+
+
+@dataclass(frozen=True)
+class ThresholdResult:
+    threshold: float
+    objective: str
+    score: float  # value of the objective (F-score, recall or precision)
+    precision: float
+    recall: float
+    f1: float
+    tp: int
+    fp: int
+    fn: int
+    tn: int
+    candidates: int  # distinct cut points evaluated
+
+
+def cut_points(y_true, proba) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+    """
+    Distinct thresholds (descending) with the TP and FP counts of `proba >= threshold`
+
+    Also returns the numbers of positives and negatives.
+    """
+    y = np.asarray(y_true)
+    p = np.asarray(proba, dtype=np.float64)
+    if y.shape != p.shape or y.ndim != 1:
+        raise ValueError("y_true and proba must be 1-D arrays of the same length")
+    if not np.isfinite(p).all():
+        raise ValueError("proba contains NaN or infinite values")
+    if not np.isin(y, (0, 1)).all():
+        raise ValueError("y_true must contain only 0 and 1")
+    order = np.argsort(-p, kind="stable")
+    p_sorted = p[order]
+    positive = y[order].astype(np.int64)
+    tp = np.cumsum(positive)
+    fp = np.arange(1, len(p) + 1) - tp
+    # A threshold admits a whole run of tied probabilities, so keep each run's last index
+    last = np.r_[p_sorted[1:] != p_sorted[:-1], True] if len(p) else np.zeros(0, dtype=bool)
+    n_pos = int(tp[-1]) if len(p) else 0
+    return p_sorted[last], tp[last], fp[last], n_pos, len(p) - n_pos
+
+
+def optimize_threshold(y_true, proba, objective: str = "f1", beta: float = 1.0,
+                       min_precision: Optional[float] = None, min_recall: Optional[float] = None,
+                       bounds: Optional[Tuple[float, float]] = None) -> ThresholdResult:
+    """
+    Best threshold for `objective` among all distinct probabilities
+
+    `bounds=(low, high)` restricts the candidates to that closed range.
+    Raises ValueError when there are no positives or no candidate satisfies
+    the floor.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}; expected one of {', '.join(OBJECTIVES)}")
+    thresholds, tp, fp, n_pos, n_neg = cut_points(y_true, proba)
+    if n_pos == 0:
+        raise ValueError("y_true has no positives; every threshold scores 0")
+    if bounds is not None:
+        keep = (thresholds >= bounds[0]) & (thresholds <= bounds[1])
+        thresholds, tp, fp = thresholds[keep], tp[keep], fp[keep]
+        if not len(thresholds):
+            raise ValueError(f"No probabilities within {bounds}")
+
+    precision = tp / (tp + fp)  # every cut admits at least one row, so tp + fp > 0
+    recall = tp / n_pos
+    f1 = 2 * tp / (2 * tp + (n_pos - tp) + fp)
+
+    # Candidates are in descending threshold order; np.lexsort sorts by its last key first
+    rank_low_threshold = np.arange(len(thresholds))  # larger = lower threshold
+    if objective in ("f1", "fbeta"):
+        b2 = (beta if objective == "fbeta" else 1.0) ** 2
+        score = (1 + b2) * tp / ((1 + b2) * tp + b2 * (n_pos - tp) + fp)
+        best = np.lexsort((rank_low_threshold, score))[-1]
+    elif objective == "precision_floor":
+        if min_precision is None:
+            raise ValueError("precision_floor needs min_precision")
+        feasible = np.flatnonzero(precision >= min_precision)
+        if not len(feasible):
+            raise ValueError(f"No threshold reaches precision >= {min_precision}")
+        score = recall
+        best = feasible[np.lexsort((precision[feasible], recall[feasible]))[-1]]
+    else:
+        if min_recall is None:
+            raise ValueError("recall_floor needs min_recall")
+        feasible = np.flatnonzero(recall >= min_recall)
+        if not len(feasible):
+            raise ValueError(f"No threshold reaches recall >= {min_recall}")
+        score = precision
+        best = feasible[np.lexsort((recall[feasible], precision[feasible]))[-1]]
+
+    return ThresholdResult(
+        threshold=float(thresholds[best]), objective=objective, score=float(score[best]),
+        precision=float(precision[best]), recall=float(recall[best]), f1=float(f1[best]),
+        tp=int(tp[best]), fp=int(fp[best]), fn=int(n_pos - tp[best]), tn=int(n_neg - fp[best]),
+        candidates=len(thresholds))
+
+
+def evaluate_threshold(y_true, proba, threshold: float) -> ThresholdResult:
+    """Counts and scores of a fixed threshold (objective "fixed")"""
+    y = np.asarray(y_true).astype(bool)
+    predicted = np.asarray(proba, dtype=np.float64) >= threshold
+    tp, fp = int((predicted & y).sum()), int((predicted & ~y).sum())
+    fn, tn = int(y.sum()) - tp, int((~y).sum()) - fp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fn + fp) if tp + fn + fp else 0.0
+    return ThresholdResult(threshold=float(threshold), objective="fixed", score=f1, precision=precision,
+                           recall=recall, f1=f1, tp=tp, fp=fp, fn=fn, tn=tn, candidates=1)
+
+
+# ---------- re-tuning a bundle ----------
+
+def labelled_rows(csv_path: str, features, cache_dir: Optional[str] = ".ingest_cache"):
+    """
+    Feature matrix and 0/1 labels of the labelled rows
+
+    Labels come from a `label` column, KOI dispositions (CONFIRMED vs FALSE
+    POSITIVE) or TOI dispositions (CP vs FP), compared case-insensitively.
+    Features the file lacks are mapped from `pl_orbper`, `pl_trandurh` and
+    `pl_trandep` as in the notebook's TOI evaluation; the others are missing.
+    This is the one labelled-row loader: the API's compact_model.py and
+    early_exit_report.py use it too.
+    """
+    import pyarrow as pa
+
+    from ingest import TOI_COLUMNS, TOI_FEATURES, read_catalog
+
+    columns = {name: pa.float64() for name in features}
+    columns.update({"label": pa.float64(), "koi_disposition": pa.string(), "tfopwg_disp": pa.string()})
+    columns.update({column: TOI_COLUMNS[column] for column in TOI_FEATURES.values()})
+    frame = read_catalog(csv_path, columns, cache_dir=cache_dir).frame
+    if "label" in frame:
+        frame = frame[frame["label"].isin([0, 1])].copy()
+        labels = frame["label"].astype(int).values
+    else:
+        if "koi_disposition" in frame:
+            column, positive, negative = "koi_disposition", "CONFIRMED", "FALSE POSITIVE"
+        elif "tfopwg_disp" in frame:
+            column, positive, negative = "tfopwg_disp", "CP", "FP"
+        else:
+            raise ValueError(f"{csv_path} has no label, koi_disposition or tfopwg_disp column")
+        disposition = frame[column].astype(str).str.upper().str.strip()
+        frame = frame[disposition.isin([positive, negative])].copy()
+        labels = (disposition[frame.index] == positive).astype(int).values
+    for name, column in TOI_FEATURES.items():
+        if name in features and name not in frame and column in frame:
+            frame[name] = frame[column]
+    return frame.reindex(columns=list(features)), labels
+
+
+def main(argv=None) -> int:
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Re-tune a model bundle's threshold on labelled data")
+    parser.add_argument("--bundle", required=True, help="Model bundle (.joblib)")
+    parser.add_argument("--csv", required=True, help="Labelled rows: a 0/1 `label` column or KOI dispositions")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="f1")
+    parser.add_argument("--beta", type=float, default=1.0, help="Beta for --objective fbeta")
+    parser.add_argument("--min-precision", type=float, help="Floor for --objective precision_floor")
+    parser.add_argument("--min-recall", type=float, help="Floor for --objective recall_floor")
+    parser.add_argument("--output", help="Write the bundle with the new threshold here (may be --bundle)")
+    parser.add_argument("--cache-dir", default=".ingest_cache", help="Parsed-catalog cache (see ingest.py)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not cache the parsed CSV")
+    args = parser.parse_args(argv)
+
+    bundle = joblib.load(args.bundle)
+    if not isinstance(bundle, dict) or "model" not in bundle:
+        print("❌ Expected a bundle dict with a model")
+        return 1
+    features = bundle.get("features") or ["koi_period", "koi_duration", "koi_depth",
+                                          "koi_impact", "koi_srho", "koi_incl"]
+    X, y = labelled_rows(args.csv, features, cache_dir=None if args.no_cache else args.cache_dir)
+    proba = bundle["model"].predict_proba(X)[:, 1]
+    try:
+        result = optimize_threshold(y, proba, args.objective, beta=args.beta,
+                                    min_precision=args.min_precision, min_recall=args.min_recall)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    before = evaluate_threshold(y, proba, float(bundle.get("threshold", 0.5)))
+    print(f"📊 {len(y)} labelled rows, {result.candidates} distinct cut points")
+    print(f"   current threshold {before.threshold:.4f}: precision={before.precision:.3f} "
+          f"recall={before.recall:.3f} F1={before.f1:.3f}")
+    print(f"✅ {result.objective} threshold {result.threshold:.4f}: precision={result.precision:.3f} "
+          f"recall={result.recall:.3f} F1={result.f1:.3f}")
+    if args.output:
+        joblib.dump({**bundle, "threshold": result.threshold}, args.output)
+        print(f"💾 Saved {args.output}")
+    else:
+        print(asdict(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
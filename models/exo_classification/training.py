@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Cached, stage-based KOI training pipeline
+
+The training cell of new.ipynb as an importable module and CLI:
+
+    ingest -> dedup -> split -> fit-<model> (one per candidate) -> bundle
+
+Each stage output is cached by stage_cache.StageCache (tables as Parquet,
+fitted models with joblib) under a key derived from the stage parameters and
+the keys of its inputs; ingest is keyed by the CSV's content hash and reads
+the catalog through ingest.read_catalog. A re-run recomputes only the stages
+whose key changed: with a new `--n-estimators`, ingest, dedup, split and the
+logistic regression fit are read back and only the forest is refit. The
+bundle stage (exhaustive threshold tuning with thresholds.py, test metrics,
+model selection) always runs and writes `{"model", "threshold", "features"}`
+as `load_model()` expects.
+
+Candidate fits and their CV folds are separate tasks. orchestrator.run_tasks
+runs them in parallel under the `--n-jobs` CPU budget and checkpoints each
+one, so an interrupted search resumes where it stopped. `--grid` adds
+hyperparameter configurations. Within a model, the configuration with the
+best mean CV ROC-AUC is kept.
+
+    python training.py --csv cumulative.csv --n-estimators 200
+    python training.py --csv cumulative.csv --grid rf.n_estimators=200,400 --grid rf.min_samples_leaf=2,4
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from dedup import dedup_by_ephemeris
+from evaluation import SortedScores, metrics_from_counts
+from ingest import KOI_COLUMNS, fingerprint, read_catalog
+from orchestrator import RunReport, Task, run_tasks
+from splits import BalancedGroupKFold, stratified_group_split
+from stage_cache import StageCache
+from thresholds import OBJECTIVES, optimize_threshold
+
+FEATURES_FULL = ["koi_period", "koi_duration", "koi_depth",
+                 "koi_model_snr", "koi_impact", "koi_srho",
+                 "koi_incl", "koi_num_transits"]
+# SNR and number of transits are dropped to avoid proxy leakage
+FEATURES_REDUCED = ["koi_period", "koi_duration", "koi_depth", "koi_impact", "koi_srho", "koi_incl"]
+
+REQUIRED_COLUMNS = ["kepid", "koi_disposition"]
+DISPOSITIONS = ["CONFIRMED", "FALSE POSITIVE"]
+# Columns used by dedup besides the features; everything else in the catalog is dropped at ingest
+DEDUP_COLUMNS = ["koi_vet_date"]
+
+MODEL_NAMES = ("logreg", "rf")
+
+# Bump a stage's version when its code changes so stale cache entries are not reused
+STAGE_VERSIONS = {"ingest": 2, "dedup": 1, "split": 2, "fit": 3, "cv": 1}
+
+
+@dataclass
+class TrainingConfig:
+    """Everything that shapes the trained bundle; see the CLI flags for descriptions"""
+
+    csv_path: str
+    reduced_features: bool = True
+    dedup: bool = True
+    tol_period_rel: float = 1e-4
+    tol_duration_rel: float = 0.02
+    test_size: float = 0.20
+    validation_size: float = 0.20
+    random_state: int = 42
+    models: Tuple[str, ...] = MODEL_NAMES
+    n_estimators: int = 400
+    min_samples_leaf: int = 4
+    max_iter: int = 2000
+    cv_folds: int = 5
+    threshold_objective: str = "f1"  # see thresholds.OBJECTIVES
+    beta: float = 1.0
+    min_precision: Optional[float] = None
+    min_recall: Optional[float] = None
+    grid: Dict[str, Dict[str, List[Any]]] = field(default_factory=dict)  # model -> param -> values
+    n_jobs: Optional[int] = -1  # CPU budget; does not change results, so not part of any cache key
+    output_dir: str = "models"
+    version: Optional[str] = None
+
+    @property
+    def features(self) -> List[str]:
+        return list(FEATURES_REDUCED if self.reduced_features else FEATURES_FULL)
+
+    def model_params(self, name: str) -> Dict[str, Any]:
+        if name == "logreg":
+            return {"max_iter": self.max_iter}
+        if name == "rf":
+            return {"n_estimators": self.n_estimators, "min_samples_leaf": self.min_samples_leaf,
+                    "random_state": self.random_state}
+        raise ValueError(f"Unknown model {name!r}; expected one of {', '.join(MODEL_NAMES)}")
+
+    def candidates(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(label, model, params) for every model and grid combination; the label is the model without a grid"""
+        found = []
+        for name in self.models:
+            base = self.model_params(name)
+            grid = self.grid.get(name, {})
+            unknown = set(grid) - set(base)
+            if unknown:
+                raise ValueError(f"{name} has no parameters {', '.join(sorted(unknown))}; "
+                                 f"expected {', '.join(base)}")
+            for values in itertools.product(*grid.values()):
+                override = dict(zip(grid, values))
+                label = name + ("[" + ",".join(f"{k}={v}" for k, v in override.items()) + "]" if override else "")
+                found.append((label, name, {**base, **override}))
+        return found
+
+
+@dataclass
+class TrainingResult:
+    bundle_path: str
+    best: str
+    results: Dict[str, Dict[str, float]]
+    keys: Dict[str, str] = field(default_factory=dict)
+    report: Optional[RunReport] = None  # timing of the fit and CV tasks
+
+
+# ---------- stage implementations (as in the notebook) ----------
+
+def load_koi(csv_path: str, features: Sequence[str] = FEATURES_FULL,
+             cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """CONFIRMED / FALSE POSITIVE KOIs with a 0/1 `label`, restricted to the columns training uses"""
+    columns = {c: KOI_COLUMNS[c] for c in [*REQUIRED_COLUMNS, *features, *DEDUP_COLUMNS]}
+    df_raw = read_catalog(csv_path, columns, required=REQUIRED_COLUMNS, cache_dir=cache_dir).frame
+
+    df = df_raw[df_raw["koi_disposition"].isin(DISPOSITIONS)].copy()
+    df["label"] = (df["koi_disposition"] == "CONFIRMED").astype(int)
+    print(f"KOI after filter: {df.shape} | class balance: {df['label'].mean():.3f}")
+    return df.reset_index(drop=True)
+
+
+def make_pipelines(random_state: int = 42, n_estimators: int = 400, min_samples_leaf: int = 4,
+                   max_iter: int = 2000, n_jobs: Optional[int] = -1) -> Dict[str, Pipeline]:
+    base = Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())])
+    logreg = Pipeline([("prep", base), ("clf", LogisticRegression(max_iter=max_iter, class_weight="balanced"))])
+    rf = Pipeline([("imputer", SimpleImputer(strategy="median")),
+                   ("clf", RandomForestClassifier(
+                       n_estimators=n_estimators, min_samples_leaf=min_samples_leaf,
+                       class_weight="balanced", random_state=random_state, n_jobs=n_jobs))])
+    return {"logreg": logreg, "rf": rf}
+
+
+def calibrate_prefit(model, X_val, y_val):
+    """Isotonic calibration of an already fitted model on the validation rows"""
+    try:
+        from sklearn.frozen import FrozenEstimator
+    except ImportError:  # scikit-learn < 1.6
+        calibrated = CalibratedClassifierCV(estimator=model, method="isotonic", cv="prefit")
+    else:
+        calibrated = CalibratedClassifierCV(estimator=FrozenEstimator(model), method="isotonic")
+    return calibrated.fit(X_val, y_val)
+
+
+def split_frame(df: pd.DataFrame, features: Sequence[str], test_size: float, validation_size: float,
+                seed: int) -> pd.DataFrame:
+    """
+    Rows that have any feature, with `split` (train / val / test) and `order`
+
+    `order` is the row's position in its part as the notebook built it, so the
+    training rows can be restored in the exact order the models were fit on.
+    Train and val together, in frame order, are the cross-validation rows.
+    """
+    tr_idx, te_idx, df2, X, y, g = stratified_group_split(df, features, test_size=test_size, seed=seed)
+    sub_pos, val_pos = train_test_split(np.arange(len(tr_idx)), test_size=validation_size,
+                                        random_state=123, stratify=y[tr_idx])
+    frame = df2[["kepid", *features, "label"]].reset_index(drop=True)
+    split = np.empty(len(frame), dtype=object)
+    order = np.empty(len(frame), dtype=np.int64)
+    for name, rows in (("train", tr_idx[sub_pos]), ("val", tr_idx[val_pos]), ("test", te_idx)):
+        split[rows] = name
+        order[rows] = np.arange(len(rows))
+    frame["split"] = split
+    frame["order"] = order
+    return frame
+
+
+def split_part(frame: pd.DataFrame, name: str) -> pd.DataFrame:
+    return frame[frame["split"] == name].sort_values("order", kind="stable")
+
+
+def fit_candidate(frame: pd.DataFrame, features: Sequence[str], name: str, params: Dict[str, Any],
+                  n_jobs: Optional[int] = 1) -> Dict[str, Any]:
+    """Fit on train and calibrate on val; returns the model and its val/test probabilities"""
+    train, val, test = (split_part(frame, part) for part in ("train", "val", "test"))
+    pipeline = make_pipelines(**params, n_jobs=n_jobs)[name]
+    pipeline.fit(train[list(features)], train["label"].values)
+    calibrated = calibrate_prefit(pipeline, val[list(features)], val["label"].values)
+
+    scored = pd.concat([val, test])
+    predictions = pd.DataFrame({
+        "split": scored["split"].values,
+        "label": scored["label"].values,
+        "proba": calibrated.predict_proba(scored[list(features)])[:, 1],
+    })
+    return {"model": calibrated, "predictions": predictions}
+
+
+def cv_fold(frame: pd.DataFrame, features: Sequence[str], name: str, params: Dict[str, Any], cv_folds: int,
+            fold: int, seed: int = 42, n_jobs: Optional[int] = 1) -> Dict[str, Any]:
+    """ROC-AUC of one grouped CV fold over train+val (in frame order)"""
+    cv_rows = frame[frame["split"] != "test"]
+    X, y = cv_rows[list(features)], cv_rows["label"].values
+    fit_idx, score_idx = next(itertools.islice(
+        BalancedGroupKFold(cv_folds, seed).split(X, y, cv_rows["kepid"].values), fold, None))
+    pipeline = clone(make_pipelines(**params, n_jobs=n_jobs)[name])
+    pipeline.fit(X.iloc[fit_idx], y[fit_idx])
+    return {"auc": float(roc_auc_score(y[score_idx], pipeline.predict_proba(X.iloc[score_idx])[:, 1]))}
+
+
+def evaluate(predictions: pd.DataFrame, objective: str = "f1", beta: float = 1.0,
+             min_precision: Optional[float] = None, min_recall: Optional[float] = None) -> Dict[str, Any]:
+    """Tune the threshold on val over every cut point, then score the test rows with it (evaluation.py)"""
+    val = predictions[predictions["split"] == "val"]
+    test = predictions[predictions["split"] == "test"]
+    tuned = optimize_threshold(val["label"].values, val["proba"].values, objective, beta=beta,
+                               min_precision=min_precision, min_recall=min_recall)
+    threshold = tuned.threshold
+
+    scores = SortedScores(test["label"].values, test["proba"].values)
+    m = metrics_from_counts(scores.negatives, scores.positives, scores.cut(threshold))
+    return {
+        "roc": m["roc_auc"],
+        "pr": m["average_precision"],
+        "acc": m["accuracy"],
+        "prec": m["precision"],
+        "rec": m["recall"],
+        "f1": m["f1"],
+        "thr": threshold,
+        "val_f1": tuned.f1,
+        "confusion": scores.confusion(threshold),
+    }
+
+
+# ---------- pipeline ----------
+
+def run_pipeline(config: TrainingConfig, cache: Optional[StageCache] = None) -> TrainingResult:
+    """Run all stages, reusing cached outputs whose inputs and parameters are unchanged"""
+    cache = cache or StageCache()
+    features = config.features
+    keys: Dict[str, str] = {}
+    # Parsed catalogs share the cache root; their index also spares re-hashing an unchanged CSV
+    catalogs = os.path.join(cache.directory, "catalogs") if cache.enabled else None
+
+    ingest, keys["ingest"] = cache.run(
+        "ingest",
+        {"version": STAGE_VERSIONS["ingest"], "csv_sha256": fingerprint(config.csv_path, catalogs),
+         "dispositions": DISPOSITIONS, "features": FEATURES_FULL},
+        (),
+        lambda: {"frame": load_koi(config.csv_path, cache_dir=catalogs)})
+
+    def dedup():
+        frame = ingest["frame"]
+        if config.dedup:
+            frame = dedup_by_ephemeris(frame, config.tol_period_rel, config.tol_duration_rel)
+        return {"frame": frame.reset_index(drop=True)}
+
+    deduped, keys["dedup"] = cache.run(
+        "dedup",
+        {"version": STAGE_VERSIONS["dedup"], "enabled": config.dedup,
+         "tol_period_rel": config.tol_period_rel, "tol_duration_rel": config.tol_duration_rel},
+        [keys["ingest"]], dedup)
+
+    available = [c for c in features if c in deduped["frame"].columns]
+    print("Using features:", available)
+    split, keys["split"] = cache.run(
+        "split",
+        {"version": STAGE_VERSIONS["split"], "features": available, "test_size": config.test_size,
+         "validation_size": config.validation_size, "seed": config.random_state},
+        [keys["dedup"]],
+        lambda: {"frame": split_frame(deduped["frame"], available, config.test_size,
+                                      config.validation_size, config.random_state)})
+
+    # One task per candidate fit and per CV fold, all run under the CPU budget
+    frame = split["frame"]
+    candidates = config.candidates()
+    sklearn_version = sklearn.__version__
+    tasks = []
+    for label, name, params in candidates:
+        cost = params.get("n_estimators", 1)
+        fit_params = {"version": STAGE_VERSIONS["fit"], "model": name, "params": params, "sklearn": sklearn_version}
+        tasks.append(Task(f"fit-{name}", fit_params, [keys["split"]], fit_candidate,
+                          {"frame": frame, "features": available, "name": name, "params": params}, cost))
+        for fold in range(config.cv_folds):
+            cv_params = {"version": STAGE_VERSIONS["cv"], "model": name, "params": params, "sklearn": sklearn_version,
+                         "cv_folds": config.cv_folds, "fold": fold, "cv_seed": config.random_state}
+            tasks.append(Task(f"cv-{name}", cv_params, [keys["split"]], cv_fold,
+                              {"frame": frame, "features": available, "name": name, "params": params,
+                               "cv_folds": config.cv_folds, "fold": fold, "seed": config.random_state}, cost))
+    outputs, task_keys, report = run_tasks(tasks, cache, config.n_jobs)
+    print(f"⏱️  fits: {report.summary()}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    fitted: Dict[str, Any] = {}
+    per_candidate = 1 + config.cv_folds
+    for i, (label, name, params) in enumerate(candidates):
+        output = outputs[i * per_candidate]
+        keys[f"fit-{label}"] = task_keys[i * per_candidate]
+        cv_auc = np.array([fold["auc"] for fold in outputs[i * per_candidate + 1:(i + 1) * per_candidate]])
+        results[label] = evaluate(output["predictions"], config.threshold_objective, config.beta,
+                                  config.min_precision, config.min_recall)
+        results[label]["cv_roc"] = float(cv_auc.mean())
+        fitted[label] = output["model"]
+        r = results[label]
+        print(f"{label} grouped {config.cv_folds}-fold ROC-AUC: {cv_auc.mean():.3f} ± {cv_auc.std():.3f}")
+        print(f"[TEST {label}] Acc={r['acc']:.3f} Prec={r['prec']:.3f} Rec={r['rec']:.3f} "
+              f"F1={r['f1']:.3f} ROC-AUC={r['roc']:.3f} PR-AUC={r['pr']:.3f} thr={r['thr']:.3f}")
+
+    # Grid configurations compete on CV ROC-AUC; the models then on test ROC-AUC, as the notebook does
+    finalists = {}
+    for label, name, _ in candidates:
+        if name not in finalists or results[label]["cv_roc"] > results[finalists[name]]["cv_roc"]:
+            finalists[name] = label
+    best = max(finalists.values(), key=lambda k: results[k]["roc"])
+    model_name = next(name for label, name, _ in candidates if label == best)
+    bundle = {"model": fitted[best], "threshold": results[best]["thr"], "features": list(available)}
+    if config.version:
+        bundle["version"] = config.version
+    os.makedirs(config.output_dir, exist_ok=True)
+    suffix = "reduced" if config.reduced_features else "full"
+    bundle_path = os.path.join(config.output_dir, f"best_koi_{suffix}_{model_name}.joblib")
+    joblib.dump(bundle, bundle_path)
+    print(f"\nBest: {best}  ROC-AUC={results[best]['roc']:.3f}  F1={results[best]['f1']:.3f}")
+    print("Saved:", bundle_path)
+    return TrainingResult(bundle_path=bundle_path, best=best, results=results, keys=keys, report=report)
+
+
+def parse_args(argv=None):
+    defaults = TrainingConfig(csv_path="")
+    parser = argparse.ArgumentParser(description="Train the KOI classifier with cached stages")
+    parser.add_argument("--csv", required=True, help="KOI cumulative table (CSV)")
+    parser.add_argument("--output", default=defaults.output_dir, help="Directory for the model bundle")
+    parser.add_argument("--cache-dir", default=".stage_cache", help="Stage cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage and store nothing")
+    parser.add_argument("--full-features", action="store_true",
+                        help="Also train on koi_model_snr and koi_num_transits")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip ephemeris de-duplication per star")
+    parser.add_argument("--test-size", type=float, default=defaults.test_size, help="Star-level test fraction")
+    parser.add_argument("--seed", type=int, default=defaults.random_state, help="Random state")
+    parser.add_argument("--models", default=",".join(defaults.models),
+                        help=f"Comma-separated candidates ({', '.join(MODEL_NAMES)})")
+    parser.add_argument("--n-estimators", type=int, default=defaults.n_estimators, help="Random Forest trees")
+    parser.add_argument("--min-samples-leaf", type=int, default=defaults.min_samples_leaf,
+                        help="Random Forest minimum leaf size")
+    parser.add_argument("--max-iter", type=int, default=defaults.max_iter, help="Logistic Regression iterations")
+    parser.add_argument("--cv-folds", type=int, default=defaults.cv_folds, help="Grouped cross-validation folds")
+    parser.add_argument("--threshold-objective", choices=OBJECTIVES, default=defaults.threshold_objective,
+                        help="What the validation threshold maximizes")
+    parser.add_argument("--beta", type=float, default=defaults.beta, help="Beta for fbeta")
+    parser.add_argument("--min-precision", type=float, help="Floor for precision_floor")
+    parser.add_argument("--min-recall", type=float, help="Floor for recall_floor")
+    parser.add_argument("--grid", action="append", default=[], metavar="MODEL.PARAM=V1,V2",
+                        help="Hyperparameter values to search, e.g. rf.n_estimators=200,400 (repeatable)")
+    parser.add_argument("--n-jobs", type=int, default=defaults.n_jobs,
+                        help="CPU budget shared by all fits and CV folds (-1: every core)")
+    parser.add_argument("--version", help="Version string stored in the bundle")
+    return parser.parse_args(argv)
+
+
+def parse_grid(items: Sequence[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """`["rf.n_estimators=200,400"]` -> `{"rf": {"n_estimators": [200, 400]}}`"""
+    grid: Dict[str, Dict[str, List[Any]]] = {}
+    for item in items:
+        target, _, values = item.partition("=")
+        name, _, param = target.partition(".")
+        if not (name and param and values):
+            raise ValueError(f"Expected MODEL.PARAM=V1,V2, got {item!r}")
+        grid.setdefault(name, {})[param] = [float(v) if "." in v else int(v) for v in values.split(",")]
+    return grid
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    models = tuple(m.strip() for m in args.models.split(",") if m.strip())
+    unknown = [m for m in models if m not in MODEL_NAMES]
+    if unknown:
+        print(f"❌ Unknown models: {', '.join(unknown)} (expected {', '.join(MODEL_NAMES)})")
+        return 2
+    try:
+        grid = parse_grid(args.grid)
+        config = TrainingConfig(
+            csv_path=args.csv, reduced_features=not args.full_features, dedup=not args.no_dedup,
+            test_size=args.test_size, random_state=args.seed, models=models,
+            n_estimators=args.n_estimators, min_samples_leaf=args.min_samples_leaf, max_iter=args.max_iter,
+            cv_folds=args.cv_folds, threshold_objective=args.threshold_objective, beta=args.beta,
+            min_precision=args.min_precision, min_recall=args.min_recall, grid=grid, n_jobs=args.n_jobs,
+            output_dir=args.output, version=args.version)
+        config.candidates()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    if set(grid) - set(models):
+        print(f"❌ --grid names models that are not trained: {', '.join(sorted(set(grid) - set(models)))}")
+        return 2
+    cache = StageCache(args.cache_dir, enabled=not args.no_cache)
+    start = time.perf_counter()
+    run_pipeline(config, cache)
+    print(f"⏱️  {time.perf_counter() - start:.1f}s; cached stages: {', '.join(cache.hits()) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())